@@ -1,17 +1,17 @@
 import streamlit as st
 from generate_circuit import (
-    setup_kicad_env,
     create_voltage_divider,
     create_rc_low_pass_filter,
     create_led_circuit
 )
+from ui_resources import get_kicad_environment
 import os
 
 st.title("KiCad AI Circuit Generator")
 st.write("Click a button below to generate a circuit design and download the KiCad schematic file.")
 
-# Setup the environment once
-setup_kicad_env()
+# Setup the environment once per process, not on every rerun
+get_kicad_environment()
 
 # --- Circuit 1: Voltage Divider ---
 st.header("1. Voltage Divider (5V to 3.3V)")
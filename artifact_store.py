@@ -0,0 +1,237 @@
+from typing import Dict, List, Optional, Tuple
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+from tracing import span
+from metrics import ARTIFACT_BYTES, count_cache
+from request_log import add_artifact
+
+# Objects touched more recently than this are never garbage collected, so a
+# worker that just deduplicated against an object cannot lose it to a GC pass
+GC_GRACE_SECONDS = 60
+
+# Metadata updates of one digest are serialized: a dedup hit reads, extends
+# and rewrites the record, and two at once would lose one side's names.
+# Digests are striped over a fixed set of locks so memory stays bounded.
+_DIGEST_LOCKS = [threading.Lock() for _ in range(64)]
+
+def _digest_lock(digest: str) -> threading.Lock:
+    return _DIGEST_LOCKS[int(digest[:8], 16) % len(_DIGEST_LOCKS)]
+
+class ArtifactStore:
+    """
+    Content-addressed store for generated circuit artifacts
+
+    Every file is stored once under objects/<aa>/<sha256><ext>, next to a
+    <sha256>.json metadata record. Writes go to a temporary file in the
+    same directory and are renamed into place, so concurrent workers never
+    see partial files and identical circuits share one object.
+    """
+    def __init__(self, root: Optional[str] = None):
+        self.root = os.path.abspath(root or os.environ.get('KICAD_ARTIFACT_DIR', os.path.join(os.getcwd(), 'artifacts')))
+        self.objects_dir = os.path.join(self.root, 'objects')
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    def log(self, msg: str):
+        """Log messages with timestamp"""
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+    def _object_path(self, digest: str, ext: str = "") -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest + ext)
+
+    def _meta_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest + '.json')
+
+    def _write_atomic(self, path: str, data: bytes):
+        """Write data to path via a temporary file and rename"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def put_bytes(self, data: bytes, name: str, kind: str = "file", metadata: Optional[Dict] = None) -> Dict:
+        """
+        Store data under its content hash
+        Args:
+            data: File contents
+            name: Human-readable file name, used as the download label
+            kind: Artifact kind (e.g. "kicad_project", "netlist")
+            metadata: Extra fields to record in the index
+        Returns:
+            Metadata record including "hash" and "path"
+        """
+        with span("artifact.store", kind=kind, bytes=len(data)) as store_span:
+            record, dedup = self._put(data, name, kind, metadata)
+            store_span.set(dedup=dedup)
+        count_cache("artifact_dedup", dedup)
+        add_artifact(kind, record['hash'], len(data), dedup)
+        if not dedup:
+            ARTIFACT_BYTES.labels(kind).inc(len(data))
+        return record
+
+    def _put(self, data: bytes, name: str, kind: str, metadata: Optional[Dict]) -> Tuple[Dict, bool]:
+        """put_bytes; also returns whether the object was already stored"""
+        digest = hashlib.sha256(data).hexdigest()
+        with _digest_lock(digest):
+            return self._put_locked(digest, data, name, kind, metadata)
+
+    def _put_locked(self, digest: str, data: bytes, name: str, kind: str,
+                    metadata: Optional[Dict]) -> Tuple[Dict, bool]:
+        ext = os.path.splitext(name)[1]
+        path = self._object_path(digest, ext)
+        now = time.time()
+
+        record = self.get(digest)
+        dedup = bool(record and os.path.exists(path))
+        if dedup:
+            # Dedup hit: refresh access time so GC keeps the shared object
+            os.utime(path, (now, now))
+            names = record.setdefault('names', [])
+            if name not in names:
+                names.append(name)
+            record['last_access'] = now
+            self.log(f"✓ Artifact already stored: {name} ({digest[:12]})")
+        else:
+            self._write_atomic(path, data)
+            record = {
+                "hash": digest,
+                "name": name,
+                "names": [name],
+                "kind": kind,
+                "size": len(data),
+                "ext": ext,
+                "created": now,
+                "last_access": now,
+            }
+            self.log(f"✓ Stored artifact: {name} ({digest[:12]}, {len(data)} bytes)")
+
+        if metadata:
+            record.setdefault('metadata', {}).update(metadata)
+        self._write_atomic(self._meta_path(digest), json.dumps(record, indent=2, sort_keys=True).encode('utf-8'))
+        record['path'] = path
+        return record, dedup
+
+    def put_file(self, file_path: str, name: Optional[str] = None, kind: str = "file", metadata: Optional[Dict] = None) -> Dict:
+        """Store the contents of a file; see put_bytes"""
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        return self.put_bytes(data, name or os.path.basename(file_path), kind, metadata)
+
+    def get(self, digest: str) -> Optional[Dict]:
+        """Return the metadata record for a hash, or None"""
+        meta_path = self._meta_path(digest)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        record['path'] = self._object_path(digest, record.get('ext', ''))
+        return record
+
+    def list_artifacts(self) -> List[Dict]:
+        """Return every metadata record in the index, newest first"""
+        records = []
+        for shard in sorted(os.listdir(self.objects_dir)):
+            shard_dir = os.path.join(self.objects_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for entry in os.listdir(shard_dir):
+                if entry.endswith('.json'):
+                    record = self.get(entry[:-len('.json')])
+                    if record:
+                        records.append(record)
+        records.sort(key=lambda r: r.get('last_access', 0), reverse=True)
+        return records
+
+    def find(self, name: str) -> List[Dict]:
+        """Return records stored under the given file name, newest first"""
+        return [r for r in self.list_artifacts() if name in r.get('names', [])]
+
+    def remove(self, digest: str) -> bool:
+        """Delete an object and its metadata record"""
+        record = self.get(digest)
+        if not record:
+            return False
+        for path in (record['path'], self._meta_path(digest)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return True
+
+    def gc(self, max_bytes: Optional[int] = None, max_age: Optional[float] = None) -> Dict:
+        """
+        Garbage collect the store
+        Args:
+            max_bytes: Evict least recently used objects until the store fits
+            max_age: Evict objects not accessed for this many seconds
+        Returns:
+            Dictionary with removed count, freed bytes and remaining bytes
+            (leftover temporary files of interrupted writes are removed too)
+        """
+        now = time.time()
+        self._remove_stale_temporaries(now)
+        entries = []
+        for record in self.list_artifacts():
+            try:
+                last_access = os.path.getmtime(record['path'])
+            except OSError:
+                # Metadata without an object (interrupted write): drop it
+                self.remove(record['hash'])
+                continue
+            entries.append((last_access, record.get('size', 0), record['hash']))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        freed = 0
+        for last_access, size, digest in entries:
+            if now - last_access < GC_GRACE_SECONDS:
+                continue
+            expired = max_age is not None and now - last_access > max_age
+            over_budget = max_bytes is not None and total > max_bytes
+            if not (expired or over_budget):
+                continue
+            if self.remove(digest):
+                removed += 1
+                freed += size
+                total -= size
+
+        self.log(f"✓ Artifact GC removed {removed} objects ({freed} bytes), {total} bytes remain")
+        return {"removed": removed, "freed_bytes": freed, "remaining_bytes": total}
+
+    def _remove_stale_temporaries(self, now: float):
+        """Delete .tmp-* files an interrupted write left behind, once past the grace period"""
+        for shard in os.listdir(self.objects_dir):
+            shard_dir = os.path.join(self.objects_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for entry in os.listdir(shard_dir):
+                if not entry.startswith('.tmp-'):
+                    continue
+                tmp_path = os.path.join(shard_dir, entry)
+                try:
+                    if now - os.path.getmtime(tmp_path) >= GC_GRACE_SECONDS:
+                        os.remove(tmp_path)
+                except OSError:
+                    pass  # Renamed into place or removed meanwhile
+
+_default_store = None
+
+def get_artifact_store() -> ArtifactStore:
+    """Return the process-wide artifact store"""
+    global _default_store
+    if _default_store is None:
+        _default_store = ArtifactStore()
+    return _default_store
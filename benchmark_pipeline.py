@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Benchmark the circuit generation pipeline offline with a fake LLM
+
+Replays a corpus of circuit requests through CircuitGenerator against a
+deterministic in-process model: spec prompts get the entry's canned circuit
+spec, code prompts its canned SKiDL code (or DEFAULT_CODE), reviews a
+canned review. Nothing talks to a model server or the network.
+
+For each concurrency level it reports throughput, request latency, per-stage
+latency (from the tracing spans), files and bytes written, and the peak RSS
+of the process and of the SKiDL subprocesses. The report is compared with a
+stored baseline; a regression beyond the baseline's thresholds exits 1.
+
+Usage: python benchmark_pipeline.py [--concurrency 1 4 16] [--rounds N] [--corpus FILE]
+                                    [--baseline FILE] [--update-baseline] [--report FILE]
+
+The corpus is JSONL: {"id", "request", "spec" | "code"} per line. Lines in
+the shape of requests.jsonl ({"request_id", "title", "body"}) also work;
+their titles are replayed and answered with DEFAULT_CODE.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+DEFAULT_CORPUS = os.path.join(REPO_DIR, "benchmarks", "corpus.jsonl")
+DEFAULT_BASELINE = os.path.join(REPO_DIR, "benchmarks", "baseline.json")
+
+# Allowed change against the baseline before a result counts as a regression
+THRESHOLDS = {
+    "latency": 0.50,      # p95 request and stage latency may grow by 50%
+    "throughput": 0.33,   # requests/s may drop by a third
+    "rss": 0.25,          # peak RSS may grow by 25%
+    "files": 0.0,         # files written must not grow
+}
+# Stages faster than this at p95 are too small to compare reliably
+STAGE_NOISE_MS = 5.0
+
+# SKiDL code for requests without canned code; {libraries} is the symbol library directory
+DEFAULT_CODE = '''from skidl import *
+set_default_tool(KICAD8)
+lib_search_paths[KICAD8].append(r"{libraries}")
+vin, vout, gnd = Net("VIN"), Net("VOUT"), Net("GND")
+r1 = Part("Device", "R", value="10k")
+c1 = Part("Device", "C", value="10nF")
+vin += r1[1]
+vout += r1[2], c1[1]
+gnd += c1[2]
+'''
+
+CANNED_REVIEW = {
+    "summary": "A small passive circuit; values are within normal ranges.",
+    "components": ["Each part sets one of the circuit's operating points."],
+    "potential_issues": [],
+    "suggestions": [{"category": "reliability", "suggestion": "Check part ratings against the supply voltage."}],
+}
+
+def load_corpus(path: str):
+    """Corpus entries ({"id", "request", optional "spec"/"code"}) from a JSONL file"""
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "request" not in record:
+                # A backlog line: replay its title
+                record = {"id": record.get("request_id", f"line-{number}"), "request": record["title"]}
+            record.setdefault("id", f"line-{number}")
+            entries.append(record)
+    return entries
+
+class FakeLLM:
+    """Deterministic replies for the corpus, used as FakeBackend's responder"""
+    def __init__(self, entries, libraries_dir: str):
+        # Longest request first, so a request that contains another still matches itself
+        self.entries = sorted(entries, key=lambda e: len(e["request"]), reverse=True)
+        self.libraries_dir = libraries_dir
+
+    def _entry(self, prompt: str):
+        return next((e for e in self.entries if e["request"] in prompt), {})
+
+    def __call__(self, prompt: str, format):
+        if format:
+            if "potential_issues" in (format.get("properties") or {}):
+                return json.dumps(CANNED_REVIEW)
+            spec = self._entry(prompt).get("spec")
+            # No canned spec: an invalid one sends the request down the code path
+            return json.dumps(spec, separators=(',', ':')) if spec else "{}"
+        code = self._entry(prompt).get("code") or DEFAULT_CODE
+        return "```python\n" + code.replace("{libraries}", self.libraries_dir) + "```\n"
+
+class StageCollector:
+    """Tracing exporter that keeps span durations by stage name"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations = {}
+
+    def export(self, spans):
+        with self._lock:
+            for s in spans:
+                if s.end_ns is not None:
+                    self.durations.setdefault(s.name, []).append((s.end_ns - s.start_ns) / 1e6)
+
+    def reset(self):
+        with self._lock:
+            self.durations = {}
+
+    def summary(self):
+        """{stage: {count, mean_ms, p50_ms, p95_ms}}"""
+        with self._lock:
+            return {name: dict(count=len(values), mean_ms=round(sum(values) / len(values), 3),
+                               p50_ms=round(percentile(values, 0.50), 3), p95_ms=round(percentile(values, 0.95), 3))
+                    for name, values in sorted(self.durations.items())}
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+def files_under(path: str):
+    """{file: size} of every file below path"""
+    files = {}
+    for root, _, names in os.walk(path):
+        for name in names:
+            full = os.path.join(root, name)
+            try:
+                files[full] = os.path.getsize(full)
+            except OSError:
+                pass  # Removed while walking (a workspace being released)
+    return files
+
+def peak_rss_mb():
+    """Peak RSS of this process and of its largest finished child, in MB (Linux reports KB)"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(own / scale, 1), round(children / scale, 1)
+
+def run_level(generator, engine, entries, concurrency: int, rounds: int, collector: StageCollector, work_dir: str):
+    """Replay the corpus rounds times with concurrency requests at once"""
+    jobs = [entry for _ in range(rounds) for entry in entries]
+    latencies, errors, reviews = [], [], []
+    lock = threading.Lock()
+
+    def one(entry):
+        start = time.perf_counter()
+        result = generator.generate_custom_circuit(entry["request"])
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not result or 'error' in result or result.get('success') is False:
+                errors.append(entry["id"])
+            elif result.get('circuit_data'):
+                reviews.append(engine.submit_review(result['circuit_data']))
+
+    collector.reset()
+    before = files_under(work_dir)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, jobs))
+    for review in reviews:
+        review.result()  # Background reviews are part of the work done
+    elapsed = time.perf_counter() - start
+    after = files_under(work_dir)
+    written = [name for name in after if name not in before]
+    own_rss, child_rss = peak_rss_mb()
+    return {
+        "concurrency": concurrency,
+        "requests": len(jobs),
+        "errors": len(errors),
+        "failed": sorted(set(errors)),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(jobs) / elapsed, 3),
+        "latency_ms": {"p50": round(percentile(latencies, 0.50) * 1000, 1),
+                       "p95": round(percentile(latencies, 0.95) * 1000, 1),
+                       "max": round(max(latencies) * 1000, 1)},
+        "stages": collector.summary(),
+        "files_written": len(written),
+        "bytes_written": sum(after[name] for name in written),
+        "peak_rss_mb": own_rss,
+        "peak_child_rss_mb": child_rss,
+    }
+
+def run_benchmark(entries, levels=(1, 4, 16), rounds: int = 2, llm_latency: float = 0.0, verbose: bool = False):
+    """
+    Run the corpus at each concurrency level in a scratch directory
+    Returns:
+        Report dict with one result per level
+    """
+    previous_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix="kicad_bench_")
+    libraries_dir = os.path.join(work_dir, "libraries")
+    shutil.copytree(os.path.join(REPO_DIR, "libraries"), libraries_dir)
+    # Artifacts and job workspaces stay inside the scratch directory
+    os.environ['KICAD_ARTIFACT_DIR'] = os.path.join(work_dir, "artifacts")
+    os.environ['KICAD_WORK_DIR'] = os.path.join(work_dir, "jobs")
+    os.chdir(work_dir)
+    devnull = open(os.devnull, 'w')
+    quiet = contextlib.ExitStack()
+    if not verbose:
+        quiet.enter_context(contextlib.redirect_stdout(devnull))
+        quiet.enter_context(contextlib.redirect_stderr(devnull))  # SKiDL's netlist warnings
+    try:
+        with quiet:
+            import tracing
+            from llm_backends import FakeBackend
+            from llm_engine import LLMEngine
+            from generate_circuit import CircuitGenerator
+
+            collector = StageCollector()
+            tracing.set_exporter(collector)
+            backend = FakeBackend(responder=FakeLLM(entries, libraries_dir), latency=llm_latency)
+            engine = LLMEngine("llama2", backend=backend)
+            generator = CircuitGenerator(llm_engine_factory=lambda: engine, setup_environment=False)
+
+            # One unmeasured pass warms imports, library caches and SKiDL
+            start = time.perf_counter()
+            warmup = run_level(generator, engine, entries, 1, 1, collector, work_dir)
+            warmup_seconds = round(time.perf_counter() - start, 3)
+            results = [run_level(generator, engine, entries, level, rounds, collector, work_dir) for level in levels]
+            tracing.set_exporter(None)
+        return {
+            "corpus_size": len(entries),
+            "rounds": rounds,
+            "llm_latency_s": llm_latency,
+            "warmup_seconds": warmup_seconds,
+            "warmup_errors": warmup["failed"],
+            "machine": {"python": platform.python_version(), "system": platform.system(),
+                        "cpus": os.cpu_count(), "processor": platform.machine()},
+            "levels": results,
+        }
+    finally:
+        devnull.close()
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def compare(report, baseline):
+    """
+    Regressions of report against a baseline
+    Returns:
+        List of messages, empty if every result is within the baseline's thresholds
+    """
+    thresholds = dict(THRESHOLDS, **baseline.get("thresholds", {}))
+    base_levels = {level["concurrency"]: level for level in baseline["report"]["levels"]}
+    # Stage latencies under load mostly measure contention; compare them unloaded
+    sequential = min(level["concurrency"] for level in report["levels"])
+    regressions = []
+    for level in report["levels"]:
+        base = base_levels.get(level["concurrency"])
+        if base is None:
+            continue
+        name = f"concurrency {level['concurrency']}"
+        if level["errors"] > base["errors"]:
+            regressions.append(f"{name}: {level['errors']} failed requests (baseline {base['errors']}): {level['failed']}")
+        if level["throughput_rps"] < base["throughput_rps"] * (1 - thresholds["throughput"]):
+            regressions.append(f"{name}: throughput {level['throughput_rps']}/s (baseline {base['throughput_rps']}/s)")
+        if level["latency_ms"]["p95"] > base["latency_ms"]["p95"] * (1 + thresholds["latency"]):
+            regressions.append(f"{name}: p95 latency {level['latency_ms']['p95']} ms (baseline {base['latency_ms']['p95']} ms)")
+        if level["files_written"] > base["files_written"] * (1 + thresholds["files"]):
+            regressions.append(f"{name}: {level['files_written']} files written (baseline {base['files_written']})")
+        if level["peak_rss_mb"] > base["peak_rss_mb"] * (1 + thresholds["rss"]):
+            regressions.append(f"{name}: peak RSS {level['peak_rss_mb']} MB (baseline {base['peak_rss_mb']} MB)")
+        for stage, stats in (level["stages"].items() if level["concurrency"] == sequential else ()):
+            base_stats = base["stages"].get(stage)
+            if base_stats is None or max(stats["p95_ms"], base_stats["p95_ms"]) < STAGE_NOISE_MS:
+                continue
+            if stats["p95_ms"] > base_stats["p95_ms"] * (1 + thresholds["latency"]):
+                regressions.append(f"{name}: stage {stage} p95 {stats['p95_ms']} ms (baseline {base_stats['p95_ms']} ms)")
+    return regressions
+
+def print_report(report):
+    print(f"Corpus of {report['corpus_size']} requests x {report['rounds']} rounds "
+          f"(warm-up {report['warmup_seconds']:.1f}s)")
+    print(f"{'conc':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7} {'files':>6} {'KB':>8} {'RSS MB':>7} {'child MB':>9}")
+    for level in report["levels"]:
+        print(f"{level['concurrency']:>5} {level['throughput_rps']:>8.2f} {level['latency_ms']['p50']:>9.1f} "
+              f"{level['latency_ms']['p95']:>9.1f} {level['errors']:>7} {level['files_written']:>6} "
+              f"{level['bytes_written'] / 1024:>8.1f} {level['peak_rss_mb']:>7.1f} {level['peak_child_rss_mb']:>9.1f}")
+    first = report["levels"][0]
+    print(f"\nStages at concurrency {first['concurrency']}:")
+    print(f"{'stage':<28} {'count':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for stage, stats in sorted(first["stages"].items(), key=lambda item: -item[1]["p95_ms"]):
+        print(f"{stage:<28} {stats['count']:>6} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of the circuit generation pipeline")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--rounds", type=int, default=2, help="Times the corpus is replayed per level")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the fake model takes per request")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--report", help="Also write the report to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's log output")
+    args = parser.parse_args()
+
+    report = run_benchmark(load_corpus(os.path.abspath(args.corpus)), args.concurrency, args.rounds,
+                           args.llm_latency, args.verbose)
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({"thresholds": THRESHOLDS, "report": report}, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        sys.exit(0)
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one")
+        sys.exit(0)
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        regressions = compare(report, json.load(f))
+    if regressions:
+        print("\n❌ Regressions against the baseline:")
+        for message in regressions:
+            print(f"  - {message}")
+        sys.exit(1)
+    print("\n✅ Within the baseline's thresholds")
+    sys.exit(0)
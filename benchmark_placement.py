@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark schematic placement over synthetic netlists
+
+Usage: python benchmark_placement.py [num_parts ...]
+"""
+
+import sys
+import time
+import random
+
+sys.path.insert(0, __import__('os').path.dirname(__import__('os').path.abspath(__file__)))
+
+from placement import place_components, PAPER_SIZES
+from routing import route_nets
+
+# Pin offsets and body half-size of the synthetic 4-pin part
+PIN_OFFSETS = {"1": (0.0, -3.81), "2": (0.0, 3.81), "3": (-5.08, 0.0), "4": (5.08, 0.0)}
+BODY_HALF = (2.54, 2.54)
+
+def make_synthetic_netlist(num_parts: int, seed: int = 0, cluster_size: int = 12):
+    """
+    Build a netlist shaped like a real board: small local clusters of
+    2-pin and 4-pin parts chained by signal nets, plus GND/VCC rails that
+    touch a large share of the parts
+    Returns:
+        Tuple of ({ref: (value, lib, part)}, {net_name: [(ref, pin), ...]})
+    """
+    rng = random.Random(seed)
+    comp_map = {}
+    net_map = {"GND": [], "VCC": []}
+    refs = []
+    for i in range(num_parts):
+        ref = f"U{i + 1}" if i % 5 == 0 else f"R{i + 1}"
+        comp_map[ref] = ("10k", "Device", "R")
+        refs.append(ref)
+
+    for start in range(0, num_parts, cluster_size):
+        cluster = refs[start:start + cluster_size]
+        for a, b in zip(cluster, cluster[1:]):
+            net_map[f"N{len(net_map)}"] = [(a, "2"), (b, "1")]
+        # A few cross links inside the cluster and to the previous one
+        for _ in range(max(1, len(cluster) // 4)):
+            a = rng.choice(cluster)
+            b = rng.choice(refs[max(0, start - cluster_size):start + cluster_size])
+            if a != b:
+                net_map[f"N{len(net_map)}"] = [(a, "3"), (b, "4")]
+        net_map["GND"].append((cluster[-1], "2"))
+        net_map["VCC"].append((cluster[0], "1"))
+    return comp_map, net_map
+
+def check_placement(placement, paper="A4"):
+    """Return a list of problems: overlapping parts or parts off the page"""
+    width, height = PAPER_SIZES[paper]
+    problems = []
+    seen = {}
+    for ref, (x, y) in placement.positions.items():
+        key = (placement.sheets[ref], x, y)
+        if key in seen:
+            problems.append(f"{ref} overlaps {seen[key]}")
+        seen[key] = ref
+        if not (0 < x < width and 0 < y < height):
+            problems.append(f"{ref} is off the page at ({x}, {y})")
+    return problems
+
+def routing_inputs(placement, net_map):
+    """
+    Pin points and symbol bodies for route_nets from a placement of the
+    synthetic netlist
+    """
+    pins_by_net = {}
+    for net, nodes in net_map.items():
+        pins_by_net[net] = []
+        for ref, pin in nodes:
+            x, y = placement.positions[ref]
+            dx, dy = PIN_OFFSETS[pin]
+            pins_by_net[net].append((ref, pin, placement.sheets[ref], round(x + dx, 2), round(y + dy, 2)))
+    bodies = {}
+    for ref, (x, y) in placement.positions.items():
+        bodies[ref] = (placement.sheets[ref], (x - BODY_HALF[0], y - BODY_HALF[1], x + BODY_HALF[0], y + BODY_HALF[1]))
+    return pins_by_net, bodies
+
+def run(sizes):
+    """Place and route each synthetic netlist size and print timings"""
+    print(f"{'parts':>8} {'nets':>8} {'sheets':>7} {'place s':>9} {'route s':>9} {'wired':>7}")
+    results = []
+    for size in sizes:
+        comp_map, net_map = make_synthetic_netlist(size)
+        start = time.perf_counter()
+        placement = place_components(list(comp_map), net_map)
+        elapsed = time.perf_counter() - start
+        problems = check_placement(placement)
+
+        pins_by_net, bodies = routing_inputs(placement, net_map)
+        start = time.perf_counter()
+        routing = route_nets(pins_by_net, bodies)
+        route_elapsed = time.perf_counter() - start
+        wired = len(routing.routed_nets) / max(1, len(routing.routed_nets) + len(routing.labelled_nets))
+        print(f"{size:>8} {len(net_map):>8} {placement.num_sheets:>7} {elapsed:>9.3f} {route_elapsed:>9.3f} {wired:>7.0%}"
+              + (f"  ❌ {problems[0]}" if problems else ""))
+        results.append((size, elapsed, problems))
+    return results
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 100, 1000, 5000, 20000]
+    results = run(sizes)
+    sys.exit(1 if any(problems for _, _, problems in results) else 0)
@@ -0,0 +1,119 @@
+from typing import BinaryIO, Dict, List, Tuple, Union
+import os
+from circuit_spec import CircuitSpecError, parse_circuit_spec, split_pin
+from sexpr_writer import SExprWriter, quote
+from symbol_cache import open_symbol_cache, SymbolCacheError
+from tracing import add_attributes, traced
+
+# Compiles a declarative circuit spec (circuit_spec.py) straight to a KiCad
+# netlist, in process. Parts and pins are checked against the memory-mapped
+# symbol index instead of letting SKiDL discover mistakes at run time, and
+# the netlist is streamed out in the same form SKiDL's generate_netlist
+# writes, so everything downstream (net_to_project, the router, the
+# artifact store) treats both paths alike.
+
+NETLIST_TOOL = "kicad-ai-circuit-compiler"
+
+@traced("spec.validate")
+def compile_circuit_spec(spec: Union[str, Dict], libraries_dir: str = "libraries") -> Dict:
+    """
+    Validate a circuit spec against the symbol libraries
+    Args:
+        spec: Spec as JSON text or dict
+        libraries_dir: Directory holding the .kicad_sym libraries
+    Returns:
+        {"name", "description", "components": [(ref, value, lib, symbol, footprint)],
+         "nets": {net_name: [(ref, pin), ...]}}, nets sorted by name
+    Raises:
+        CircuitSpecError: Listing every unknown symbol, unknown pin and structural problem
+    """
+    spec = parse_circuit_spec(spec)
+    errors = []
+    caches = {}
+    symbol_pins = {}
+    components = []
+    for part in spec['parts']:
+        lib = part['lib']
+        if lib not in caches:
+            try:
+                caches[lib] = open_symbol_cache(os.path.join(libraries_dir, f"{lib}.kicad_sym"))
+            except (OSError, SymbolCacheError) as e:
+                caches[lib] = None
+                errors.append(f"Library {lib} is not available: {e}")
+        if caches[lib] is None:
+            continue
+        pins = caches[lib].pins(part['symbol'])
+        if pins is None:
+            errors.append(f"Part {part['ref']}: {lib} has no symbol {part['symbol']!r}")
+            continue
+        symbol_pins[part['ref']] = pins
+        components.append((part['ref'], part['value'], lib, part['symbol'], part.get('footprint', '')))
+
+    nets = {}
+    for net in spec['nets']:
+        nodes = []
+        for pin in net['pins']:
+            ref, number = split_pin(pin)
+            if ref in symbol_pins and number not in symbol_pins[ref]:
+                errors.append(f"Net {net['name']}: {ref} has no pin {number} "
+                              f"(pins: {', '.join(sorted(symbol_pins[ref]))})")
+            nodes.append((ref, number))
+        nets[net['name']] = nodes
+
+    add_attributes(parts=len(spec['parts']), nets=len(nets), errors=len(errors))
+    if errors:
+        raise CircuitSpecError(errors)
+    return {
+        "name": spec['name'],
+        "description": spec['description'],
+        "components": components,
+        "nets": dict(sorted(nets.items())),
+    }
+
+@traced("netlist.write")
+def write_netlist(circuit: Dict, target: Union[str, BinaryIO]) -> int:
+    """
+    Stream a compiled circuit as a KiCad S-expression netlist
+    Returns:
+        Number of bytes written
+    """
+    with SExprWriter(target) as w:
+        w.begin('(export (version "E")')
+        w.begin('(design')
+        w.line('(source ', quote(circuit['name']), ')')
+        w.line('(date "")')
+        w.line('(tool ', quote(NETLIST_TOOL), ')')
+        w.end()
+        w.begin('(components')
+        for ref, value, lib, symbol, footprint in circuit['components']:
+            w.begin('(comp (ref ', quote(ref), ')')
+            w.line('(value ', quote(value), ')')
+            if footprint:
+                w.line('(footprint ', quote(footprint), ')')
+            w.line('(libsource (lib ', quote(lib), ') (part ', quote(symbol), '))')
+            w.line('(sheetpath (names "/") (tstamps "/"))')
+            w.end()
+        w.end()
+        w.begin('(nets')
+        for code, (name, nodes) in enumerate(circuit['nets'].items(), start=1):
+            w.begin(f'(net (code {code}) (name ', quote(name), ')')
+            for ref, pin in nodes:
+                w.line('(node (ref ', quote(ref), ') (pin ', quote(pin), '))')
+            w.end()
+        w.end()
+        w.end()
+    add_attributes(bytes=w.bytes_written)
+    return w.bytes_written
+
+def compile_to_netlist(spec: Union[str, Dict], netlist_path: str, libraries_dir: str = "libraries") -> Dict:
+    """Validate a spec and write its netlist; returns the compiled circuit"""
+    circuit = compile_circuit_spec(spec, libraries_dir)
+    write_netlist(circuit, netlist_path)
+    return circuit
+
+def spec_summary(circuit: Dict) -> str:
+    """One-line description of a compiled circuit for chat responses"""
+    parts: List[Tuple[str, str]] = [(ref, value) for ref, value, _, _, _ in circuit['components'] if not ref.startswith('#')]
+    listed = ", ".join(f"{ref}={value}" for ref, value in parts[:8])
+    more = f" and {len(parts) - 8} more" if len(parts) > 8 else ""
+    return f"{len(parts)} parts ({listed}{more}) on {len(circuit['nets'])} nets"
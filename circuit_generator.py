@@ -2,7 +2,7 @@ from typing import Dict, List, Optional, Tuple
 import os
 import json
 from datetime import datetime
-from generate_circuit import create_voltage_divider, create_rc_low_pass_filter, create_led_circuit, setup_kicad_env
+from generate_circuit import create_voltage_divider, create_rc_low_pass_filter, create_led_circuit, create_circuit_from_spec, setup_kicad_env
 
 class CircuitGenerator:
     """
@@ -73,6 +73,8 @@ class CircuitGenerator:
     def parse_circuit_description(self, llm_response: str) -> Dict:
         """
         Parse LLM response to extract circuit details
+        Accepts structured-output JSON (see circuit_spec.py), a decoded dict,
+        or free text containing a JSON block.
         Expected format:
         {
             "circuit_type": "voltage_divider|rc_filter|etc",
@@ -94,8 +96,15 @@ class CircuitGenerator:
             ]
         }
         """
+        if isinstance(llm_response, dict):
+            return llm_response
         try:
-            # Try to find JSON block in response
+            # Structured-output replies are bare JSON
+            return json.loads(llm_response)
+        except json.JSONDecodeError:
+            pass
+        try:
+            # Otherwise look for a JSON block inside free text
             start = llm_response.find('{')
             end = llm_response.rfind('}') + 1
             if start >= 0 and end > start:
@@ -117,6 +126,15 @@ class CircuitGenerator:
         if not circuit_desc:
             return None, []
 
+        # Full circuit specs (parts and nets) are compiled directly
+        if 'parts' in circuit_desc:
+            result = create_circuit_from_spec(circuit_desc)
+            if 'error' in result:
+                self.log(result['error'])
+                return None, []
+            self.log(f"Generated circuit files in: {result['circuit_dir']}")
+            return result['circuit_dir'], result['generated_files']
+
         circuit_type = circuit_desc.get('circuit_type', '').lower()
         params = circuit_desc.get('parameters', {})
         
@@ -0,0 +1,221 @@
+from typing import Callable, Dict, List, Optional
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# One structured LLM call reviews a circuit: analysis, issues and
+# categorised suggestions come back together as JSON, instead of two
+# free-text calls that repeat the same circuit context and are then
+# split up line by line. Reviews are cached by the circuit's content hash
+# (in memory and on disk), so an unchanged circuit is never reviewed twice,
+# and they can be computed on a background thread right after generation.
+
+REVIEW_FORMAT = 1
+REVIEW_CATEGORIES = ("performance", "reliability", "cost", "power", "emc", "thermal", "manufacturing")
+
+REVIEW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "components": {"type": "array", "items": {"type": "string"}},
+        "potential_issues": {"type": "array", "items": {"type": "string"}},
+        "suggestions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "category": {"type": "string", "enum": list(REVIEW_CATEGORIES)},
+                    "suggestion": {"type": "string"},
+                },
+                "required": ["category", "suggestion"],
+            },
+        },
+    },
+    "required": ["summary", "components", "potential_issues", "suggestions"],
+}
+
+def review_prompt(circuit_data: Dict) -> str:
+    """Prompt for a full review; the circuit context appears once"""
+    return f"""As an expert electronics engineer, review this circuit.
+
+Circuit Name: {circuit_data.get('name', 'Unnamed')}
+Description: {circuit_data.get('description', 'No description')}
+Components: {', '.join(circuit_data.get('components', []))}
+Connections: {', '.join(circuit_data.get('nets', []))}
+
+Reply in JSON:
+- summary: topology, design pattern and expected performance, in two or three sentences
+- components: one entry per component describing its role
+- potential_issues: reliability or correctness concerns
+- suggestions: specific, actionable improvements, each tagged with one category
+  ({', '.join(REVIEW_CATEGORIES)})"""
+
+def circuit_content_hash(circuit_data: Dict, model_name: str = "") -> str:
+    """SHA-256 of the circuit description (and model), independent of key order"""
+    canonical = json.dumps({"model": model_name, "circuit": circuit_data, "format": REVIEW_FORMAT},
+                           sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def parse_review(response: str) -> Dict:
+    """
+    Decode a structured review reply
+    Raises:
+        ValueError: If the reply is not a JSON review
+    """
+    review = json.loads(response)
+    if not isinstance(review, dict):
+        raise ValueError("Review is not a JSON object")
+    suggestions = []
+    for item in review.get('suggestions') or []:
+        if isinstance(item, dict) and str(item.get('suggestion', '')).strip():
+            category = str(item.get('category', '')).lower()
+            suggestions.append({
+                "category": category if category in REVIEW_CATEGORIES else "reliability",
+                "suggestion": str(item['suggestion']).strip(),
+            })
+    return {
+        "summary": str(review.get('summary', '')).strip(),
+        "components": [str(c).strip() for c in review.get('components') or [] if str(c).strip()],
+        "potential_issues": [str(i).strip() for i in review.get('potential_issues') or [] if str(i).strip()],
+        "suggestions": suggestions,
+    }
+
+def circuit_data_from_netlist(name: str, description: str, comp_map: Dict, net_map: Dict) -> Dict:
+    """Review input for a parsed netlist ({ref: (value, lib, part)}, {net: [(ref, pin)]})"""
+    return {
+        "name": name,
+        "description": description,
+        "components": [f"{ref} {value} ({lib}:{part})" for ref, (value, lib, part) in sorted(comp_map.items())],
+        "nets": [f"{net}: {' '.join(f'{ref}.{pin}' for ref, pin in nodes)}" for net, nodes in sorted(net_map.items())],
+    }
+
+class ReviewCache:
+    """
+    Reviews by content hash: an in-memory dict backed by one JSON file per
+    review under root/<aa>/<hash>.json, written atomically so workers can
+    share the directory
+    """
+    def __init__(self, root: Optional[str] = None):
+        self.root = root
+        self._reviews: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, digest: str) -> Optional[str]:
+        if not self.root:
+            return None
+        return os.path.join(self.root, digest[:2], digest + '.json')
+
+    def get(self, digest: str) -> Optional[Dict]:
+        with self._lock:
+            review = self._reviews.get(digest)
+        if review is not None:
+            return review
+        path = self._path(digest)
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    review = json.load(f)
+            except (OSError, ValueError):
+                return None
+            with self._lock:
+                self._reviews[digest] = review
+        return review
+
+    def put(self, digest: str, review: Dict):
+        with self._lock:
+            self._reviews[digest] = review
+        path = self._path(digest)
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(review, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+class CircuitReviewer:
+    """
+    Runs and caches reviews. review() is synchronous; submit() queues the
+    review on a background thread and returns a Future. Concurrent requests
+    for the same circuit share one LLM call. The last failure of a circuit's
+    review is kept (not cached on disk) until it is submitted again.
+    """
+    def __init__(self, run_review: Callable[[Dict], Dict], cache: Optional[ReviewCache] = None,
+                 model_name: str = "", max_workers: int = 1):
+        """
+        Args:
+            run_review: Callable taking circuit_data and returning a parsed review
+            cache: Where reviews are kept; defaults to an in-memory cache
+            model_name: Part of the cache key, so switching models re-reviews
+            max_workers: Background reviews running at once
+        """
+        self.run_review = run_review
+        self.cache = cache or ReviewCache()
+        self.model_name = model_name
+        self.max_workers = max_workers
+        self._executor = None
+        self._pending: Dict[str, Future] = {}
+        self._failed: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def key(self, circuit_data: Dict) -> str:
+        return circuit_content_hash(circuit_data, self.model_name)
+
+    def cached(self, circuit_data: Dict) -> Optional[Dict]:
+        """The finished review for a circuit, or None"""
+        return self.cache.get(self.key(circuit_data))
+
+    def failure(self, circuit_data: Dict) -> Optional[str]:
+        """Why the last review of a circuit failed, or None"""
+        with self._lock:
+            return self._failed.get(self.key(circuit_data))
+
+    def _compute(self, digest: str, circuit_data: Dict) -> Dict:
+        try:
+            review = self.cache.get(digest)
+            if review is None:
+                review = dict(self.run_review(circuit_data), hash=digest)
+                self.cache.put(digest, review)
+            return review
+        except Exception as e:
+            with self._lock:
+                self._failed[digest] = str(e) or type(e).__name__
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(digest, None)
+
+    def submit(self, circuit_data: Dict) -> Future:
+        """Review in the background; a finished or in-flight review is reused"""
+        digest = self.key(circuit_data)
+        review = self.cache.get(digest)
+        if review is not None:
+            future = Future()
+            future.set_result(review)
+            return future
+        with self._lock:
+            future = self._pending.get(digest)
+            if future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="circuit-review")
+                self._failed.pop(digest, None)
+                future = self._executor.submit(self._compute, digest, circuit_data)
+                self._pending[digest] = future
+            return future
+
+    def review(self, circuit_data: Dict, timeout: Optional[float] = None) -> Dict:
+        """Review now (or wait for the in-flight review of the same circuit)"""
+        return self.submit(circuit_data).result(timeout)
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,181 @@
+from typing import Dict, List, Union
+import re
+import json
+
+# Declarative circuit description produced by the LLM in structured-output
+# mode. Ollama constrains decoding to CIRCUIT_SPEC_SCHEMA, so the reply is
+# bare JSON: no prose to strip, no code to execute.
+#
+#   {
+#     "name": "voltage_divider_5v_3v3",
+#     "description": "Divides 5V down to 3.3V",
+#     "parameters": {"vin": 5.0, "vout": 3.3},
+#     "parts": [{"ref": "R1", "lib": "Device", "symbol": "R", "value": "1.8k",
+#                "footprint": "Resistor_SMD:R_0805_2012Metric"}, ...],
+#     "nets": [{"name": "OUT", "pins": ["R1.2", "R2.1"]}, ...]
+#   }
+
+AVAILABLE_LIBRARIES = ("Device", "LED", "power")
+
+CIRCUIT_SPEC_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "description": {"type": "string"},
+        "parameters": {
+            "type": "object",
+            "additionalProperties": {"type": ["number", "string"]},
+        },
+        "parts": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "ref": {"type": "string"},
+                    "lib": {"type": "string", "enum": list(AVAILABLE_LIBRARIES)},
+                    "symbol": {"type": "string"},
+                    "value": {"type": "string"},
+                    "footprint": {"type": "string"},
+                },
+                "required": ["ref", "lib", "symbol", "value"],
+            },
+        },
+        "nets": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "pins": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["name", "pins"],
+            },
+        },
+    },
+    "required": ["name", "parts", "nets"],
+}
+
+_REF = re.compile(r'^#?[A-Za-z_]+\d+$')
+_PIN = re.compile(r'^(?P<ref>[^.\s]+)\.(?P<pin>[^.\s]+)$')
+
+class CircuitSpecError(ValueError):
+    """A circuit spec is malformed; .errors lists every problem found"""
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+def circuit_spec_prompt(user_request: str) -> str:
+    """Prompt for structured-output mode; the schema itself is sent as Ollama's format"""
+    return f"""You are an electronics expert. Describe the requested circuit as JSON.
+
+Rules:
+- parts: one entry per component. ref is a reference designator (R1, C1, D1, #PWR01).
+  lib is one of {', '.join(AVAILABLE_LIBRARIES)}; symbol is a symbol in that library
+  (Device: R, C, D, L; LED: LED; power: VCC, GND). value uses standard E12 values (4.7k, 100nF).
+- nets: every net lists its pins as "REF.PIN", e.g. "R1.2". Use descriptive net names (VCC, GND, OUT).
+- name: lowercase with underscores. parameters: the design inputs you used (volts, amps, hertz).
+
+Request: {user_request}"""
+
+def split_pin(pin: str):
+    """Split "R1.2" into ("R1", "2")"""
+    match = _PIN.match(pin.strip())
+    if not match:
+        raise CircuitSpecError([f"Pin {pin!r} is not in REF.PIN form"])
+    return match.group('ref'), match.group('pin')
+
+def validate_circuit_spec(spec: Dict) -> List[str]:
+    """
+    Check a spec's structure
+    Returns:
+        List of problems; empty if the spec is usable
+    """
+    if not isinstance(spec, dict):
+        return ["Circuit spec must be a JSON object"]
+    errors = []
+    if not isinstance(spec.get('name'), str) or not spec['name'].strip():
+        errors.append("Circuit spec needs a name")
+
+    refs = set()
+    parts = spec.get('parts')
+    if not isinstance(parts, list) or not parts:
+        errors.append("Circuit spec has no parts")
+        parts = []
+    for i, part in enumerate(parts):
+        if not isinstance(part, dict):
+            errors.append(f"Part {i} is not an object")
+            continue
+        missing = [key for key in ('ref', 'lib', 'symbol', 'value') if not isinstance(part.get(key), str)]
+        if missing:
+            errors.append(f"Part {part.get('ref', i)} is missing {', '.join(missing)}")
+            continue
+        if not _REF.match(part['ref']):
+            errors.append(f"Part {part['ref']!r} has an invalid reference")
+        elif part['ref'] in refs:
+            errors.append(f"Part {part['ref']} is defined twice")
+        refs.add(part['ref'])
+        if part['lib'] not in AVAILABLE_LIBRARIES:
+            errors.append(f"Part {part['ref']} uses unknown library {part['lib']!r}")
+
+    nets = spec.get('nets')
+    if not isinstance(nets, list):
+        errors.append("Circuit spec has no nets")
+        nets = []
+    names = set()
+    connected = {}
+    for i, net in enumerate(nets):
+        if not isinstance(net, dict) or not isinstance(net.get('name'), str) or not isinstance(net.get('pins'), list):
+            errors.append(f"Net {i} needs a name and a list of pins")
+            continue
+        if net['name'] in names:
+            errors.append(f"Net {net['name']} is defined twice")
+        names.add(net['name'])
+        for pin in net['pins']:
+            try:
+                ref, number = split_pin(str(pin))
+            except CircuitSpecError as e:
+                errors.extend(e.errors)
+                continue
+            if ref not in refs:
+                errors.append(f"Net {net['name']} connects unknown part {ref}")
+            elif (ref, number) in connected:
+                errors.append(f"Pin {ref}.{number} is on both {connected[(ref, number)]} and {net['name']}")
+            else:
+                connected[(ref, number)] = net['name']
+    return errors
+
+def parse_circuit_spec(response: Union[str, Dict]) -> Dict:
+    """
+    Parse and validate a structured-output reply
+    Args:
+        response: The model's JSON text, or an already decoded object
+    Returns:
+        The spec, with names stripped and pins normalised to "REF.PIN"
+    Raises:
+        CircuitSpecError: If the reply is not JSON or the spec is invalid
+    """
+    if isinstance(response, str):
+        try:
+            spec = json.loads(response)
+        except json.JSONDecodeError as e:
+            raise CircuitSpecError([f"Response is not valid JSON: {e}"])
+    else:
+        spec = response
+
+    errors = validate_circuit_spec(spec)
+    if errors:
+        raise CircuitSpecError(errors)
+
+    return {
+        "name": re.sub(r'\W+', '_', spec['name'].strip()).strip('_').lower() or "circuit",
+        "description": spec.get('description', ''),
+        "parameters": dict(spec.get('parameters') or {}),
+        "parts": [
+            {key: part[key].strip() for key in ('ref', 'lib', 'symbol', 'value', 'footprint') if isinstance(part.get(key), str)}
+            for part in spec['parts']
+        ],
+        "nets": [
+            {"name": net['name'].strip(), "pins": ["%s.%s" % split_pin(str(pin)) for pin in net['pins']]}
+            for net in spec['nets']
+        ],
+    }
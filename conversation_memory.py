@@ -0,0 +1,166 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import re
+import json
+import uuid
+import threading
+
+# Bounded conversation memory. Recent turns are kept verbatim in a sliding
+# window; older turns are folded into a rolling summary. Everything is
+# measured with a local token estimate, so the memory rendered into a
+# prompt never exceeds its budget however long the conversation runs and
+# prompt prefill stays flat.
+
+# Sub-word tokenizers (Llama, GPT) encode most English words of up to
+# eight letters as one token, split longer words, give each symbol its own
+# token and (Llama) each digit its own token. Counting the same way tracks
+# real token counts closely enough for budgeting without loading a
+# tokenizer.
+_TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d|[^\sA-Za-z\d]")
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many model tokens text will use"""
+    count = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        count += 1 + (len(piece) - 1) // 8
+    return count
+
+def truncate_to_tokens(text: str, budget: int, marker: str = " …") -> str:
+    """Cut text to at most budget estimated tokens, keeping the start"""
+    if estimate_tokens(text) <= budget:
+        return text
+    if budget <= estimate_tokens(marker):
+        return ""
+    # Binary search on characters: estimate_tokens is monotonic in the prefix length
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid] + marker) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low].rstrip() + marker
+
+def _first_sentence(text: str, limit: int = 160) -> str:
+    text = " ".join(text.split())
+    match = re.match(r"(.+?[.!?])(\s|$)", text)
+    sentence = match.group(1) if match else text
+    return sentence if len(sentence) <= limit else sentence[:limit].rstrip() + "…"
+
+def extractive_summary(summary: str, turns: List[Tuple[str, str]]) -> str:
+    """Default summarizer: append the gist (first sentence) of each folded turn"""
+    lines = [summary] if summary else []
+    lines.extend(f"{role}: {_first_sentence(content)}" for role, content in turns)
+    return "\n".join(lines)
+
+SUMMARY_HEADER = "Earlier in this conversation:"
+TURNS_HEADER = "Recent messages:"
+
+class ConversationMemory:
+    """
+    Sliding window of recent turns plus a rolling summary of older ones,
+    kept under a token budget
+
+    Turns past the window, or that would push the memory over budget, are
+    passed to the summarizer together with the current summary; its result
+    replaces the summary, which is trimmed to summary_budget by dropping its
+    oldest lines.
+    """
+    def __init__(self, token_budget: int = 768, window_turns: int = 6, summary_budget: Optional[int] = None,
+                 summarizer: Optional[Callable[[str, List[Tuple[str, str]]], str]] = None,
+                 session_id: Optional[str] = None):
+        """
+        Args:
+            token_budget: Most tokens render() may use
+            window_turns: Most turns kept verbatim
+            summary_budget: Most tokens for the summary (default: a third of the budget)
+            summarizer: Callable(summary, [(role, content)]) -> new summary; an LLM call can be plugged in here
+            session_id: Chat session this memory belongs to (default: a new random ID)
+        """
+        self.session_id = session_id or uuid.uuid4().hex
+        self.token_budget = token_budget
+        self.window_turns = window_turns
+        self.summary_budget = summary_budget if summary_budget is not None else token_budget // 3
+        self.summarizer = summarizer or extractive_summary
+        self.summary = ""
+        self.turns: List[Tuple[str, str, int]] = []  # (role, content, tokens)
+        self._lock = threading.Lock()
+
+    @property
+    def window_budget(self) -> int:
+        """Tokens available to the verbatim turns"""
+        return self.token_budget - self.summary_budget - estimate_tokens(TURNS_HEADER)
+
+    def add(self, role: str, content: str):
+        """Record a turn ("user" or "assistant") and fold old turns if needed"""
+        line = f"{role.capitalize()}: "
+        # A single turn may use at most the whole window
+        content = truncate_to_tokens(content, self.window_budget - estimate_tokens(line))
+        with self._lock:
+            self.turns.append((role, content, estimate_tokens(line + content)))
+            self._compact()
+
+    def _compact(self):
+        window_budget = self.window_budget
+        folded = []
+        while self.turns and (len(self.turns) > self.window_turns or
+                              sum(t[2] for t in self.turns) > window_budget):
+            role, content, _ = self.turns.pop(0)
+            folded.append((role, content))
+        if folded:
+            # Over budget, the oldest summary lines go first
+            budget = self.summary_budget - estimate_tokens(SUMMARY_HEADER)
+            lines = self.summarizer(self.summary, folded).split("\n")
+            while len(lines) > 1 and estimate_tokens("\n".join(lines)) > budget:
+                lines.pop(0)
+            self.summary = truncate_to_tokens("\n".join(lines), budget)
+
+    def token_count(self) -> int:
+        """Estimated tokens of the rendered memory"""
+        return estimate_tokens(self.render())
+
+    def render(self) -> str:
+        """Memory as prompt text: summary first, then the recent turns"""
+        with self._lock:
+            parts = []
+            if self.summary:
+                parts.append(f"{SUMMARY_HEADER}\n{self.summary}")
+            if self.turns:
+                parts.append(f"{TURNS_HEADER}\n" + "\n".join(f"{role.capitalize()}: {content}" for role, content, _ in self.turns))
+            return "\n\n".join(parts)
+
+    def clear(self):
+        with self._lock:
+            self.summary = ""
+            self.turns = []
+
+def compact_context(context: Optional[Dict], budget: int = 512) -> str:
+    """
+    Serialize a circuit context for a prompt within budget estimated tokens
+    Compact JSON (no indentation) is tried first; if that is too long,
+    lists are shortened and long strings cut until it fits.
+    """
+    if not context:
+        return "No circuit loaded"
+    text = json.dumps(context, separators=(',', ':'), default=str)
+    if estimate_tokens(text) <= budget:
+        return text
+
+    def shrink(value, items, chars):
+        if isinstance(value, dict):
+            return {k: shrink(v, items, chars) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            kept = [shrink(v, items, chars) for v in value[:items]]
+            if len(value) > items:
+                kept.append(f"... {len(value) - items} more")
+            return kept
+        if isinstance(value, str) and len(value) > chars:
+            return value[:chars] + "…"
+        return value
+
+    items, chars = 32, 400
+    while items > 1:
+        text = json.dumps(shrink(context, items, chars), separators=(',', ':'), default=str)
+        if estimate_tokens(text) <= budget:
+            return text
+        items, chars = items // 2, max(40, chars // 2)
+    return truncate_to_tokens(text, budget)
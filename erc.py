@@ -0,0 +1,244 @@
+from typing import Callable, Dict, Optional
+import os
+import re
+from sexpr_reader import parse_netlist
+from symbol_cache import open_symbol_cache, SymbolCacheError
+from tracing import add_attributes, traced
+from metrics import ERC_VIOLATIONS
+
+# Electrical rules check over a parsed netlist, in process. SKiDL's ERC
+# only logs free text to <script>.erc in the working directory; this one
+# returns findings as data and runs on every generated circuit, whichever
+# path built it (template, spec or generated code).
+#
+# Nets and pins are nodes of one union-find: every net is joined with each
+# of its pins, so nets that share a pin end up in one group and each group
+# is one electrical node of the real circuit. The checks then look at each
+# group and each part once, with pin electrical types (passive, input,
+# power_out, ...) read from the memory-mapped symbol index, so a check costs
+# O(parts + pins) plus one symbol lookup per distinct symbol.
+#
+#   shorted_nets           differently named nets share a pin         error
+#   power_short            two power rails share a node               error
+#   pin_conflict           outputs driving each other                 error
+#   unknown_pin            a net names a pin the symbol lacks         error
+#   unconnected_pin        a part's pin is on no net                  warning
+#   single_pin_net         a non-rail net reaches only one pin        warning
+#   power_not_driven       power inputs with no power output          warning
+#   input_not_driven       inputs with nothing driving them           warning
+#   no_connect_connected   a no-connect pin is wired up               warning
+#   unknown_symbol         the part is not in the symbol libraries    warning
+#
+# Rails (GND, VCC, +5V, 3V3, ... or a net carrying a power symbol) are
+# supplied from off the board: they may reach a single pin and need no
+# driver in the circuit itself.
+
+ERROR = "error"
+WARNING = "warning"
+
+POWER_LIBRARY = "power"
+POWER_FLAG = "PWR_FLAG"
+
+_RAIL_NAME = re.compile(r'^(?:[+-]?\d+(?:\.\d+)?V\d*|[+-]?(?:[AD]?GND|VSS|VEE|VCC|VDD|VBAT|VBUS|VIN|VPP)\w*)$', re.IGNORECASE)
+
+# Pins that can drive an input
+_DRIVERS = frozenset({"output", "power_out", "bidirectional", "tri_state", "passive",
+                      "open_collector", "open_emitter", "unspecified"})
+# Pin type pairs that must never share a node
+_CONFLICTS = (("output", "output"), ("output", "power_out"), ("power_out", "power_out"),
+              ("output", "open_collector"), ("output", "open_emitter"),
+              ("power_out", "open_collector"), ("power_out", "open_emitter"))
+
+def is_rail_name(net_name: str) -> bool:
+    """True for net names of power rails (GND, VCC, +5V, 3V3, ...)"""
+    return bool(_RAIL_NAME.match(net_name.lstrip('/')))
+
+class UnionFind:
+    """Disjoint sets over 0..size-1 with path halving and union by size"""
+    def __init__(self, size: int = 0):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def add(self) -> int:
+        self.parent.append(len(self.parent))
+        self.size.append(1)
+        return len(self.parent) - 1
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> int:
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+def symbol_pin_types(libraries_dir: str = "libraries") -> Callable[[str, str], Optional[Dict[str, str]]]:
+    """
+    Return a lookup (lib, symbol) -> {pin_number: electrical type}, or None
+    for symbols the libraries lack. Each symbol is looked up once.
+    """
+    types = {}
+
+    def lookup(lib, part):
+        key = (lib, part)
+        if key not in types:
+            try:
+                types[key] = open_symbol_cache(os.path.join(libraries_dir, f"{lib}.kicad_sym")).pin_types(part)
+            except (OSError, SymbolCacheError):
+                types[key] = None
+        return types[key]
+    return lookup
+
+def _violation(severity, code, message, pins=(), nets=(), refs=None):
+    """One finding; pins are (ref, pin) pairs, refs default to their parts"""
+    return {"severity": severity, "code": code, "message": message,
+            "refs": sorted(set(refs if refs is not None else (ref for ref, _ in pins))),
+            "nets": sorted(set(nets)), "pins": [f"{ref}.{pin}" for ref, pin in pins]}
+
+def _pin_list(pins):
+    return ", ".join(f"{ref}.{pin}" for ref, pin in pins)
+
+def _label(names):
+    return " / ".join(names)
+
+@traced("erc.run")
+def run_erc(comp_map: Dict, net_map: Dict, libraries_dir: str = "libraries",
+            pin_types: Optional[Callable[[str, str], Optional[Dict[str, str]]]] = None) -> Dict:
+    """
+    Check a parsed netlist
+    Args:
+        comp_map: {ref: (value, lib, part)} as returned by parse_netlist
+        net_map: {net_name: [(ref, pin), ...]}
+        libraries_dir: Directory holding the .kicad_sym libraries
+        pin_types: Lookup (lib, part) -> {pin: type}; defaults to the symbol index
+    Returns:
+        {"ok", "errors", "warnings", "violations": [{"severity", "code", "message",
+         "refs", "nets", "pins"}], "parts", "nets", "pins"}; ok is False when
+         there are errors
+    """
+    lookup = pin_types or symbol_pin_types(libraries_dir)
+    violations = []
+
+    # Electrical type of every pin of every known part
+    part_types = {}
+    for ref, (value, lib, part) in comp_map.items():
+        types = lookup(lib, part)
+        if types is None:
+            violations.append(_violation(WARNING, "unknown_symbol", f"{ref}: no symbol {lib}:{part} in the libraries, its pins are not checked", refs=[ref]))
+        else:
+            part_types[ref] = types
+
+    # One node per net and per distinct pin; each net is joined with its pins
+    sets = UnionFind(len(net_map))
+    net_names = list(net_map)
+    pin_ids = {}
+    pin_nets = {}  # Distinct nets naming each pin
+    last_net = {}
+    for net_id, nodes in enumerate(net_map.values()):
+        for node in nodes:
+            pin_id = pin_ids.get(node)
+            if pin_id is None:
+                pin_id = pin_ids[node] = sets.add()
+            if last_net.get(node) != net_id:
+                last_net[node] = net_id
+                pin_nets[node] = pin_nets.get(node, 0) + 1
+            sets.union(net_id, pin_id)
+
+    groups = {}
+    for net_id, name in enumerate(net_names):
+        if net_map[name]:
+            groups.setdefault(sets.find(net_id), ([], []))[0].append(name)
+    for node, pin_id in pin_ids.items():
+        groups[sets.find(pin_id)][1].append(node)
+
+    for names, pins in groups.values():
+        rails = {name.lstrip('/').upper() for name in names if is_rail_name(name)}
+        by_type = {}
+        for ref, pin in pins:
+            if ref in comp_map and comp_map[ref][1] == POWER_LIBRARY and comp_map[ref][2] != POWER_FLAG:
+                rails.add(comp_map[ref][2].upper())
+            types = part_types.get(ref)
+            if types is None:
+                continue
+            pin_type = types.get(pin)
+            if pin_type is None:
+                violations.append(_violation(ERROR, "unknown_pin", f"Net {_label(names)}: {ref} ({comp_map[ref][1]}:{comp_map[ref][2]}) has no pin {pin}",
+                                             [(ref, pin)], names))
+            else:
+                by_type.setdefault(pin_type, []).append((ref, pin))
+
+        if len(rails) > 1:
+            violations.append(_violation(ERROR, "power_short", f"Power rails {', '.join(sorted(rails))} are shorted together (nets {_label(names)})",
+                                         nets=names, refs=[ref for ref, _ in pins]))
+        elif len(names) > 1:
+            shared = [node for node in pins if pin_nets[node] > 1]
+            violations.append(_violation(ERROR, "shorted_nets", f"Nets {', '.join(names)} are one node: they share {_pin_list(shared)}",
+                                         shared, names))
+
+        for a, b in _CONFLICTS:
+            if a in by_type and b in by_type and (a != b or len(by_type[a]) > 1):
+                drivers = by_type[a] + (by_type[b] if a != b else [])
+                violations.append(_violation(ERROR, "pin_conflict", f"Net {_label(names)}: {a} and {b} pins drive each other ({_pin_list(drivers)})",
+                                             drivers, names))
+
+        if "no_connect" in by_type and len(pins) > 1:
+            violations.append(_violation(WARNING, "no_connect_connected", f"Net {_label(names)}: no-connect pins {_pin_list(by_type['no_connect'])} are wired",
+                                         by_type['no_connect'], names))
+
+        if rails:
+            continue
+        if len(pins) == 1:
+            violations.append(_violation(WARNING, "single_pin_net", f"Net {_label(names)} only reaches {_pin_list(pins)}", pins, names))
+        if "power_in" in by_type and "power_out" not in by_type:
+            violations.append(_violation(WARNING, "power_not_driven", f"Net {_label(names)}: power inputs {_pin_list(by_type['power_in'])} have no power output driving them",
+                                         by_type['power_in'], names))
+        if "input" in by_type and _DRIVERS.isdisjoint(by_type):
+            violations.append(_violation(WARNING, "input_not_driven", f"Net {_label(names)}: inputs {_pin_list(by_type['input'])} are not driven",
+                                         by_type['input'], names))
+
+    # Pins of known parts that no net reaches
+    connected = {}
+    for ref, pin in pin_ids:
+        connected.setdefault(ref, set()).add(pin)
+    for ref, types in part_types.items():
+        if comp_map[ref][1] == POWER_LIBRARY:
+            continue
+        on_nets = connected.get(ref, ())
+        open_pins = [pin for pin, pin_type in types.items() if pin_type != "no_connect" and pin not in on_nets]
+        if open_pins:
+            violations.append(_violation(WARNING, "unconnected_pin", f"{ref} ({comp_map[ref][1]}:{comp_map[ref][2]}): pin{'s' if len(open_pins) > 1 else ''} {', '.join(open_pins)} not connected",
+                                         [(ref, pin) for pin in open_pins]))
+
+    for v in violations:
+        ERC_VIOLATIONS.labels(v['code'], v['severity']).inc()
+    errors = sum(1 for v in violations if v['severity'] == ERROR)
+    warnings = len(violations) - errors
+    add_attributes(errors=errors, warnings=warnings, pins=len(pin_ids))
+    return {"ok": errors == 0, "errors": errors, "warnings": warnings, "violations": violations,
+            "parts": len(comp_map), "nets": len(net_map), "pins": len(pin_ids)}
+
+def check_netlist(netlist_path: str, libraries_dir: str = "libraries") -> Dict:
+    """Parse a KiCad netlist file and run the ERC on it"""
+    with open(netlist_path, 'r', encoding='utf-8') as f:
+        comp_map, net_map = parse_netlist(f.read())
+    return run_erc(comp_map, net_map, libraries_dir)
+
+def erc_summary(report: Dict) -> str:
+    """One-line outcome of an ERC for logs and chat responses"""
+    if not report['violations']:
+        return "ERC passed"
+    parts = []
+    if report['errors']:
+        parts.append(f"{report['errors']} error{'s' if report['errors'] != 1 else ''}")
+    if report['warnings']:
+        parts.append(f"{report['warnings']} warning{'s' if report['warnings'] != 1 else ''}")
+    return "ERC: " + ", ".join(parts)
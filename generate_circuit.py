@@ -1,15 +1,29 @@
 import os
 import json
-import urllib.request
 import subprocess
 import shutil
 import tempfile
 import zipfile
 import re
 import uuid
+import functools
+import threading
 from datetime import datetime
-from skidl import *
-from skidl.pyspice import *
+from artifact_store import get_artifact_store
+from workspace import allocate_workspace
+from placement import place_components, PAPER_SIZES, SHEET_MARGIN, TITLE_BLOCK_HEIGHT
+from routing import route_nets
+from symbol_cache import open_symbol_cache, SymbolCacheError
+from circuit_spec import parse_circuit_spec
+from circuit_compiler import compile_to_netlist, spec_summary
+from circuit_review import circuit_data_from_netlist
+from erc import check_netlist, erc_summary, run_erc
+from sexpr_reader import collect_pins, parse_netlist, parse_sexpr, sexpr_child, sexpr_value
+from sexpr_writer import SExprWriter, fmt_mm, quote, FONT_EFFECTS, LABEL_EFFECTS, WIRE_STROKE
+from tracing import span, traced
+from metrics import PROJECT_BUILD_SECONDS, count_cache, observe_build
+from request_log import annotate, logged_request
+from profiling import profile_request
 
 def find_closest_e12_value(target_value):
     """Find the closest E12 resistor value"""
@@ -47,8 +61,9 @@ def log(msg):
     """Log messages with timestamp"""
     print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
 
+@traced("env.setup")
 def setup_kicad_env():
-    """Setup KiCad environment and download required libraries"""
+    """Setup KiCad environment and provision the required libraries"""
     print("[{}] Setting up KiCad environment...".format(datetime.now().strftime("%H:%M:%S")))
     try:
         # Add KiCad 9 bin directory to PATH if not already there
@@ -59,29 +74,24 @@ def setup_kicad_env():
         # Create libraries directory
         libraries_dir = os.path.join(os.getcwd(), 'libraries')
         os.makedirs(libraries_dir, exist_ok=True)
-        # Required libraries with their URLs
-        required_libs = {
-            'Device.kicad_sym': 'https://gitlab.com/kicad/libraries/kicad-symbols/-/raw/master/Device.kicad_sym',
-            'power.kicad_sym': 'https://gitlab.com/kicad/libraries/kicad-symbols/-/raw/master/power.kicad_sym',
-            'LED.kicad_sym': 'https://gitlab.com/kicad/libraries/kicad-symbols/-/raw/master/LED.kicad_sym'
-        }
-        # Download missing libraries
-        for lib_name, lib_url in required_libs.items():
-            lib_path = os.path.join(libraries_dir, lib_name)
-            if not os.path.exists(lib_path):
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Downloading {lib_name}...")
-                try:
-                    urllib.request.urlretrieve(lib_url, lib_path)
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] ✓ Downloaded {lib_name}")
-                except Exception as e:
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] ✗ Failed to download {lib_name}: {e}")
-                    return False
-            else:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] ✓ {lib_name} already exists")
+        # Install the pinned libraries from a local bundle, mirror or upstream,
+        # verifying every file against its checksum
+        from library_bundle import provision_libraries, LibraryError
+        try:
+            with span("env.libraries") as libraries_span:
+                provisioned = provision_libraries(libraries_dir)
+                libraries_span.set(present=len(provisioned['present']), installed=len(provisioned['installed']))
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ✓ Symbol libraries verified")
+        except LibraryError as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ✗ {e}")
+            return False
         # Add the local libraries directory to skidl's search path
-        from skidl import lib_search_paths
+        from skidl import lib_search_paths, set_default_tool, KICAD, Part
+        stop_skidl_file_output()
         if isinstance(lib_search_paths, list):
-            lib_search_paths.append(os.path.abspath(libraries_dir))
+            # Repeated setup calls must not grow the search path
+            if os.path.abspath(libraries_dir) not in lib_search_paths:
+                lib_search_paths.append(os.path.abspath(libraries_dir))
         else:
             # If it's a dict, convert to list and add
             lib_search_paths = [os.path.abspath(libraries_dir)]
@@ -100,10 +110,37 @@ def setup_kicad_env():
         print(f"[{datetime.now().strftime('%H:%M:%S')}] ✗ KiCad environment setup failed: {e}")
         return False
 
-def create_kicad_project(circuit_name: str, output_dir: str) -> str:
-    """Create a KiCad project file (.kicad_pro) that can be opened directly in KiCad"""
-    project_file = os.path.join(output_dir, f"{circuit_name}.kicad_pro")
-    
+# SKiDL builds into the process-global default_circuit, so in-process
+# builds from concurrent threads must not interleave
+_skidl_lock = threading.RLock()
+
+def skidl_serialized(func):
+    """Run func while holding the process-wide SKiDL build lock"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _skidl_lock:
+            return func(*args, **kwargs)
+    return wrapper
+
+def stop_skidl_file_output():
+    """
+    Switch off SKiDL's log files. Importing SKiDL opens <script>.log and
+    <script>.erc in the working directory; the run_erc() report in each
+    result replaces them.
+    """
+    from skidl.logger import stop_log_file_output
+    try:
+        stop_log_file_output()
+    except OSError:
+        pass  # Already removed by another process in the same directory
+
+@functools.lru_cache(maxsize=1)
+def kicad_project_template() -> str:
+    """
+    Return the .kicad_pro JSON shared by every generated project. It does
+    not depend on the circuit, so it is built and serialized once per
+    process; call kicad_project_template.cache_clear() to rebuild it.
+    """
     # Create a basic KiCad project structure
     project_data = {
   "board": {
@@ -378,14 +415,23 @@ def create_kicad_project(circuit_name: str, output_dir: str) -> str:
         "sheets": [],
         "text_variables": {}
     }
+    return json.dumps(project_data, indent=2)
+
+def create_kicad_project(circuit_name: str, output_dir: str) -> str:
+    """Create a KiCad project file (.kicad_pro) that can be opened directly in KiCad"""
+    project_file = os.path.join(output_dir, f"{circuit_name}.kicad_pro")
     
     # Write the project file
-    with open(project_file, 'w', encoding='utf-8') as f:
-        json.dump(project_data, f, indent=2)
+    with open(project_file, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(kicad_project_template())
     
     log(f"✓ Created KiCad project file: {project_file}")
     return project_file
 
+@logged_request("voltage_divider", route="template")
+@traced("circuit.voltage_divider")
+@observe_build("voltage_divider")
+@skidl_serialized
 def create_voltage_divider(input_voltage: float = 5.0, output_voltage: float = 3.3, current: float = 0.001) -> dict:
     """Create a voltage divider circuit"""
     try:
@@ -403,83 +449,97 @@ def create_voltage_divider(input_voltage: float = 5.0, output_voltage: float = 3
         
         # Create circuit name
         circuit_name = f"voltage_divider_{input_voltage}v_{output_voltage}v"
-        output_dir = os.path.join("kicad_output", "voltage_divider")
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Create KiCad project file
-        project_file = create_kicad_project(circuit_name, output_dir)
-        
-        # Create circuit using SKiDL
-        # from skidl import *  # Already imported at top
-        
-        # Set up circuit
-        default_circuit.name = circuit_name
-        default_circuit.description = f"Voltage divider converting {input_voltage}V to {output_voltage}V"
-        
-        # Define nets with clear naming
-        vcc = Net('VCC')      # Input voltage
-        gnd = Net('GND')      # Ground
-        out = Net('OUT')      # Output voltage
         
-        # Create components
-        r1 = Part("Device", "R", value=f"{r1_standard}Ω")
-        r2 = Part("Device", "R", value=f"{r2_standard}Ω")
-        
-        # Set component properties
-        r1.ref = "R1"
-        r2.ref = "R2"
-        
-        # Connect in proper layout: VCC → R1 → OUT → R2 → GND
-        vcc += r1[1]          # VCC connects to R1 pin 1
-        r1[2] += out          # R1 pin 2 connects to output
-        out += r2[1]          # Output connects to R2 pin 1
-        r2[2] += gnd          # R2 pin 2 connects to ground
-        
-        # Generate netlist
-        netlist_file = os.path.join(output_dir, f"{circuit_name}.net")
-        log(f"Generating netlist: {netlist_file}")
-        generate_netlist(file_=netlist_file)
-        
-        # NEW: convert netlist to KiCad project and create ZIP
-        try:
-            zip_path = net_to_project(netlist_file)
-            # Clean up the netlist file (optional - keep workspace clean)
-            os.remove(netlist_file)
+        # Build in a private scratch directory; results go to the artifact store
+        with allocate_workspace(circuit_name) as workspace:
+            work_dir = workspace.path
             
-            generated_files = [zip_path]
-            log(f"✓ Generated KiCad project ZIP: {zip_path}")
-            log(f"✓ Voltage divider: {input_voltage}V → {output_voltage}V using R1={r1_standard}Ω, R2={r2_standard}Ω")
+            # Create circuit using SKiDL
+            # SKiDL is only loaded once a circuit is actually built
+            from skidl import Part, Net, generate_netlist  # also installs the default_circuit builtin
+            stop_skidl_file_output()
             
-            return {
-                "type": "voltage_divider",
-                "name": circuit_name,
-                "circuit_dir": output_dir,
-                "generated_files": generated_files,
-                "download_label": os.path.basename(zip_path),
-                "download_path": zip_path,
-                "response": f"✅ Circuit generated successfully! Voltage divider converting {input_voltage}V to {output_voltage}V using R1={r1_standard}Ω and R2={r2_standard}Ω",
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            # Set up circuit (start empty so parts never leak between builds)
+            default_circuit.reset()
+            default_circuit.name = circuit_name
+            default_circuit.description = f"Voltage divider converting {input_voltage}V to {output_voltage}V"
             
-        except Exception as e:
-            log(f"Error creating KiCad project: {e}")
-            # Fallback to netlist if KiCad CLI fails
-            generated_files = [netlist_file]
-            return {
-                "type": "voltage_divider",
-                "name": circuit_name,
-                "circuit_dir": output_dir,
-                "generated_files": generated_files,
-                "download_label": os.path.basename(netlist_file),
-                "download_path": netlist_file,
-                "response": f"✅ Circuit generated successfully! Voltage divider converting {input_voltage}V to {output_voltage}V using R1={r1_standard}Ω and R2={r2_standard}Ω (Netlist only - KiCad CLI not available)",
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            # Define nets with clear naming
+            vcc = Net('VCC')      # Input voltage
+            gnd = Net('GND')      # Ground
+            out = Net('OUT')      # Output voltage
+            
+            # Create components
+            r1 = Part("Device", "R", value=f"{r1_standard}Ω")
+            r2 = Part("Device", "R", value=f"{r2_standard}Ω")
+            
+            # Set component properties
+            r1.ref = "R1"
+            r2.ref = "R2"
+            
+            # Connect in proper layout: VCC → R1 → OUT → R2 → GND
+            vcc += r1[1]          # VCC connects to R1 pin 1
+            r1[2] += out          # R1 pin 2 connects to output
+            out += r2[1]          # Output connects to R2 pin 1
+            r2[2] += gnd          # R2 pin 2 connects to ground
+            
+            # Generate netlist
+            netlist_file = os.path.join(work_dir, f"{circuit_name}.net")
+            log(f"Generating netlist: {netlist_file}")
+            with span("netlist.write", tool="skidl") as netlist_span:
+                generate_netlist(file_=netlist_file, do_backup=False)
+                netlist_span.set(bytes=os.path.getsize(netlist_file))
+            erc_report = check_netlist(netlist_file)
+            log(erc_summary(erc_report))
+            
+            # NEW: convert netlist to KiCad project and create ZIP
+            try:
+                zip_path = net_to_project(netlist_file)
+                
+                generated_files = [zip_path]
+                log(f"✓ Generated KiCad project ZIP: {zip_path}")
+                log(f"✓ Voltage divider: {input_voltage}V → {output_voltage}V using R1={r1_standard}Ω, R2={r2_standard}Ω")
+                
+                return {
+                    "type": "voltage_divider",
+                    "name": circuit_name,
+                    "circuit_dir": os.path.dirname(zip_path),
+                    "generated_files": generated_files,
+                    "download_label": f"{circuit_name}.zip",
+                    "download_path": zip_path,
+                    "artifact_hash": os.path.splitext(os.path.basename(zip_path))[0],
+                    "erc": erc_report,
+                    "response": f"✅ Circuit generated successfully! Voltage divider converting {input_voltage}V to {output_voltage}V using R1={r1_standard}Ω and R2={r2_standard}Ω",
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }
+                
+            except Exception as e:
+                log(f"Error creating KiCad project: {e}")
+                # Fallback to netlist if KiCad CLI fails
+                netlist_record = get_artifact_store().put_file(netlist_file, kind="netlist")
+                netlist_file = netlist_record['path']
+                generated_files = [netlist_file]
+                return {
+                    "type": "voltage_divider",
+                    "name": circuit_name,
+                    "circuit_dir": os.path.dirname(netlist_file),
+                    "generated_files": generated_files,
+                    "download_label": f"{circuit_name}.net",
+                    "download_path": netlist_file,
+                    "artifact_hash": netlist_record['hash'],
+                    "erc": erc_report,
+                    "response": f"✅ Circuit generated successfully! Voltage divider converting {input_voltage}V to {output_voltage}V using R1={r1_standard}Ω and R2={r2_standard}Ω (Netlist only - KiCad CLI not available)",
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }
         
     except Exception as e:
         log(f"Error creating voltage divider: {e}")
         return {"error": f"Failed to create voltage divider: {str(e)}"}
 
+@logged_request("rc_low_pass_filter", route="template")
+@traced("circuit.rc_low_pass_filter")
+@observe_build("rc_low_pass_filter")
+@skidl_serialized
 def create_rc_low_pass_filter(cutoff_freq: float = 1000.0) -> dict:
     """Create an RC low-pass filter circuit"""
     try:
@@ -496,83 +556,97 @@ def create_rc_low_pass_filter(cutoff_freq: float = 1000.0) -> dict:
         
         # Create circuit name
         circuit_name = f"rc_low_pass_{cutoff_freq}hz"
-        output_dir = os.path.join("kicad_output", "rc_low_pass_filter")
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Create KiCad project file
-        project_file = create_kicad_project(circuit_name, output_dir)
-        
-        # Create circuit using SKiDL
-        # from skidl import *  # Already imported at top
-        
-        # Set up circuit
-        default_circuit.name = circuit_name
-        default_circuit.description = f"RC low-pass filter with {cutoff_freq}Hz cutoff frequency"
-        
-        # Define nets with clear naming
-        vin = Net('VIN')      # Input signal
-        vout = Net('VOUT')    # Output signal
-        gnd = Net('GND')      # Ground
-        
-        # Create components
-        r1 = Part("Device", "R", value=f"{r_value}Ω")
-        c1 = Part("Device", "C", value=f"{c_standard}F")
-        
-        # Set component properties
-        r1.ref = "R1"
-        c1.ref = "C1"
-        
-        # Connect in proper layout: VIN → R → VOUT → C → GND
-        vin += r1[1]          # Input connects to R pin 1
-        r1[2] += vout         # R pin 2 connects to output
-        vout += c1[1]         # Output connects to C pin 1
-        c1[2] += gnd          # C pin 2 connects to ground
-        
-        # Generate netlist
-        netlist_file = os.path.join(output_dir, f"{circuit_name}.net")
-        log(f"Generating netlist: {netlist_file}")
-        generate_netlist(file_=netlist_file)
         
-        # NEW: convert netlist to KiCad project and create ZIP
-        try:
-            zip_path = net_to_project(netlist_file)
-            # Clean up the netlist file (optional - keep workspace clean)
-            os.remove(netlist_file)
+        # Build in a private scratch directory; results go to the artifact store
+        with allocate_workspace(circuit_name) as workspace:
+            work_dir = workspace.path
             
-            generated_files = [zip_path]
-            log(f"✓ Generated KiCad project ZIP: {zip_path}")
-            log(f"✓ RC filter: {cutoff_freq}Hz cutoff using R={r_value}Ω, C={c_standard}F")
+            # Create circuit using SKiDL
+            # SKiDL is only loaded once a circuit is actually built
+            from skidl import Part, Net, generate_netlist  # also installs the default_circuit builtin
+            stop_skidl_file_output()
             
-            return {
-                "type": "rc_filter",
-                "name": circuit_name,
-                "circuit_dir": output_dir,
-                "generated_files": generated_files,
-                "download_label": os.path.basename(zip_path),
-                "download_path": zip_path,
-                "response": f"✅ Circuit generated successfully! RC low-pass filter with {cutoff_freq}Hz cutoff frequency using R={r_value}Ω and C={c_standard}F",
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            # Set up circuit (start empty so parts never leak between builds)
+            default_circuit.reset()
+            default_circuit.name = circuit_name
+            default_circuit.description = f"RC low-pass filter with {cutoff_freq}Hz cutoff frequency"
             
-        except Exception as e:
-            log(f"Error creating KiCad project: {e}")
-            # Fallback to netlist if KiCad CLI fails
-            generated_files = [netlist_file]
-            return {
-                "type": "rc_filter",
-                "name": circuit_name,
-                "circuit_dir": output_dir,
-                "generated_files": generated_files,
-                "download_label": os.path.basename(netlist_file),
-                "download_path": netlist_file,
-                "response": f"✅ Circuit generated successfully! RC low-pass filter with {cutoff_freq}Hz cutoff frequency using R={r_value}Ω and C={c_standard}F (Netlist only - KiCad CLI not available)",
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            # Define nets with clear naming
+            vin = Net('VIN')      # Input signal
+            vout = Net('VOUT')    # Output signal
+            gnd = Net('GND')      # Ground
+            
+            # Create components
+            r1 = Part("Device", "R", value=f"{r_value}Ω")
+            c1 = Part("Device", "C", value=f"{c_standard}F")
+            
+            # Set component properties
+            r1.ref = "R1"
+            c1.ref = "C1"
+            
+            # Connect in proper layout: VIN → R → VOUT → C → GND
+            vin += r1[1]          # Input connects to R pin 1
+            r1[2] += vout         # R pin 2 connects to output
+            vout += c1[1]         # Output connects to C pin 1
+            c1[2] += gnd          # C pin 2 connects to ground
+            
+            # Generate netlist
+            netlist_file = os.path.join(work_dir, f"{circuit_name}.net")
+            log(f"Generating netlist: {netlist_file}")
+            with span("netlist.write", tool="skidl") as netlist_span:
+                generate_netlist(file_=netlist_file, do_backup=False)
+                netlist_span.set(bytes=os.path.getsize(netlist_file))
+            erc_report = check_netlist(netlist_file)
+            log(erc_summary(erc_report))
+            
+            # NEW: convert netlist to KiCad project and create ZIP
+            try:
+                zip_path = net_to_project(netlist_file)
+                
+                generated_files = [zip_path]
+                log(f"✓ Generated KiCad project ZIP: {zip_path}")
+                log(f"✓ RC filter: {cutoff_freq}Hz cutoff using R={r_value}Ω, C={c_standard}F")
+                
+                return {
+                    "type": "rc_filter",
+                    "name": circuit_name,
+                    "circuit_dir": os.path.dirname(zip_path),
+                    "generated_files": generated_files,
+                    "download_label": f"{circuit_name}.zip",
+                    "download_path": zip_path,
+                    "artifact_hash": os.path.splitext(os.path.basename(zip_path))[0],
+                    "erc": erc_report,
+                    "response": f"✅ Circuit generated successfully! RC low-pass filter with {cutoff_freq}Hz cutoff frequency using R={r_value}Ω and C={c_standard}F",
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }
+                
+            except Exception as e:
+                log(f"Error creating KiCad project: {e}")
+                # Fallback to netlist if KiCad CLI fails
+                netlist_record = get_artifact_store().put_file(netlist_file, kind="netlist")
+                netlist_file = netlist_record['path']
+                generated_files = [netlist_file]
+                return {
+                    "type": "rc_filter",
+                    "name": circuit_name,
+                    "circuit_dir": os.path.dirname(netlist_file),
+                    "generated_files": generated_files,
+                    "download_label": f"{circuit_name}.net",
+                    "download_path": netlist_file,
+                    "artifact_hash": netlist_record['hash'],
+                    "erc": erc_report,
+                    "response": f"✅ Circuit generated successfully! RC low-pass filter with {cutoff_freq}Hz cutoff frequency using R={r_value}Ω and C={c_standard}F (Netlist only - KiCad CLI not available)",
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }
         
     except Exception as e:
         log(f"Error creating RC filter: {e}")
         return {"error": f"Failed to create RC filter: {str(e)}"}
 
+@logged_request("led", route="template")
+@traced("circuit.led")
+@observe_build("led")
+@skidl_serialized
 def create_led_circuit(voltage: float = 5.0, led_voltage: float = 2.0, led_current: float = 0.02) -> dict:
     """Create an LED circuit with current limiting resistor"""
     try:
@@ -588,207 +662,510 @@ def create_led_circuit(voltage: float = 5.0, led_voltage: float = 2.0, led_curre
         
         # Create circuit name
         circuit_name = f"led_circuit_{voltage}v"
-        output_dir = os.path.join("kicad_output", "led_circuit")
-        os.makedirs(output_dir, exist_ok=True)
         
-        # Create KiCad project file
-        project_file = create_kicad_project(circuit_name, output_dir)
-        
-        # Create circuit using SKiDL
-        # from skidl import *  # Already imported at top
-        
-        # Set up circuit
-        default_circuit.name = circuit_name
-        default_circuit.description = f"LED circuit with {voltage}V supply"
-        
-        # Define nets with clear naming
-        vcc = Net('VCC')      # Supply voltage
-        gnd = Net('GND')      # Ground
-        
-        # Create components
-        r1 = Part("Device", "R", value=f"{r_standard}Ω")
-        led1 = Part("Device", "LED", value="LED")
-        
-        # Set component properties
-        r1.ref = "R1"
-        led1.ref = "D1"
-        
-        # Connect in proper layout: VCC → R → LED → GND
-        vcc += r1[1]          # VCC connects to R pin 1
-        r1[2] += led1[1]      # R pin 2 connects to LED anode
-        led1[2] += gnd        # LED cathode connects to ground
+        # Build in a private scratch directory; results go to the artifact store
+        with allocate_workspace(circuit_name) as workspace:
+            work_dir = workspace.path
+            
+            # Create circuit using SKiDL
+            # SKiDL is only loaded once a circuit is actually built
+            from skidl import Part, Net, generate_netlist  # also installs the default_circuit builtin
+            stop_skidl_file_output()
+            
+            # Set up circuit (start empty so parts never leak between builds)
+            default_circuit.reset()
+            default_circuit.name = circuit_name
+            default_circuit.description = f"LED circuit with {voltage}V supply"
+            
+            # Define nets with clear naming
+            vcc = Net('VCC')      # Supply voltage
+            gnd = Net('GND')      # Ground
+            
+            # Create components
+            r1 = Part("Device", "R", value=f"{r_standard}Ω")
+            led1 = Part("Device", "LED", value="LED")
+            
+            # Set component properties
+            r1.ref = "R1"
+            led1.ref = "D1"
+            
+            # Connect in proper layout: VCC → R → LED → GND
+            vcc += r1[1]          # VCC connects to R pin 1
+            r1[2] += led1[1]      # R pin 2 connects to LED anode
+            led1[2] += gnd        # LED cathode connects to ground
+            
+            # Generate netlist
+            netlist_file = os.path.join(work_dir, f"{circuit_name}.net")
+            log(f"Generating netlist: {netlist_file}")
+            with span("netlist.write", tool="skidl") as netlist_span:
+                generate_netlist(file_=netlist_file, do_backup=False)
+                netlist_span.set(bytes=os.path.getsize(netlist_file))
+            erc_report = check_netlist(netlist_file)
+            log(erc_summary(erc_report))
+            
+            # NEW: convert netlist to KiCad project and create ZIP
+            try:
+                zip_path = net_to_project(netlist_file)
+                
+                generated_files = [zip_path]
+                log(f"✓ Generated KiCad project ZIP: {zip_path}")
+                log(f"✓ LED circuit: {voltage}V supply with R={r_standard}Ω current limiting")
+                
+                return {
+                    "type": "led_circuit",
+                    "name": circuit_name,
+                    "circuit_dir": os.path.dirname(zip_path),
+                    "generated_files": generated_files,
+                    "download_label": f"{circuit_name}.zip",
+                    "download_path": zip_path,
+                    "artifact_hash": os.path.splitext(os.path.basename(zip_path))[0],
+                    "erc": erc_report,
+                    "response": f"✅ Circuit generated successfully! LED circuit with {voltage}V supply using R={r_standard}Ω current limiting resistor",
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }
+                
+            except Exception as e:
+                log(f"Error creating KiCad project: {e}")
+                # Fallback to netlist if KiCad CLI fails
+                netlist_record = get_artifact_store().put_file(netlist_file, kind="netlist")
+                netlist_file = netlist_record['path']
+                generated_files = [netlist_file]
+                return {
+                    "type": "led_circuit",
+                    "name": circuit_name,
+                    "circuit_dir": os.path.dirname(netlist_file),
+                    "generated_files": generated_files,
+                    "download_label": f"{circuit_name}.net",
+                    "download_path": netlist_file,
+                    "artifact_hash": netlist_record['hash'],
+                    "erc": erc_report,
+                    "response": f"✅ Circuit generated successfully! LED circuit with {voltage}V supply using R={r_standard}Ω current limiting resistor (Netlist only - KiCad CLI not available)",
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }
         
-        # Generate netlist
-        netlist_file = os.path.join(output_dir, f"{circuit_name}.net")
-        log(f"Generating netlist: {netlist_file}")
-        generate_netlist(file_=netlist_file)
+    except Exception as e:
+        log(f"Error creating LED circuit: {e}")
+        return {"error": f"Failed to create LED circuit: {str(e)}"}
+
+@traced("circuit.from_spec")
+@observe_build("from_spec")
+def create_circuit_from_spec(spec, libraries_dir: str = "libraries") -> dict:
+    """
+    Build a circuit from a declarative circuit spec (see circuit_spec.py)
+    The spec is validated against the symbol libraries and compiled to a
+    netlist in process; no code is generated or executed and SKiDL is not
+    loaded.
+    """
+    circuit_name = "circuit"
+    try:
+        spec = parse_circuit_spec(spec)
+        circuit_name = spec['name']
         
-        # NEW: convert netlist to KiCad project and create ZIP
-        try:
-            zip_path = net_to_project(netlist_file)
-            # Clean up the netlist file (optional - keep workspace clean)
-            os.remove(netlist_file)
+        # Build in a private scratch directory; results go to the artifact store
+        with allocate_workspace(circuit_name) as workspace:
+            netlist_file = os.path.join(workspace.path, f"{circuit_name}.net")
+            with span("spec.compile") as compile_span:
+                circuit = compile_to_netlist(spec, netlist_file, libraries_dir)
+            log(f"✓ Compiled netlist: {netlist_file} ({compile_span.duration_ms:.1f} ms)")
+            erc_report = run_erc({ref: (value, lib, symbol) for ref, value, lib, symbol, _ in circuit['components']},
+                                 circuit['nets'], libraries_dir)
+            log(erc_summary(erc_report))
             
-            generated_files = [zip_path]
+            zip_path = net_to_project(netlist_file)
             log(f"✓ Generated KiCad project ZIP: {zip_path}")
-            log(f"✓ LED circuit: {voltage}V supply with R={r_standard}Ω current limiting")
             
             return {
-                "type": "led_circuit",
+                "type": "custom",
                 "name": circuit_name,
-                "circuit_dir": output_dir,
-                "generated_files": generated_files,
-                "download_label": os.path.basename(zip_path),
+                "circuit_dir": os.path.dirname(zip_path),
+                "generated_files": [zip_path],
+                "download_label": f"{circuit_name}.zip",
                 "download_path": zip_path,
-                "response": f"✅ Circuit generated successfully! LED circuit with {voltage}V supply using R={r_standard}Ω current limiting resistor",
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-            
-        except Exception as e:
-            log(f"Error creating KiCad project: {e}")
-            # Fallback to netlist if KiCad CLI fails
-            generated_files = [netlist_file]
-            return {
-                "type": "led_circuit",
-                "name": circuit_name,
-                "circuit_dir": output_dir,
-                "generated_files": generated_files,
-                "download_label": os.path.basename(netlist_file),
-                "download_path": netlist_file,
-                "response": f"✅ Circuit generated successfully! LED circuit with {voltage}V supply using R={r_standard}Ω current limiting resistor (Netlist only - KiCad CLI not available)",
+                "artifact_hash": os.path.splitext(os.path.basename(zip_path))[0],
+                "erc": erc_report,
+                "response": f"✅ Circuit generated successfully! {circuit['description'] or circuit_name}: {spec_summary(circuit)}",
+                "circuit_data": circuit_data_from_netlist(
+                    circuit_name, circuit['description'],
+                    {ref: (value, lib, symbol) for ref, value, lib, symbol, _ in circuit['components']},
+                    circuit['nets']
+                ),
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
-        
+    
     except Exception as e:
-        log(f"Error creating LED circuit: {e}")
-        return {"error": f"Failed to create LED circuit: {str(e)}"}
+        log(f"Error creating circuit {circuit_name}: {e}")
+        return {"error": f"Failed to create circuit: {str(e)}"}
+
+# Namespace for deterministic schematic UUIDs (uuid5 of project, then of each item key)
+SCHEMATIC_UUID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "kicad-ai-circuit-generator/schematic")
 
-def net_to_project(netlist_path):
+# Fixed timestamp for ZIP entries so identical projects zip to identical bytes
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+def make_uuid_factory(project_name: str, deterministic: bool = True):
+    """
+    Return a function that maps an item key, e.g. ("wire", net, ref, pin),
+    to a UUID string. Deterministic mode derives UUIDv5 values from the
+    project name and the key; otherwise every call returns a fresh uuid4.
+    """
+    if not deterministic:
+        return lambda *key: str(uuid.uuid4())
+    project_ns = uuid.uuid5(SCHEMATIC_UUID_NAMESPACE, project_name)
+    return lambda *key: str(uuid.uuid5(project_ns, "/".join(str(k) for k in key)))
+
+@functools.lru_cache(maxsize=None)
+def _read_symbol_library(lib_file):
+    """Read a .kicad_sym library once per process"""
+    with open(lib_file, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def _find_symbol_block(library, part):
+    """Return the text of the top-level (symbol "part" ...) block, or None"""
+    needle = f'(symbol "{part}"'
+    start = library.find(needle)
+    while start >= 0 and not library[start + len(needle)].isspace():
+        start = library.find(needle, start + 1)
+    if start < 0:
+        return None
+
+    depth = 0
+    in_string = False
+    i = start
+    while i < len(library):
+        ch = library[i]
+        if in_string:
+            if ch == '\\':
+                i += 1
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+            if depth == 0:
+                return library[start:i + 1]
+        i += 1
+    return None
+
+@functools.lru_cache(maxsize=256)
+def get_pin_locations(part: str, lib_file: str) -> dict:
+    """
+    Get pin connection points for a symbol in a .kicad_sym library
+    Returns:
+        Dictionary of {pin_number: (x, y)} relative to the symbol origin
+    """
+    if not os.path.exists(lib_file):
+        return {}
+    try:
+        # Shared, memory-mapped cache compiled once per library version
+        pins = open_symbol_cache(lib_file).pins(part)
+        return pins if pins is not None else {}
+    except (OSError, SymbolCacheError) as e:
+        log(f"⚠ Symbol cache unavailable for {os.path.basename(lib_file)}, parsing the library: {e}")
+    return _parse_pin_locations(part, lib_file)
+
+def _parse_pin_locations(part: str, lib_file: str) -> dict:
+    """Read a symbol's pin points straight from the library text"""
+    block = _find_symbol_block(_read_symbol_library(lib_file), part)
+    if block is None:
+        return {}
+    symbol = parse_sexpr(block)[0]
+    parent = sexpr_value(symbol, 'extends')
+    if parent:
+        return _parse_pin_locations(parent, lib_file)
+    pins = {}
+    collect_pins(symbol, pins)
+    return pins
+
+def _normalize_netlist(netlist, make_uuid):
+    """Replace run-specific stamps (date, SKiDL tags, random tstamps) in a netlist"""
+    netlist = re.sub(r'\(date "[^"]*"\)', '(date "")', netlist)
+    netlist = re.sub(r'(\(name "SKiDL Tag"\)) "[^"]*"', r'\1 ""', netlist)
+
+    def stamp_comp(match):
+        ref = match.group(1)
+        return re.sub(r'\(tstamps "[0-9a-fA-F-]{36}"\)',
+                      lambda m: f'(tstamps "{make_uuid("netlist", ref)}")',
+                      match.group(0))
+
+    return re.sub(r'\(comp\s*\(ref\s+"([^"]*)"\).*?(?=\(comp\s*\(ref|\(nets|\Z)',
+                  stamp_comp, netlist, flags=re.DOTALL)
+
+def write_project_zip(project_dir: str, zip_path: str, deterministic: bool = True) -> str:
+    """
+    Zip a project directory. In deterministic mode entries are written in
+    sorted order with fixed timestamps and permissions.
+    """
+    entries = []
+    for root, _, files in os.walk(project_dir):
+        for file in files:
+            file_path = os.path.join(root, file)
+            entries.append((os.path.relpath(file_path, project_dir).replace(os.sep, '/'), file_path))
+    entries.sort()
+
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for arcname, file_path in entries:
+            if not deterministic:
+                zipf.write(file_path, arcname)
+                continue
+            info = zipfile.ZipInfo(arcname, date_time=ZIP_EPOCH)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            with open(file_path, 'rb') as f:
+                zipf.writestr(info, f.read())
+    return zip_path
+
+def _placement_cell_size(comp_map, part_pins):
+    """Size the placement grid cell to fit the largest symbol's pins plus labels"""
+    half_w, half_h = 5.08, 5.08
+    seen = set()
+    for ref, (value, lib, part) in comp_map.items():
+        if (lib, part) in seen:
+            continue
+        seen.add((lib, part))
+        for pin_x, pin_y in part_pins(ref).values():
+            half_w = max(half_w, abs(pin_x))
+            half_h = max(half_h, abs(pin_y))
+    # Room for the 5.08mm label stubs and the label text on either side
+    return (min(2 * half_w + 25.4, 101.6), min(2 * half_h + 10.16, 101.6))
+
+def _symbol_body(pins, x, y):
+    """Approximate a symbol body as the box just inside its pin tips"""
+    half_w = max([abs(px) - 1.27 for px, _ in pins.values()] + [1.27])
+    half_h = max([abs(py) - 1.27 for _, py in pins.values()] + [1.27])
+    return (x - half_w, y - half_h, x + half_w, y + half_h)
+
+def _root_sheet_layout(num_sheets):
+    """Pick the smallest paper whose grid of sheet links fits num_sheets"""
+    for paper, (width, height) in PAPER_SIZES.items():
+        cols = int((width - 2 * SHEET_MARGIN) // 40.64)
+        rows = int((height - 2 * SHEET_MARGIN - TITLE_BLOCK_HEIGHT) // 25.4)
+        if cols * rows >= num_sheets:
+            break
+    return paper, cols
+
+def _group_by_sheet(items, num_sheets):
+    """Split (sheet, ...) tuples into one list per sheet, keeping their order"""
+    grouped = [[] for _ in range(num_sheets)]
+    for item in items:
+        grouped[item[0]].append(item)
+    return grouped
+
+def _write_sheet_symbol(w, sheet_name, sheet_uuid, index, cols):
+    """Write the root-sheet entry that links to a sub-sheet"""
+    col, row = index % cols, index // cols
+    x, y = SHEET_MARGIN + col * 40.64, SHEET_MARGIN + row * 25.4
+    w.begin('(sheet (at ', fmt_mm(x), ' ', fmt_mm(y), ') (size 30.48 15.24)')
+    w.line('(stroke (width 0.1524) (type solid) (color 0 0 0 0))')
+    w.line('(fill (color 0 0 0 0.0000))')
+    w.line('(uuid ', sheet_uuid, ')')
+    w.line('(property "Sheet name" ', quote(sheet_name), ' (id 0) (at ', fmt_mm(x), ' ', fmt_mm(y - 0.71), ' 0) (effects (font (size 1.27 1.27)) (justify left bottom)))')
+    w.line('(property "Sheet file" ', quote(f"{sheet_name}.kicad_sch"), ' (id 1) (at ', fmt_mm(x), ' ', fmt_mm(y + 15.83), ' 0) (effects (font (size 1.27 1.27)) (justify left top)))')
+    w.end()
+
+def _write_schematic(sch_path, sheet_uuid, paper, write_items, compress=False):
+    """
+    Stream one .kicad_sch file
+    Args:
+        write_items: Callable taking the SExprWriter; emits the sheet's items
+        compress: Gzip the output (KiCad itself only opens plain files)
+    """
+    with SExprWriter(sch_path, compress=compress) as w:
+        w.begin('(kicad_sch (version 20211123) (generator "skidl_agent")')
+        w.line('(uuid ', sheet_uuid, ')')
+        w.line('(paper ', quote(paper), ')')
+        write_items(w)
+        w.end() # Close the kicad_sch block
+
+def net_to_project(netlist_path, deterministic=True, store=None):
     """
     Creates a full KiCad project from a SKiDL-generated netlist,
     including a graphically drawn schematic.
+
+    With deterministic=True (the default) every UUID is derived from the
+    project name and the (ref, net, pin) it belongs to, run-specific stamps
+    are stripped from the copied netlist and the ZIP uses fixed timestamps,
+    so identical circuits produce byte-identical .kicad_sch, .kicad_pro
+    and ZIP output.
+
+    The project is built in a private scratch directory and the ZIP is
+    written to the content-addressed artifact store; the stored path is
+    returned.
     """
     project_name = os.path.splitext(os.path.basename(netlist_path))[0]
-    project_dir = os.path.join("kicad_projects", project_name)
-    if os.path.exists(project_dir):
-        shutil.rmtree(project_dir)
+    with allocate_workspace(project_name) as workspace:
+        with span("project.build", project=project_name) as build_span:
+            pins_before = get_pin_locations.cache_info()
+            zip_path = _build_project_zip(netlist_path, project_name, workspace.path, deterministic)
+            pins_after = get_pin_locations.cache_info()
+            build_span.set(pin_cache_hits=pins_after.hits - pins_before.hits,
+                           pin_cache_misses=pins_after.misses - pins_before.misses)
+        PROJECT_BUILD_SECONDS.observe(build_span.duration_ms / 1000)
+        count_cache("pin_locations", True, pins_after.hits - pins_before.hits)
+        count_cache("pin_locations", False, pins_after.misses - pins_before.misses)
+        record = (store or get_artifact_store()).put_file(
+            zip_path, name=f"{project_name}.zip", kind="kicad_project",
+            metadata={"project": project_name}
+        )
+        return record['path']
+
+def _build_project_zip(netlist_path, project_name, build_dir, deterministic):
+    """Write the project files for a netlist into build_dir and zip them"""
+    project_dir = os.path.join(build_dir, project_name)
     os.makedirs(project_dir)
+    make_uuid = make_uuid_factory(project_name, deterministic)
 
     # 1. Create the .kicad_pro file
-    pro_path = os.path.join(project_dir, f"{project_name}.kicad_pro")
     create_kicad_project(project_name, project_dir)
 
-    # 2. Copy the netlist file (can be useful for debugging)
-    shutil.copy(netlist_path, project_dir)
+    # 2. --- Parse netlist for components and nets ---
+    with span("project.parse") as parse_span:
+        with open(netlist_path, 'r', encoding='utf-8') as f:
+            netlist = f.read()
+        comp_map, net_map = parse_netlist(netlist)
+        parse_span.set(bytes=len(netlist), components=len(comp_map), nets=len(net_map))
 
-    # 3. --- Parse netlist for components and nets ---
-    with open(netlist_path, 'r') as f:
-        netlist = f.read()
-    
-    # Find all components
-    comp_pattern = re.compile(r'<comp ref="(.*?)">.*?<value>(.*?)</value>.*?<libsource lib="(.*?)" part="(.*?)"', re.DOTALL)
-    comps = comp_pattern.findall(netlist)
-    
-    # Find all nets
-    net_pattern = re.compile(r'<net name="(.*?)" code="(\d+)">(.*?)</net>', re.DOTALL)
-    nets = net_pattern.findall(netlist)
-    
-    # Map: ref -> (value, lib, part)
-    comp_map = {ref: (value, lib, part) for ref, value, lib, part in comps}
-    
-    # Map: net name -> list of (ref, pin)
-    net_map = {}
-    for net_name, code, net_body in nets:
-        net_map[net_name] = re.findall(r'<node ref="(.*?)" pin="(.*?)"', net_body)
-
-    # 4. --- Generate the .kicad_sch file ---
-    sch_path = os.path.join(project_dir, f"{project_name}.kicad_sch")
-
-    # Simple placement algorithm: place components in a column
-    placements = {}
-    x, y = 100.0, 80.0
-    for ref in comp_map.keys():
-        placements[ref] = (x, y)
-        y += 60.0 # spacing
-
-    # Build the schematic file content
-    sch_content = [
-        '(kicad_sch (version 20211123) (generator "skidl_agent")\n',
-        f'  (uuid {uuid.uuid4()})\n',
-        '  (paper "A4")\n'
-    ]
-
-    # Add symbols (components) to the schematic
-    for ref, (value, lib, part) in comp_map.items():
-        pos_x, pos_y = placements[ref]
-        
-        sch_content.append(
-            f'  (symbol (lib_id "{lib}:{part}") (at {pos_x:.2f} {pos_y:.2f} 0) (unit 1) (uuid {uuid.uuid4()})\n'
-            f'    (property "Reference" "{ref}" (at {pos_x:.2f} {pos_y - 2.54:.2f} 0) (effects (font (size 1.27 1.27))))\n'
-            f'    (property "Value" "{value}" (at {pos_x:.2f} {pos_y + 2.54:.2f} 0) (effects (font (size 1.27 1.27))))\n'
-            '  )\n'
-        )
+    # 3. Copy the netlist file (can be useful for debugging)
+    if deterministic:
+        with open(os.path.join(project_dir, os.path.basename(netlist_path)), 'w', encoding='utf-8', newline='\n') as f:
+            f.write(_normalize_netlist(netlist, make_uuid))
+    else:
+        shutil.copy(netlist_path, project_dir)
 
-    # Add wires and net labels
+    # 4. --- Generate the .kicad_sch file(s) ---
     kicad_libs_path = os.path.abspath("libraries")
+
+    def part_pins(ref):
+        value, lib, part = comp_map[ref]
+        return get_pin_locations(part, os.path.join(kicad_libs_path, f"{lib}.kicad_sym"))
+
+    # Place components on a grid grouped by connectivity; big designs
+    # overflow onto hierarchical sub-sheets
+    with span("project.place") as place_span:
+        placement = place_components(list(comp_map.keys()), net_map, cell_size=_placement_cell_size(comp_map, part_pins))
+        place_span.set(sheets=placement.num_sheets, paper=placement.paper)
+    placements = placement.positions
+    refs_by_sheet = [[] for _ in range(placement.num_sheets)]
+    for ref in comp_map:
+        refs_by_sheet[placement.sheets[ref]].append(ref)
+
+    # Collect absolute pin positions and symbol bodies for the router
+    pins_by_net = {}
     for net_name, nodes in net_map.items():
         if len(nodes) < 2: continue # Skip unconnected nets
 
-        net_uuid = uuid.uuid4()
-        
         # Get pin locations for all components in the net
-        pin_coords = {}
+        pin_coords = []
         for ref, pin_num in nodes:
             if ref in comp_map:
-                value, lib, part = comp_map[ref]
-                lib_file = os.path.join(kicad_libs_path, f"{lib}.kicad_sym")
-                
-                pin_locations = get_pin_locations(part, lib_file)
+                pin_locations = part_pins(ref)
                 
                 if pin_num in pin_locations:
                     part_x, part_y = placements[ref]
                     pin_rel_x, pin_rel_y = pin_locations[pin_num]
                     # KiCad uses inverted Y-axis for symbols internally
-                    pin_abs_x = part_x + pin_rel_x 
-                    pin_abs_y = part_y - pin_rel_y
-                    pin_coords[(ref, pin_num)] = (pin_abs_x, pin_abs_y)
-
-        # Draw wires as net labels for simplicity
-        for (ref, pin_num), (px, py) in pin_coords.items():
-            # Draw a short stub from the pin
-            label_x, label_y = (px + 5.08, py) if px < placements[ref][0] else (px - 5.08, py)
-            sch_content.append(
-                f'  (wire (pts (xy {px:.2f} {py:.2f}) (xy {label_x:.2f} {label_y:.2f})) (stroke (width 0.1524) (type default)) (uuid {uuid.uuid4()}))\n'
-            )
-            # Add a net label to the stub
-            sch_content.append(
-                f'  (global_label "{net_name}" (shape input) (at {label_x:.2f} {label_y:.2f} 0) (effects (font (size 1.27 1.27))) (uuid {net_uuid}))\n'
-            )
-
-    sch_content.append(')') # Close the kicad_sch block
-
-    # Write the content to the schematic file
-    with open(sch_path, 'w', encoding='utf-8') as f:
-        f.write("".join(sch_content))
+                    pin_abs_x = round(part_x + pin_rel_x, 2)
+                    pin_abs_y = round(part_y - pin_rel_y, 2)
+                    pin_coords.append((ref, pin_num, placement.sheets[ref], pin_abs_x, pin_abs_y))
+        pins_by_net[net_name] = pin_coords
+
+    bodies = {ref: (placement.sheets[ref], _symbol_body(part_pins(ref), *placements[ref])) for ref in comp_map}
+
+    # Wire short local nets; long nets, rails and blocked nets get labels
+    with span("project.route") as route_span:
+        routing = route_nets(pins_by_net, bodies)
+        route_span.set(nets=len(pins_by_net), wires=len(routing.wires), labels=len(routing.label_pins))
+    wires_by_sheet = _group_by_sheet(routing.wires, placement.num_sheets)
+    junctions_by_sheet = _group_by_sheet(routing.junctions, placement.num_sheets)
+    net_labels_by_sheet = _group_by_sheet(routing.net_labels, placement.num_sheets)
+    label_pins_by_sheet = _group_by_sheet(routing.label_pins, placement.num_sheets)
+
+    def write_sheet_items(sheet):
+        """Return a writer callback that streams one page's items"""
+        def write_items(w):
+            # Components
+            for ref in refs_by_sheet[sheet]:
+                value, lib, part = comp_map[ref]
+                x, y = placements[ref]
+                w.begin('(symbol (lib_id ', quote(f"{lib}:{part}"), ') (at ', fmt_mm(x), ' ', fmt_mm(y), ' 0) (unit 1) (uuid ', make_uuid("symbol", ref), ')')
+                w.line('(property "Reference" ', quote(ref), ' (at ', fmt_mm(x), ' ', fmt_mm(y - 2.54), ' 0) ', FONT_EFFECTS, ')')
+                w.line('(property "Value" ', quote(value), ' (at ', fmt_mm(x), ' ', fmt_mm(y + 2.54), ' 0) ', FONT_EFFECTS, ')')
+                w.end()
+            # Routed wires, junctions and the label naming each routed net
+            for _, net_name, (x1, y1), (x2, y2) in wires_by_sheet[sheet]:
+                w.line('(wire (pts (xy ', fmt_mm(x1), ' ', fmt_mm(y1), ') (xy ', fmt_mm(x2), ' ', fmt_mm(y2), ')) ', WIRE_STROKE,
+                       ' (uuid ', make_uuid("wire", net_name, x1, y1, x2, y2), '))')
+            for _, net_name, (jx, jy) in junctions_by_sheet[sheet]:
+                w.line('(junction (at ', fmt_mm(jx), ' ', fmt_mm(jy), ') (diameter 0) (color 0 0 0 0) (uuid ', make_uuid("junction", net_name, jx, jy), '))')
+            for _, net_name, (lx, ly) in net_labels_by_sheet[sheet]:
+                w.line('(label ', quote(net_name), ' (at ', fmt_mm(lx), ' ', fmt_mm(ly), ' 0) ', LABEL_EFFECTS, ' (uuid ', make_uuid("net_label", net_name), '))')
+            # Short stub from each pin of a labelled net, with a global label on its end
+            for _, net_name, ref, pin_num, (px, py), (label_x, label_y) in label_pins_by_sheet[sheet]:
+                w.line('(wire (pts (xy ', fmt_mm(px), ' ', fmt_mm(py), ') (xy ', fmt_mm(label_x), ' ', fmt_mm(label_y), ')) ', WIRE_STROKE,
+                       ' (uuid ', make_uuid("wire", net_name, ref, pin_num), '))')
+                w.line('(global_label ', quote(net_name), ' (shape input) (at ', fmt_mm(label_x), ' ', fmt_mm(label_y), ' 0) ', FONT_EFFECTS,
+                       ' (uuid ', make_uuid("label", net_name, ref, pin_num), '))')
+        return write_items
+
+    # A single page holds everything in the root sheet; otherwise the root
+    # sheet only links to one sub-sheet per page
+    with span("project.schematic", sheets=placement.num_sheets):
+        if placement.num_sheets == 1:
+            _write_schematic(os.path.join(project_dir, f"{project_name}.kicad_sch"),
+                             make_uuid("sheet", 0), placement.paper, write_sheet_items(0))
+        else:
+            root_paper, root_cols = _root_sheet_layout(placement.num_sheets)
+            for index in range(placement.num_sheets):
+                _write_schematic(os.path.join(project_dir, f"{project_name}_sheet{index + 1}.kicad_sch"),
+                                 make_uuid("sheet", index + 1), placement.paper, write_sheet_items(index))
+
+            def write_root_items(w):
+                for index in range(placement.num_sheets):
+                    _write_sheet_symbol(w, f"{project_name}_sheet{index + 1}", make_uuid("sheet_link", index + 1), index, root_cols)
+                w.begin('(sheet_instances')
+                w.line('(path "/" (page "1"))')
+                for index in range(placement.num_sheets):
+                    w.line('(path "/', make_uuid("sheet_link", index + 1), '" (page "', str(index + 2), '"))')
+                w.end()
+            _write_schematic(os.path.join(project_dir, f"{project_name}.kicad_sch"),
+                             make_uuid("sheet", 0), root_paper, write_root_items)
 
     # 5. Zip the project directory
-    zip_path = os.path.join("kicad_projects", f"{project_name}.zip")
-    with zipfile.ZipFile(zip_path, 'w') as zipf:
-        for root, _, files in os.walk(project_dir):
-            for file in files:
-                zipf.write(os.path.join(root, file),
-                           os.path.relpath(os.path.join(root, file), project_dir))
-    
+    zip_path = os.path.join(build_dir, f"{project_name}.zip")
+    with span("project.zip") as zip_span:
+        write_project_zip(project_dir, zip_path, deterministic)
+        zip_span.set(files=len(os.listdir(project_dir)), bytes=os.path.getsize(zip_path))
     return zip_path
 
 class CircuitGenerator:
-    def __init__(self):
-        self.setup_kicad_environment()
+    def __init__(self, llm_engine_factory=None, setup_environment=True):
+        """
+        Args:
+            llm_engine_factory: Callable returning a shared LLMEngine; by default
+                the generator creates its own on the first custom request
+            setup_environment: Set up the KiCad environment now (skip if the caller already did)
+        """
+        self.llm_engine_factory = llm_engine_factory
+        self._llm_engine = None
+        if setup_environment:
+            self.setup_kicad_environment()
     
     def setup_kicad_environment(self):
         """Setup KiCad environment"""
         return setup_kicad_env()
     
+    @property
+    def llm_engine(self):
+        """The LLM engine, created or fetched on first use"""
+        if self.llm_engine_factory is not None:
+            return self.llm_engine_factory()
+        if self._llm_engine is None:
+            from llm_engine import LLMEngine
+            self._llm_engine = LLMEngine()
+        return self._llm_engine
+    
     def generate_voltage_divider(self, input_voltage=5.0, output_voltage=3.3):
         """Generate voltage divider circuit"""
         return create_voltage_divider(input_voltage, output_voltage)
@@ -801,21 +1178,49 @@ class CircuitGenerator:
         """Generate LED circuit"""
         return create_led_circuit(voltage)
     
-    def generate_custom_circuit(self, user_request: str):
-        """Generate custom circuit using LLM"""
+    @logged_request("custom")
+    def generate_custom_circuit(self, user_request: str, profile: bool = False):
+        """
+        Generate custom circuit using LLM
+        Args:
+            user_request: Description of the circuit
+            profile: Profile this request; the collapsed stacks are stored as
+                a "profile" artifact and returned as result["profile_path"]
+        """
+        with span("request.custom_circuit", request_chars=len(user_request)) as request_span:
+            with profile_request("custom_circuit", profile, metadata={"request": user_request[:200]}) as profiler:
+                result = self._generate_custom_circuit(user_request, request_span)
+            if profiler is not None and isinstance(result, dict):
+                result['profile_path'] = profiler.path
+            return result
+
+    def _generate_custom_circuit(self, user_request: str, request_span) -> dict:
+        """Template, spec or generated-code path for one request"""
         try:
-            # Import LLM engine
-            from llm_engine import LLMEngine
-            
-            # Initialize LLM engine
-            llm_engine = LLMEngine()
-            
             # If voltage divider requested
             if 'voltage_divider' in user_request:
+                request_span.set(path="template")
+                annotate(route="template")
                 return create_voltage_divider(input_voltage=5.0, output_voltage=3.3)
             
-            # Generate circuit using LLM
-            result = llm_engine.generate_and_execute_circuit(user_request)
+            # Ask for a structured circuit spec and compile it in process;
+            # fall back to generating and running SKiDL code if that fails
+            engine = self.llm_engine
+            spec_result = engine.generate_circuit_spec(user_request)
+            if spec_result.get('success'):
+                result = create_circuit_from_spec(spec_result['spec'])
+                if 'error' not in result:
+                    # Review off the request path; the UI shows it once it is ready
+                    engine.submit_review(result['circuit_data'])
+                    request_span.set(path="spec")
+                    annotate(route="spec")
+                    return result
+                log(f"Compiling circuit spec failed, falling back to code generation: {result['error']}")
+            else:
+                log(f"No usable circuit spec, falling back to code generation: {spec_result.get('message')}")
+            request_span.set(path="code")
+            annotate(route="code")
+            result = engine.generate_and_execute_circuit(user_request)
             
             if result and 'error' not in result:
                 return result
@@ -823,6 +1228,7 @@ class CircuitGenerator:
                 return {"error": result.get('error', 'Failed to generate custom circuit')}
                 
         except Exception as e:
+            request_span.set(error=str(e))
             return {"error": f"Error generating custom circuit: {str(e)}"}
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+from typing import Dict, List, Optional
+import threading
+from conversation_memory import estimate_tokens
+from model_tiers import KIND_CHAT, KIND_CODE, KIND_REVIEW, KIND_SPEC
+
+# Generation profiles: per prompt type, a hard cap on reply tokens
+# (num_predict) and stop sequences that end decoding as soon as the part of
+# the reply we use is complete. Without them llama2 keeps explaining after
+# the closing code fence, and every one of those tokens is decoded, paid for
+# and thrown away. The server drops the stop sequence from the reply, so a
+# profile also says how to close a section that was cut at its end marker.
+#
+# A stop sequence must never match the start of the section. A closing code
+# fence looks exactly like a bare opening one, so code replies are asked for
+# between [CODE] and [/CODE] and stop on the tag instead of a fence.
+#
+# GenerationStats counts, per prompt type, how many tokens were generated
+# and how many fell outside the part that is used (GenerationProfile.used),
+# so the caps can be tuned from data.
+
+class GenerationProfile:
+    """Reply limits for one prompt type"""
+    def __init__(self, kind: str, num_predict: int, stop: Optional[List[str]] = None,
+                 opening: Optional[str] = None, closing: Optional[str] = None):
+        """
+        Args:
+            kind: Prompt type (model_tiers.KIND_*)
+            num_predict: Most tokens the reply may use
+            stop: Sequences that end the reply
+            opening, closing: Section markers; a reply stopped with a section
+                still open gets the closing marker back
+        """
+        self.kind = kind
+        self.num_predict = num_predict
+        self.stop = list(stop or [])
+        self.opening = opening
+        self.closing = closing
+
+    def options(self, base: Dict) -> Dict:
+        """Request options with this profile's cap (never above base's) and stop sequences"""
+        options = dict(base)
+        options["num_predict"] = min(self.num_predict, base.get("num_predict", self.num_predict))
+        if self.stop:
+            options["stop"] = list(self.stop)
+        return options
+
+    def finish(self, text: str) -> str:
+        """Restore the closing marker a stop sequence or the cap removed"""
+        if not self.closing:
+            return text
+        unclosed = text.count(self.opening) > text.count(self.closing)
+        return text.rstrip() + "\n" + self.closing if unclosed else text
+
+    def used(self, text: str) -> str:
+        """The part of a finished reply callers use: everything up to the last section"""
+        if not self.closing:
+            return text.strip()
+        end = text.rfind(self.closing)
+        return text[:end + len(self.closing)] if end >= 0 else text.strip()
+
+    def __repr__(self):
+        return f"GenerationProfile({self.kind!r}, num_predict={self.num_predict}, stop={self.stop!r})"
+
+PROFILES = {
+    # [EXPLANATION] [CODE] [INSTRUCTIONS]; nothing after the last section is used
+    KIND_CHAT: GenerationProfile(KIND_CHAT, 1024, stop=["[/INSTRUCTIONS]"],
+                                 opening="[INSTRUCTIONS]", closing="[/INSTRUCTIONS]"),
+    # "Return ONLY the Python code between [CODE] and [/CODE]": stop at the closing tag
+    KIND_CODE: GenerationProfile(KIND_CODE, 1024, stop=["[/CODE]"],
+                                 opening="[CODE]", closing="[/CODE]"),
+    # Schema-constrained JSON ends by itself; the caps stop runaway whitespace
+    KIND_SPEC: GenerationProfile(KIND_SPEC, 1536),
+    KIND_REVIEW: GenerationProfile(KIND_REVIEW, 768),
+}
+
+def get_profile(kind: str) -> GenerationProfile:
+    """The profile for a prompt type"""
+    return PROFILES[kind]
+
+class GenerationStats:
+    """
+    Generated and wasted tokens per prompt type
+
+    Wasted tokens are generated tokens outside the text the caller used.
+    The server reports how many tokens it generated; the used share is
+    estimated locally (conversation_memory.estimate_tokens).
+    """
+    def __init__(self):
+        self._stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, reply: Dict, used: Optional[str] = None) -> int:
+        """
+        Count one reply
+        Args:
+            kind: Prompt type
+            reply: Backend reply ({"response", "completion_tokens", "done_reason"})
+            used: Part of the reply that was kept; None means all of it
+        Returns:
+            Estimated wasted tokens
+        """
+        text = reply.get('response', '')
+        generated = reply.get('completion_tokens') or estimate_tokens(text)
+        wasted = 0
+        if used is not None:
+            total = estimate_tokens(text)
+            if total:
+                wasted = round(generated * max(0, total - estimate_tokens(used)) / total)
+        with self._lock:
+            stats = self._stats.setdefault(kind, {"requests": 0, "generated_tokens": 0, "wasted_tokens": 0,
+                                                  "hit_cap": 0, "stopped": 0})
+            stats["requests"] += 1
+            stats["generated_tokens"] += generated
+            stats["wasted_tokens"] += wasted
+            if reply.get('done_reason') == 'length':
+                stats["hit_cap"] += 1
+            elif reply.get('done_reason') == 'stop':
+                stats["stopped"] += 1
+        return wasted
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Counters per prompt type, with the wasted share of generated tokens"""
+        with self._lock:
+            return {kind: dict(stats, wasted_share=stats["wasted_tokens"] / stats["generated_tokens"]
+                               if stats["generated_tokens"] else 0.0)
+                    for kind, stats in self._stats.items()}
@@ -8,71 +8,107 @@ import json
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from circuit_generator import CircuitGenerator
-from llm_engine import LLMEngine
-from generate_circuit import setup_kicad_env
+from ui_resources import get_kicad_environment, get_llm_engine, get_circuit_generator, invalidate_resources
+from workspace import new_job_id
+
+# Only the newest messages and circuits are rendered on each rerun; older
+# ones are a click away, so render cost stays flat as history grows
+MESSAGE_PAGE_SIZE = 20
+HISTORY_PAGE_SIZE = 10
+
+# Download payloads kept in memory across reruns and sessions
+DOWNLOAD_CACHE_ENTRIES = 64
+
+def is_admin() -> bool:
+    """
+    True when the sidebar shows admin controls (UI_ADMIN=1): reloading
+    resources, which affects every session, and request profiling
+    """
+    return os.environ.get('UI_ADMIN', '') in ('1', 'true', 'yes')
 
 def initialize_session_state():
     """Initialize session state variables"""
     if 'messages' not in st.session_state:
         st.session_state.messages = []
+    if 'circuits' not in st.session_state:
+        st.session_state.circuits = {}  # circuit_id -> circuit_info
     if 'circuit_history' not in st.session_state:
-        st.session_state.circuit_history = []
-    if 'llm_engine' not in st.session_state:
-        st.session_state.llm_engine = None
-    if 'circuit_generator' not in st.session_state:
-        st.session_state.circuit_generator = None
+        st.session_state.circuit_history = []  # circuit_ids, oldest first
+    if 'message_pages' not in st.session_state:
+        st.session_state.message_pages = 1
+
+def record_circuit(circuit_info):
+    """Index a generated circuit by a new ID and add it to the history"""
+    circuit_id = new_job_id()
+    circuit_info['id'] = circuit_id
+    st.session_state.circuits[circuit_id] = circuit_info
+    st.session_state.circuit_history.append(circuit_id)
+    return circuit_id
+
+def add_circuit_message(circuit_info):
+    """Add the assistant message announcing a generated circuit"""
+    st.session_state.messages.append({
+        "role": "assistant",
+        "content": circuit_info['response'],
+        "circuit_id": circuit_info['id']
+    })
+
+@st.cache_resource(max_entries=DOWNLOAD_CACHE_ENTRIES, show_spinner=False)
+def load_download_payload(path: str, mtime: float) -> bytes:
+    """
+    Read a generated file once; reruns reuse the bytes. Artifacts are
+    content-addressed, and mtime is part of the key for anything that isn't.
+    """
+    with open(path, 'rb') as f:
+        return f.read()
 
 def setup_kicad_environment():
-    """Setup KiCad environment"""
+    """Setup KiCad environment (once per process, not on every rerun)"""
     try:
-        setup_kicad_env()
+        get_kicad_environment()
         return True
     except Exception as e:
         st.error(f"Error setting up KiCad environment: {str(e)}")
         return False
 
 def initialize_llm_engine():
-    """Initialize the LLM engine"""
-    if st.session_state.llm_engine is None:
-        try:
-            st.session_state.llm_engine = LLMEngine()
-            return True
-        except Exception as e:
-            st.error(f"Error initializing LLM engine: {str(e)}")
-            return False
-    return True
+    """Initialize the LLM engine shared by all sessions"""
+    try:
+        get_llm_engine()
+        return True
+    except Exception as e:
+        st.error(f"Error initializing LLM engine: {str(e)}")
+        return False
 
 def initialize_circuit_generator():
-    """Initialize the circuit generator"""
+    """Initialize the circuit generator shared by all sessions"""
     try:
-        if 'circuit_generator' not in st.session_state:
-            from generate_circuit import CircuitGenerator
-            st.session_state.circuit_generator = CircuitGenerator()
+        get_circuit_generator()
         return True
     except Exception as e:
         st.error(f"Failed to initialize circuit generator: {str(e)}")
         return False
 
-def generate_circuit_from_llm(user_request: str):
-    """Generate circuit using LLM"""
+def generate_circuit_from_llm(user_request: str, profile: bool = False):
+    """Generate circuit using LLM; profile=True stores a profile of the request"""
     try:
         # Initialize circuit generator if not already done
         if not initialize_circuit_generator():
             st.error("Failed to initialize circuit generator")
             return None
         
-        # Get the circuit generator from session state
-        circuit_generator = st.session_state.circuit_generator
+        # Get the shared circuit generator
+        circuit_generator = get_circuit_generator()
         if not circuit_generator:
             st.error("Circuit generator not available")
             return None
         
         # Generate custom circuit using LLM
-        result = circuit_generator.generate_custom_circuit(user_request)
+        result = circuit_generator.generate_custom_circuit(user_request, profile=profile)
         
         if result and 'error' not in result:
             # Add to circuit history
-            st.session_state.circuit_history.append(result)
+            record_circuit(result)
             return result
         else:
             error_msg = result.get('error', 'Failed to generate circuit') if result else 'Failed to generate circuit'
@@ -113,7 +149,7 @@ def generate_simple_circuit(circuit_type: str):
             return None
         
         # Add to circuit history
-        st.session_state.circuit_history.append(result)
+        record_circuit(result)
         
         return result
         
@@ -125,6 +161,7 @@ def generate_simple_circuit(circuit_type: str):
 
 def display_circuit_info(circuit_info, inside_expander=False):
     """Display circuit information and provide download links for all generated files"""
+    widget_scope = "history" if inside_expander else "chat"
     if circuit_info and 'generated_files' in circuit_info:
         generated_files = circuit_info['generated_files']
         circuit_dir = circuit_info.get('circuit_dir', '')
@@ -138,10 +175,11 @@ def display_circuit_info(circuit_info, inside_expander=False):
         if generated_files:
             main_file = generated_files[0]
             if os.path.exists(main_file):
-                file_name = os.path.basename(main_file)
+                # Artifacts are stored under their hash; the label carries the real name
+                file_name = circuit_info.get('download_label', os.path.basename(main_file))
                 
                 # Determine file type and description
-                if file_name.endswith('.kicad_project.zip'):
+                if file_name.endswith('.zip'):
                     file_type = "KiCad Project"
                     file_description = "Complete KiCad project with schematic (.kicad_sch) and project file (.kicad_pro)"
                     mime_type = "application/zip"
@@ -155,27 +193,25 @@ def display_circuit_info(circuit_info, inside_expander=False):
                     mime_type = "application/octet-stream"
                 
                 try:
-                    with open(main_file, 'rb') as f:
-                        file_content = f.read()
+                    file_content = load_download_payload(main_file, os.path.getmtime(main_file))
                     
                     # Create download button
-                    download_label = circuit_info.get('download_label', file_name)
                     st.download_button(
-                        label=f"📥 Download {download_label}",
+                        label=f"📥 Download {file_name}",
                         data=file_content,
-                        file_name=download_label,
+                        file_name=file_name,
                         mime=mime_type,
-                        key=f"download_{file_name}_{circuit_info['timestamp']}"
+                        key=f"download_{widget_scope}_{circuit_info.get('id', circuit_info['timestamp'])}"
                     )
                     
                     # Show file info
                     st.write(f"**File Type:** {file_type}")
                     st.write(f"**Description:** {file_description}")
-                    st.write(f"**Size:** {os.path.getsize(main_file)} bytes")
+                    st.write(f"**Size:** {len(file_content)} bytes")
                     
                     # Show usage instructions
                     if not inside_expander:
-                        if file_name.endswith('.kicad_project.zip'):
+                        if file_name.endswith('.zip'):
                             with st.expander("📋 How to use this KiCad project"):
                                 st.markdown("""
                                 **To use this KiCad project:**
@@ -193,7 +229,7 @@ def display_circuit_info(circuit_info, inside_expander=False):
                             st.markdown("**Note:** This is a netlist file. Install KiCad CLI to get full schematic projects.")
                     else:
                         # Show condensed instructions when inside expander
-                        if file_name.endswith('.kicad_project.zip'):
+                        if file_name.endswith('.zip'):
                             st.markdown("**Usage:** Extract ZIP → Open `.kicad_pro` in KiCad → View schematic")
                         elif file_name.endswith('.net'):
                             st.markdown("**Note:** Netlist file - KiCad CLI needed for full projects")
@@ -203,6 +239,21 @@ def display_circuit_info(circuit_info, inside_expander=False):
             else:
                 st.warning(f"File not found: {main_file}")
         
+        # Profile of the request, when an admin asked for one
+        profile_path = circuit_info.get('profile_path')
+        if profile_path and os.path.exists(profile_path):
+            st.download_button(
+                label="🔬 Download request profile (collapsed stacks)",
+                data=load_download_payload(profile_path, os.path.getmtime(profile_path)),
+                file_name=f"{circuit_info.get('name', 'request')}.collapsed",
+                mime="text/plain",
+                key=f"profile_{widget_scope}_{circuit_info.get('id', circuit_info['timestamp'])}"
+            )
+        
+        # Electrical rules check of the generated netlist
+        if circuit_info.get('erc'):
+            display_erc_report(circuit_info['erc'], inside_expander)
+        
         # Show circuit details
         st.subheader("🔧 Circuit Details")
         if circuit_info['type'] == 'voltage_divider':
@@ -233,9 +284,62 @@ def display_circuit_info(circuit_info, inside_expander=False):
             elif circuit_info.get('ai_code'):
                 st.markdown("**AI-Generated Code:** Available (view in main chat)")
         
+        elif circuit_info['type'] == 'custom':
+            st.write("**Type:** Custom Circuit")
+            st.write("**Purpose:** Custom circuit based on user request")
+            st.write("**Generated by:** LLM circuit spec, compiled to a netlist")
+        
+        # Show the background design review once it has finished
+        if circuit_info.get('circuit_data') and not inside_expander:
+            display_circuit_review(circuit_info['circuit_data'])
+        
         # Show timestamp
         st.write(f"**Generated:** {circuit_info['timestamp']}")
 
+def display_circuit_review(circuit_data):
+    """Show the cached design review for a circuit, if it is ready, or why it failed"""
+    try:
+        engine = get_llm_engine()
+        review = engine.cached_review(circuit_data)
+        failure = engine.review_failure(circuit_data) if review is None else None
+    except Exception:
+        return
+    if failure is not None:
+        st.warning(f"🔍 Design review failed: {failure}")
+        if st.button("🔁 Retry design review", key=f"retry_review_{engine.reviewer.key(circuit_data)[:16]}"):
+            engine.submit_review(circuit_data)
+            st.rerun()
+        return
+    if review is None:
+        st.caption("🔍 Design review is running in the background and will appear here when ready.")
+        return
+    with st.expander("🔍 Design Review"):
+        st.write(review['summary'])
+        if review['potential_issues']:
+            st.markdown("**Potential issues**")
+            for issue in review['potential_issues']:
+                st.markdown(f"- {issue}")
+        if review['suggestions']:
+            st.markdown("**Suggestions**")
+            for item in review['suggestions']:
+                st.markdown(f"- **{item['category'].capitalize()}:** {item['suggestion']}")
+
+def display_erc_report(erc_report, inside_expander=False):
+    """Show the electrical rules check findings for a circuit"""
+    from erc import erc_summary
+    summary = erc_summary(erc_report)
+    if not erc_report['violations']:
+        st.caption(f"✅ {summary}")
+        return
+    icon = "❌" if erc_report['errors'] else "⚠️"
+    if inside_expander:
+        # Streamlit does not nest expanders
+        st.markdown(f"**{icon} {summary}**")
+        return
+    with st.expander(f"{icon} {summary}"):
+        for violation in erc_report['violations']:
+            st.markdown(f"- **{violation['severity'].capitalize()}** `{violation['code']}`: {violation['message']}")
+
 def main():
     st.set_page_config(
         page_title="KiCad AI Circuit Generator",
@@ -261,49 +365,52 @@ def main():
         if st.button("🔌 Voltage Divider (5V→3.3V)"):
             circuit_info = generate_simple_circuit("voltage_divider")
             if circuit_info:
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": circuit_info['response']
-                })
+                add_circuit_message(circuit_info)
                 st.rerun()
         
         if st.button("🔊 RC Low-Pass Filter (1kHz)"):
             circuit_info = generate_simple_circuit("rc_filter")
             if circuit_info:
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": circuit_info['response']
-                })
+                add_circuit_message(circuit_info)
                 st.rerun()
         
         if st.button("💡 LED Circuit"):
             circuit_info = generate_simple_circuit("led_circuit")
             if circuit_info:
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": circuit_info['response']
-                })
+                add_circuit_message(circuit_info)
                 st.rerun()
         
         st.markdown("---")
         st.markdown("**Or use AI to generate custom circuits!**")
+        
+        if is_admin():
+            st.markdown("---")
+            # Reloading restarts the engine and drops the caches of every session
+            if st.button("🔄 Reload Libraries & LLM"):
+                invalidate_resources()
+                st.rerun()
+            st.checkbox("🔬 Profile the next request", key="profile_next_request",
+                        help="Stores a collapsed-stack profile of the request next to its files")
     
     # Main chat interface
     st.header("💬 AI Circuit Generator")
     st.markdown("Describe any circuit you want to create, and AI will generate it for you!")
     
-    # Display chat messages
-    for message in st.session_state.messages:
+    # Display chat messages, newest pages only
+    messages = st.session_state.messages
+    visible = MESSAGE_PAGE_SIZE * st.session_state.message_pages
+    if len(messages) > visible:
+        if st.button(f"⬆️ Show earlier messages ({len(messages) - visible} hidden)"):
+            st.session_state.message_pages += 1
+            st.rerun()
+    for message in messages[-visible:]:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
             
             # If this is an assistant message with circuit info, show download links
-            if message["role"] == "assistant" and "✅ Circuit generated successfully" in message["content"]:
-                # Find the corresponding circuit info
-                for circuit_info in st.session_state.circuit_history:
-                    if circuit_info['response'] == message["content"]:
-                        display_circuit_info(circuit_info)
-                        break
+            circuit_info = st.session_state.circuits.get(message.get("circuit_id"))
+            if circuit_info:
+                display_circuit_info(circuit_info)
     
     # Chat input
     if prompt := st.chat_input("Describe the circuit you want to create..."):
@@ -317,17 +424,15 @@ def main():
         # Generate response using AI
         with st.chat_message("assistant"):
             with st.spinner("🤖 AI is thinking..."):
-                circuit_info = generate_circuit_from_llm(prompt)
+                profile = st.session_state.pop('profile_next_request', False)
+                circuit_info = generate_circuit_from_llm(prompt, profile=profile)
                 
                 if circuit_info:
                     st.markdown(circuit_info['response'])
                     display_circuit_info(circuit_info)
                     
                     # Add assistant message to chat history
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": circuit_info['response']
-                    })
+                    add_circuit_message(circuit_info)
                 else:
                     error_msg = "❌ Sorry, I couldn't generate that circuit. Please try a different description."
                     st.markdown(error_msg)
@@ -336,10 +441,17 @@ def main():
                         "content": error_msg
                     })
     
-    # Circuit history
-    if st.session_state.circuit_history:
+    # Circuit history, newest first, one page at a time
+    history = st.session_state.circuit_history
+    if history:
         st.header("📚 Circuit History")
-        for i, circuit_info in enumerate(reversed(st.session_state.circuit_history)):
+        num_pages = (len(history) + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+        page = 1
+        if num_pages > 1:
+            page = st.number_input("Page", min_value=1, max_value=num_pages, value=1, step=1, key="history_page")
+        newest = len(history) - (page - 1) * HISTORY_PAGE_SIZE
+        for circuit_id in reversed(history[max(0, newest - HISTORY_PAGE_SIZE):newest]):
+            circuit_info = st.session_state.circuits[circuit_id]
             with st.expander(f"🔧 {circuit_info['name']} - {circuit_info['timestamp']}"):
                 st.markdown(circuit_info['response'])
                 display_circuit_info(circuit_info, inside_expander=True)
@@ -2,8 +2,8 @@ from typing import Dict, List, Optional, Tuple
 from skidl import *
 import os
 import shutil
-import urllib.request
 from datetime import datetime
+from tracing import span, traced
 
 class KiCadWrapper:
     """
@@ -21,6 +21,7 @@ class KiCadWrapper:
         """Log messages with timestamp"""
         print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
         
+    @traced("env.setup")
     def setup_environment(self):
         """Setup KiCad environment and library paths"""
         self.log("Setting up KiCad environment...")
@@ -29,22 +30,12 @@ class KiCadWrapper:
         libraries_dir = os.path.join(os.getcwd(), 'libraries')
         os.makedirs(libraries_dir, exist_ok=True)
         
-        # Download required KiCad libraries if they don't exist
-        required_libs = {
-            'Device.kicad_sym': 'https://gitlab.com/kicad/libraries/kicad-symbols/-/raw/master/Device.kicad_sym',
-            'power.kicad_sym': 'https://gitlab.com/kicad/libraries/kicad-symbols/-/raw/master/power.kicad_sym'
-        }
-        
-        for lib_name, lib_url in required_libs.items():
-            lib_path = os.path.join(libraries_dir, lib_name)
-            if not os.path.exists(lib_path):
-                self.log(f"Downloading {lib_name}...")
-                try:
-                    urllib.request.urlretrieve(lib_url, lib_path)
-                    self.log(f"✓ Downloaded {lib_name}")
-                except Exception as e:
-                    self.log(f"✗ Error downloading {lib_name}: {str(e)}")
-                    raise
+        # Install the pinned libraries from a local bundle, mirror or upstream,
+        # verifying every file against its checksum
+        from library_bundle import provision_libraries
+        with span("env.libraries"):
+            provision_libraries(libraries_dir)
+        self.log("✓ Symbol libraries verified")
         
         # Set up library search paths
         self.lib_search_paths = [os.path.abspath(libraries_dir)]
@@ -79,6 +70,7 @@ class KiCadWrapper:
         self.log(f"Creating net: {name}")
         return Net(name)
     
+    @traced("project.build")
     def generate_outputs(self, circuit_name: str) -> Tuple[str, str]:
         """Generate KiCad output files (netlist and project files)"""
         self.log("Generating KiCad output files...")
@@ -90,7 +82,9 @@ class KiCadWrapper:
         # Generate netlist
         netlist_file = os.path.join(circuit_dir, f"{circuit_name}.net")
         self.log(f"Generating netlist: {netlist_file}")
-        generate_netlist(file_=netlist_file)
+        with span("netlist.write", tool="skidl") as netlist_span:
+            generate_netlist(file_=netlist_file)
+            netlist_span.set(bytes=os.path.getsize(netlist_file))
         
         # Create KiCad project file
         project_file = os.path.join(circuit_dir, f"{circuit_name}.kicad_pro")
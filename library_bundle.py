@@ -0,0 +1,253 @@
+from typing import Dict, List, Optional
+import io
+import os
+import sys
+import gzip
+import json
+import hashlib
+import tarfile
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Symbol libraries every circuit build needs, pinned by content. A library
+# is only installed if its SHA-256 matches, whichever source it came from.
+LIBRARY_SET_VERSION = "kicad-symbols-9.0-20241209"
+LIBRARY_SET_TAG = "9.0.0"  # kicad-symbols release tag the pinned files come from
+PINNED_LIBRARIES = {
+    "Device.kicad_sym": "f605999e711a8cd31f8b754741dc1a68e3099968ce89c16e9902e103c37925a8",
+    "LED.kicad_sym": "f169fece61b31d2f2592f55d3501d34ba984a113ad04692a63d8603bfd37aa5c",
+    "power.kicad_sym": "541c49bdad55134b5f6379e80c6d18f165c1d9e98ca7df36ad6ec2a316a6d11b",
+}
+
+# Last-resort source when online, read at the pinned tag (master moves on and
+# would fail the checksums); anything it serves must still match the pins
+UPSTREAM_URL = f"https://gitlab.com/kicad/libraries/kicad-symbols/-/raw/{LIBRARY_SET_TAG}/{{name}}"
+
+BUNDLE_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+
+class LibraryError(Exception):
+    """A library could not be provisioned with the pinned content"""
+
+def log(msg):
+    """Log messages with timestamp"""
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _write_atomic(path: str, data: bytes):
+    """Write data to path via a temporary file and rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def build_bundle(source_dir: str, bundle_path: str, version: str = LIBRARY_SET_VERSION,
+                 names: Optional[List[str]] = None) -> Dict:
+    """
+    Pack symbol libraries into a versioned, checksummed .tar.gz bundle
+
+    The first member is manifest.json with the bundle format, the version
+    and the SHA-256 and size of every library. Members are sorted and all
+    timestamps and owners are fixed, so the same libraries always produce
+    a byte-identical bundle. The bundle's own digest is written next to it
+    as <bundle>.sha256.
+    Returns:
+        The manifest, plus "sha256" of the bundle file
+    """
+    names = sorted(names or [n for n in os.listdir(source_dir) if n.endswith('.kicad_sym')])
+    contents = {}
+    for name in names:
+        with open(os.path.join(source_dir, name), 'rb') as f:
+            contents[name] = f.read()
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": version,
+        "libraries": {name: {"sha256": sha256_bytes(data), "size": len(data)} for name, data in contents.items()},
+    }
+
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as gz:
+        with tarfile.open(fileobj=gz, mode='w', format=tarfile.USTAR_FORMAT) as tar:
+            members = [(MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True).encode())]
+            members.extend(contents.items())
+            for name, data in members:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mode = 0o644
+                info.mtime = 0
+                tar.addfile(info, io.BytesIO(data))
+
+    data = buffer.getvalue()
+    _write_atomic(bundle_path, data)
+    _write_atomic(bundle_path + '.sha256', f"{sha256_bytes(data)}  {os.path.basename(bundle_path)}\n".encode())
+    return dict(manifest, sha256=sha256_bytes(data))
+
+def read_bundle(bundle_path: str, expected_sha256: Optional[str] = None) -> Dict:
+    """
+    Load and verify a bundle
+    Args:
+        expected_sha256: Digest the bundle must have; defaults to its .sha256 sidecar if present
+    Returns:
+        {"manifest": {...}, "libraries": {name: bytes}} with every library verified
+    Raises:
+        LibraryError: If the bundle or any library in it fails verification
+    """
+    with open(bundle_path, 'rb') as f:
+        data = f.read()
+    if expected_sha256 is None and os.path.exists(bundle_path + '.sha256'):
+        with open(bundle_path + '.sha256', 'r', encoding='utf-8') as f:
+            expected_sha256 = f.read().split()[0]
+    if expected_sha256 and sha256_bytes(data) != expected_sha256:
+        raise LibraryError(f"Bundle {bundle_path} does not match its checksum")
+
+    try:
+        with tarfile.open(fileobj=io.BytesIO(data), mode='r:gz') as tar:
+            files = {m.name: tar.extractfile(m).read() for m in tar.getmembers() if m.isfile()}
+    except (tarfile.TarError, OSError, EOFError) as e:
+        raise LibraryError(f"Bundle {bundle_path} is unreadable: {e}")
+
+    if MANIFEST_NAME not in files:
+        raise LibraryError(f"Bundle {bundle_path} has no manifest")
+    manifest = json.loads(files[MANIFEST_NAME])
+    if manifest.get("format") != BUNDLE_FORMAT:
+        raise LibraryError(f"Bundle {bundle_path} has unsupported format {manifest.get('format')}")
+
+    libraries = {}
+    for name, entry in manifest["libraries"].items():
+        if name not in files or sha256_bytes(files[name]) != entry["sha256"]:
+            raise LibraryError(f"Bundle {bundle_path}: {name} is missing or corrupt")
+        libraries[name] = files[name]
+    return {"manifest": manifest, "libraries": libraries}
+
+def _read_source(source: str, name: str) -> bytes:
+    """Read one library from a mirror directory or a URL template ({name} is substituted)"""
+    if "://" in source:
+        import urllib.request
+        url = source.format(name=name) if "{name}" in source else source.rstrip('/') + '/' + name
+        with urllib.request.urlopen(url, timeout=30) as response:
+            return response.read()
+    with open(os.path.join(source, name), 'rb') as f:
+        return f.read()
+
+def default_sources() -> List[str]:
+    """
+    Library sources in priority order:
+    KICAD_LIBRARY_BUNDLE (bundle files), then KICAD_LIBRARY_MIRROR (directories
+    or URLs), each os.pathsep-separated, then upstream unless KICAD_OFFLINE=1
+    """
+    sources = []
+    for variable in ('KICAD_LIBRARY_BUNDLE', 'KICAD_LIBRARY_MIRROR'):
+        sources.extend(s for s in os.environ.get(variable, '').split(os.pathsep) if s)
+    if os.environ.get('KICAD_OFFLINE', '') not in ('1', 'true', 'yes'):
+        sources.append(UPSTREAM_URL)
+    return sources
+
+def _missing_libraries(libraries_dir: str, pinned: Dict[str, str]) -> List[str]:
+    """Pinned libraries that are absent or whose content does not match"""
+    missing = []
+    for name, digest in sorted(pinned.items()):
+        path = os.path.join(libraries_dir, name)
+        if not os.path.exists(path) or sha256_file(path) != digest:
+            missing.append(name)
+    return missing
+
+def provision_libraries(libraries_dir: str = "libraries", sources: Optional[List[str]] = None,
+                        pinned: Optional[Dict[str, str]] = None, max_workers: int = 8) -> Dict:
+    """
+    Make sure every pinned library is present in libraries_dir with the
+    pinned content
+
+    Bundles are unpacked first. Libraries still missing are then fetched
+    concurrently, trying each mirror directory or URL in order until one
+    serves the pinned bytes. Every file is verified before it is written,
+    and each write goes to a temporary file and is renamed into place, so
+    an interrupted fetch never leaves a half-written library behind.
+    Returns:
+        {"installed": {name: source}, "present": [names already in place]}
+    Raises:
+        LibraryError: If any library could not be provisioned
+    """
+    pinned = PINNED_LIBRARIES if pinned is None else pinned
+    sources = default_sources() if sources is None else sources
+    os.makedirs(libraries_dir, exist_ok=True)
+
+    missing = _missing_libraries(libraries_dir, pinned)
+    present = sorted(set(pinned) - set(missing))
+    installed = {}
+    errors = {}
+
+    for source in sources:
+        if not missing or not source.endswith('.tar.gz') or "://" in source:
+            continue
+        try:
+            bundle = read_bundle(source)
+        except (LibraryError, OSError) as e:
+            errors[source] = str(e)
+            continue
+        for name in list(missing):
+            data = bundle["libraries"].get(name)
+            if data is not None and sha256_bytes(data) == pinned[name]:
+                _write_atomic(os.path.join(libraries_dir, name), data)
+                installed[name] = source
+                missing.remove(name)
+
+    fetch_sources = [s for s in sources if not (s.endswith('.tar.gz') and "://" not in s)]
+
+    def fetch(name):
+        for source in fetch_sources:
+            try:
+                data = _read_source(source, name)
+            except Exception as e:
+                errors[f"{source}:{name}"] = str(e)
+                continue
+            if sha256_bytes(data) != pinned[name]:
+                errors[f"{source}:{name}"] = "checksum mismatch"
+                continue
+            _write_atomic(os.path.join(libraries_dir, name), data)
+            return name, source
+        return name, None
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing)))) as pool:
+            for name, source in pool.map(fetch, missing):
+                if source is not None:
+                    installed[name] = source
+
+    failed = [name for name in missing if name not in installed]
+    if failed:
+        raise LibraryError(f"Could not provision {', '.join(failed)} ({LIBRARY_SET_VERSION}); "
+                           f"set KICAD_LIBRARY_BUNDLE or KICAD_LIBRARY_MIRROR. Errors: {errors}")
+    for name, source in sorted(installed.items()):
+        log(f"✓ Installed {name} from {source}")
+    return {"installed": installed, "present": present}
+
+if __name__ == "__main__":
+    # python library_bundle.py build <bundle.tar.gz> [libraries_dir]
+    # python library_bundle.py install <bundle.tar.gz> [libraries_dir]
+    if len(sys.argv) < 3 or sys.argv[1] not in ('build', 'install'):
+        print("Usage: python library_bundle.py build|install <bundle.tar.gz> [libraries_dir]")
+        sys.exit(2)
+    command, bundle_path = sys.argv[1], sys.argv[2]
+    libraries_dir = sys.argv[3] if len(sys.argv) > 3 else "libraries"
+    if command == 'build':
+        result = build_bundle(libraries_dir, bundle_path, names=sorted(PINNED_LIBRARIES))
+        log(f"✓ Built {bundle_path} ({result['version']}, sha256 {result['sha256'][:12]})")
+    else:
+        provision_libraries(libraries_dir, sources=[os.path.abspath(bundle_path)])
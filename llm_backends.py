@@ -0,0 +1,323 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import os
+import json
+import time
+import queue
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+# Model servers behind one small interface. LLMEngine talks to an
+# LLMBackend rather than to a client library, so the same code runs against
+# Ollama, any OpenAI-compatible server (llama.cpp, vLLM, LM Studio, ...) or
+# an in-process fake, selected by configuration:
+#
+#   LLM_BACKEND          ollama (default) | openai | fake
+#   LLM_BASE_URL         server URL (default: OLLAMA_HOST or http://127.0.0.1:11434)
+#   LLM_API_KEY          bearer token for OpenAI-compatible servers
+#   LLM_MAX_CONCURRENCY  requests in flight per server (default 4)
+#   LLM_TIMEOUT          seconds to wait for a reply (default 300)
+#   LLM_RETRIES          retries after connection errors, 429 and 5xx (default 2)
+#
+# HTTP goes through a keep-alive connection pool shared by every backend
+# pointing at the same server, so requests reuse TCP (and TLS) connections
+# instead of opening one each.
+
+DEFAULT_OLLAMA_URL = "http://127.0.0.1:11434"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# How a pooled connection the server has already closed fails before any
+# reply arrives; anything else (timeouts included) may mean the server got
+# the request, so it counts as a failed attempt
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+class LLMBackendError(Exception):
+    """A model server could not be reached or rejected a request"""
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+class HTTPClient:
+    """
+    JSON-over-HTTP client with a pool of keep-alive connections
+
+    At most max_connections requests are in flight at once; further callers
+    wait for a free slot. Idle connections are reused, most recently used
+    first. Connection failures, 429 and 5xx replies are retried with
+    exponential backoff.
+    """
+    def __init__(self, base_url: str, timeout: float = 300.0, connect_timeout: float = 5.0,
+                 retries: int = 2, backoff: float = 0.5, max_connections: int = 4,
+                 headers: Optional[Dict[str, str]] = None):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Unsupported server URL: {base_url}")
+        self.base_url = base_url.rstrip('/')
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.base_path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_connections = max_connections
+        self.headers = dict(headers or {})
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self.connections_opened = 0
+
+    def _connect(self) -> http.client.HTTPConnection:
+        connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        connection = connection_class(self.host, self.port, timeout=self.connect_timeout)
+        connection.connect()
+        connection.sock.settimeout(self.timeout)
+        self.connections_opened += 1
+        return connection
+
+    def _acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """An idle connection (reused=True) or a new one"""
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._connect(), False
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None,
+                timeout: Optional[float] = None) -> Dict:
+        """
+        Send a JSON request and decode the JSON reply
+        Raises:
+            LLMBackendError: If the server is unreachable or replies with an error
+        """
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {"Content-Type": "application/json", "Accept": "application/json", **self.headers}
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        with self._slots:
+            while True:
+                connection = None
+                reused = False
+                response = None
+                try:
+                    connection, reused = self._acquire()
+                    if timeout is not None:
+                        connection.sock.settimeout(timeout)
+                    connection.request(method, self.base_path + path, body=payload, headers=headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                except (OSError, http.client.HTTPException) as e:
+                    if connection is not None:
+                        connection.close()
+                    if reused and response is None and isinstance(e, STALE_CONNECTION_ERRORS):
+                        continue  # The server closed an idle connection; not a real failure
+                    if attempt >= self.retries:
+                        raise LLMBackendError(f"{method} {url} failed: {e}")
+                    attempt += 1
+                    time.sleep(self.backoff * (2 ** (attempt - 1)))
+                    continue
+
+                if response.will_close:
+                    connection.close()
+                else:
+                    connection.sock.settimeout(self.timeout)
+                    self._idle.put(connection)
+
+                if response.status in RETRY_STATUSES and attempt < self.retries:
+                    attempt += 1
+                    time.sleep(self.backoff * (2 ** (attempt - 1)))
+                    continue
+                if response.status >= 400:
+                    raise LLMBackendError(
+                        f"{method} {url}: HTTP {response.status} {data[:200].decode('utf-8', 'replace')}",
+                        response.status)
+                try:
+                    return json.loads(data) if data else {}
+                except ValueError:
+                    raise LLMBackendError(f"{method} {url}: reply is not JSON")
+
+    def close(self):
+        """Close idle connections"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+_clients: Dict[Tuple, HTTPClient] = {}
+_clients_lock = threading.Lock()
+
+def get_http_client(base_url: str, **options) -> HTTPClient:
+    """The process-wide client (and connection pool) for a server and settings"""
+    key = (base_url.rstrip('/'), tuple(sorted((k, repr(v)) for k, v in options.items())))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = HTTPClient(base_url, **options)
+        return client
+
+class LLMBackend:
+    """
+    Interface every model server implements
+    generate() returns {"response": text, "prompt_tokens": n, "completion_tokens": n,
+    "done_reason": "stop" | "length" | ""}; "length" means the reply hit num_predict.
+    Servers that time their phases add "load_ns", "prefill_ns" and "decode_ns".
+    """
+    name = "base"
+
+    def generate(self, model: str, prompt: str, options: Optional[Dict] = None,
+                 format: Optional[Dict] = None) -> Dict:
+        raise NotImplementedError
+
+    def list_models(self) -> List[str]:
+        raise NotImplementedError
+
+    def pull(self, model: str):
+        """Download a model; servers that cannot do this just serve what they have"""
+
+    def ping(self) -> bool:
+        """True if the server answers"""
+        try:
+            self.list_models()
+            return True
+        except LLMBackendError:
+            return False
+
+    def close(self):
+        pass
+
+class OllamaBackend(LLMBackend):
+    """Ollama's native REST API (/api/generate, /api/tags, /api/pull)"""
+    name = "ollama"
+
+    def __init__(self, client: HTTPClient):
+        self.client = client
+
+    def generate(self, model, prompt, options=None, format=None):
+        body = {"model": model, "prompt": prompt, "stream": False, "options": options or {}}
+        if format is not None:
+            body["format"] = format
+        reply = self.client.request("POST", "/api/generate", body)
+        return {
+            "response": reply.get("response", ""),
+            "prompt_tokens": reply.get("prompt_eval_count", 0),
+            "completion_tokens": reply.get("eval_count", 0),
+            "done_reason": reply.get("done_reason", ""),
+            "load_ns": reply.get("load_duration", 0),
+            "prefill_ns": reply.get("prompt_eval_duration", 0),
+            "decode_ns": reply.get("eval_duration", 0),
+        }
+
+    def list_models(self):
+        reply = self.client.request("GET", "/api/tags", timeout=self.client.connect_timeout)
+        return [m.get("name") or m.get("model") for m in reply.get("models", [])]
+
+    def pull(self, model):
+        self.client.request("POST", "/api/pull", {"model": model, "stream": False})
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Any server implementing the OpenAI chat completions API"""
+    name = "openai"
+
+    # Ollama option names → OpenAI request fields
+    OPTION_FIELDS = {"temperature": "temperature", "top_p": "top_p", "num_predict": "max_tokens",
+                     "stop": "stop", "seed": "seed"}
+
+    def __init__(self, client: HTTPClient):
+        self.client = client
+
+    def generate(self, model, prompt, options=None, format=None):
+        body = {"model": model, "messages": [{"role": "user", "content": prompt}]}
+        for option, field in self.OPTION_FIELDS.items():
+            if options and option in options:
+                body[field] = options[option]
+        if format == "json":
+            body["response_format"] = {"type": "json_object"}
+        elif format is not None:
+            body["response_format"] = {"type": "json_schema", "json_schema": {"name": "response", "schema": format}}
+        reply = self.client.request("POST", "/chat/completions", body)
+        choices = reply.get("choices") or [{}]
+        usage = reply.get("usage") or {}
+        return {
+            "response": (choices[0].get("message") or {}).get("content") or "",
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "done_reason": choices[0].get("finish_reason") or "",
+        }
+
+    def list_models(self):
+        reply = self.client.request("GET", "/models", timeout=self.client.connect_timeout)
+        return [m.get("id") for m in reply.get("data", [])]
+
+class FakeBackend(LLMBackend):
+    """
+    In-process backend for tests and offline benchmarks
+    Replies come from responder(prompt, format), or a fixed text; every
+    request is recorded in .calls. Like a real server, the reply ends at the
+    first stop sequence and is cut to num_predict tokens (words here).
+    """
+    name = "fake"
+
+    def __init__(self, responder: Optional[Callable[[str, Optional[Dict]], str]] = None,
+                 response: str = "OK", latency: float = 0.0, models: Optional[List[str]] = None):
+        self.responder = responder
+        self.response = response
+        self.latency = latency
+        self.models = list(models or [])
+        self.calls: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def generate(self, model, prompt, options=None, format=None):
+        with self._lock:
+            self.calls.append({"model": model, "prompt": prompt, "options": options, "format": format})
+        if self.latency:
+            time.sleep(self.latency)
+        text = self.responder(prompt, format) if self.responder else self.response
+        options = options or {}
+        done_reason = "stop"
+        for stop in options.get("stop") or []:
+            if stop in text:
+                text = text[:text.index(stop)]
+        limit = options.get("num_predict")
+        if limit is not None and 0 <= limit < len(text.split()):
+            text = " ".join(text.split()[:limit])
+            done_reason = "length"
+        return {"response": text, "prompt_tokens": len(prompt.split()), "completion_tokens": len(text.split()),
+                "done_reason": done_reason}
+
+    def list_models(self):
+        return self.models
+
+    def pull(self, model):
+        if model not in self.models:
+            self.models.append(model)
+
+def create_backend(kind: Optional[str] = None, base_url: Optional[str] = None, **options) -> LLMBackend:
+    """
+    Build the configured backend (see the environment variables above)
+    Args:
+        kind: "ollama", "openai" or "fake"; defaults to LLM_BACKEND
+        base_url: Server URL; defaults to LLM_BASE_URL
+        options: HTTPClient settings overriding the environment
+    """
+    kind = (kind or os.environ.get('LLM_BACKEND') or 'ollama').lower()
+    if kind == 'fake':
+        return FakeBackend()
+
+    settings = {
+        "timeout": float(os.environ.get('LLM_TIMEOUT', 300)),
+        "retries": int(os.environ.get('LLM_RETRIES', 2)),
+        "max_connections": int(os.environ.get('LLM_MAX_CONCURRENCY', 4)),
+    }
+    api_key = os.environ.get('LLM_API_KEY')
+    if api_key:
+        settings["headers"] = {"Authorization": f"Bearer {api_key}"}
+    settings.update(options)
+
+    if kind == 'ollama':
+        base_url = base_url or os.environ.get('LLM_BASE_URL') or os.environ.get('OLLAMA_HOST') or DEFAULT_OLLAMA_URL
+        if "://" not in base_url:
+            base_url = "http://" + base_url  # OLLAMA_HOST may be host:port
+        return OllamaBackend(get_http_client(base_url, **settings))
+    if kind in ('openai', 'openai-compatible'):
+        base_url = base_url or os.environ.get('LLM_BASE_URL') or "http://127.0.0.1:8080/v1"
+        return OpenAICompatibleBackend(get_http_client(base_url, **settings))
+    raise ValueError(f"Unknown LLM backend: {kind}")
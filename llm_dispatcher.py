@@ -0,0 +1,258 @@
+from typing import Dict, List, Optional, Set
+import json
+import heapq
+import hashlib
+import threading
+import time
+import contextvars
+from collections import deque
+from concurrent.futures import Future
+from tracing import add_attributes, record_span, span
+from metrics import LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, LLM_TOKENS_PER_SECOND
+
+# Front door to the model server for every LLMEngine call in the process.
+# Chat sessions, background reviews and batch jobs all queue here:
+#
+#   - single-flight: identical concurrent requests (same model, prompt,
+#     options and format) share one server call and one Future
+#   - at most max_in_flight requests reach the server at once, matching the
+#     server's parallel slots (e.g. OLLAMA_NUM_PARALLEL) instead of
+#     overloading it
+#   - waiting requests are served by priority, then arrival order, so quick
+#     interactive requests overtake long analysis jobs
+#   - queue depth, in-flight count and wait times are tracked for metrics();
+#     the process-wide gauges add up every open dispatcher, and one closed
+#     while requests are queued keeps reporting until they have run
+#   - the server call runs in the submitter's tracing context, so its queue
+#     wait, request and the server's prefill/decode phases appear as spans
+#     of the request that asked for it
+
+PRIORITY_INTERACTIVE = 0   # A user is waiting on the reply
+PRIORITY_NORMAL = 5        # Code generation and other foreground work
+PRIORITY_BACKGROUND = 10   # Reviews and other work nobody is waiting on
+
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_NORMAL: "normal", PRIORITY_BACKGROUND: "background"}
+
+# Wait times kept per priority for percentiles
+WAIT_SAMPLES = 1024
+
+# Dispatchers read by the gauges: open ones, and closed ones still draining
+_live_dispatchers: Set["LLMDispatcher"] = set()
+_live_lock = threading.Lock()
+
+def _total(field: str) -> int:
+    """Sum of one metrics() field over the registered dispatchers"""
+    with _live_lock:
+        dispatchers = list(_live_dispatchers)
+    return sum(dispatcher.metrics()[field] for dispatcher in dispatchers)
+
+LLM_QUEUE_DEPTH.set_function(lambda: _total("queue_depth"))
+LLM_IN_FLIGHT.set_function(lambda: _total("in_flight"))
+
+def request_key(model: str, prompt: str, options: Optional[Dict], format) -> str:
+    """Identity of a request for single-flight coalescing"""
+    canonical = json.dumps([model, prompt, options or {}, format], sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class _Job:
+    __slots__ = ("key", "priority", "seq", "enqueued_at", "enqueued_ns", "future", "request", "started", "context")
+
+    def __init__(self, key, priority, seq, request):
+        self.key = key
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.enqueued_ns = time.time_ns()
+        self.future = Future()
+        self.request = request
+        self.started = False
+        self.context = contextvars.copy_context()
+
+class _WaitStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=WAIT_SAMPLES)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def snapshot(self) -> Dict:
+        ordered = sorted(self.samples)
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+        return {
+            "count": self.count,
+            "mean_s": self.total / self.count if self.count else 0.0,
+            "p50_s": percentile(0.50),
+            "p95_s": percentile(0.95),
+            "max_s": self.max,
+        }
+
+class LLMDispatcher:
+    """
+    Priority queue with single-flight and an in-flight cap in front of an
+    LLMBackend (see llm_backends.py)
+    """
+    def __init__(self, backend, max_in_flight: int = 2):
+        """
+        Args:
+            backend: LLMBackend that performs the requests
+            max_in_flight: Requests sent to the server at once
+        """
+        self.backend = backend
+        self.max_in_flight = max_in_flight
+        self._heap: List = []
+        self._pending: Dict[str, _Job] = {}
+        self._cond = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._closed = False
+        self._seq = 0
+        self._in_flight = 0
+        self._queued = 0
+        self._max_queue_depth = 0
+        self._counts = {"submitted": 0, "coalesced": 0, "completed": 0, "failed": 0}
+        self._waits: Dict[int, _WaitStats] = {}
+        with _live_lock:
+            _live_dispatchers.add(self)
+
+    def _start_workers(self):
+        while len(self._workers) < self.max_in_flight:
+            worker = threading.Thread(target=self._work, name=f"llm-dispatch-{len(self._workers)}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def submit(self, model: str, prompt: str, options: Optional[Dict] = None, format=None,
+               priority: int = PRIORITY_NORMAL) -> Future:
+        """
+        Queue a generate request
+        Returns:
+            Future resolving to the backend's reply ({"response", ...});
+            shared with any identical request already queued or running
+        """
+        key = request_key(model, prompt, options, format)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("LLM dispatcher is closed")
+            self._counts["submitted"] += 1
+            job = self._pending.get(key)
+            if job is not None:
+                self._counts["coalesced"] += 1
+                add_attributes(coalesced=True)
+                if not job.started and priority < job.priority:
+                    # Promote the queued job; its old heap entry is skipped later
+                    job.priority = priority
+                    heapq.heappush(self._heap, (priority, job.seq, job))
+                return job.future
+
+            self._seq += 1
+            job = _Job(key, priority, self._seq, (model, prompt, options, format))
+            self._pending[key] = job
+            heapq.heappush(self._heap, (priority, job.seq, job))
+            self._queued += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queued)
+            self._start_workers()
+            self._cond.notify()
+            return job.future
+
+    def generate(self, model: str, prompt: str, options: Optional[Dict] = None, format=None,
+                 priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None) -> Dict:
+        """Queue a request and wait for its reply"""
+        return self.submit(model, prompt, options, format, priority).result(timeout)
+
+    def _next_job(self) -> Optional[_Job]:
+        with self._cond:
+            while True:
+                while self._heap:
+                    priority, _, job = heapq.heappop(self._heap)
+                    if job.started or priority != job.priority:
+                        continue  # Stale entry left by a promotion
+                    job.started = True
+                    self._queued -= 1
+                    self._in_flight += 1
+                    self._waits.setdefault(job.priority, _WaitStats()).add(time.monotonic() - job.enqueued_at)
+                    return job
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                self._unregister_if_drained()
+                return
+            try:
+                result = job.context.run(self._call, job)
+            except BaseException as e:
+                with self._cond:
+                    self._finish(job, "failed")
+                job.future.set_exception(e)
+            else:
+                with self._cond:
+                    self._finish(job, "completed")
+                job.future.set_result(result)
+
+    def _call(self, job: _Job) -> Dict:
+        """The backend request, traced as part of the submitter's trace"""
+        model, prompt, options, format = job.request
+        record_span("llm.queue", job.enqueued_ns, time.time_ns(), priority=PRIORITY_NAMES.get(job.priority, job.priority))
+        with span("llm.request", model=model, backend=self.backend.name) as request_span:
+            result = self.backend.generate(model, prompt, options=options, format=format)
+            request_span.set(prompt_tokens=result.get('prompt_tokens', 0), completion_tokens=result.get('completion_tokens', 0),
+                             done_reason=result.get('done_reason', ''))
+            if result.get('decode_ns') and result.get('completion_tokens'):
+                LLM_TOKENS_PER_SECOND.labels(model).observe(result['completion_tokens'] * 1e9 / result['decode_ns'])
+            # Phases the server measured, laid out backwards from the end of the request
+            end = time.time_ns()
+            for phase in ("decode", "prefill", "load"):
+                duration = result.get(f"{phase}_ns") or 0
+                if duration:
+                    record_span(f"model.{phase}", end - duration, end)
+                    end -= duration
+        return result
+
+    def _finish(self, job: _Job, outcome: str):
+        self._in_flight -= 1
+        self._counts[outcome] += 1
+        if self._pending.get(job.key) is job:
+            del self._pending[job.key]
+
+    def metrics(self) -> Dict:
+        """Snapshot of queue depth, in-flight requests, counters and wait times by priority"""
+        with self._cond:
+            return {
+                "queue_depth": self._queued,
+                "max_queue_depth": self._max_queue_depth,
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                **self._counts,
+                "wait": {PRIORITY_NAMES.get(p, str(p)): stats.snapshot() for p, stats in sorted(self._waits.items())},
+            }
+
+    def _unregister_if_drained(self):
+        """Leave the gauges once closed with nothing queued or running"""
+        with self._cond:
+            drained = self._closed and not self._queued and not self._in_flight
+        if drained:
+            with _live_lock:
+                _live_dispatchers.discard(self)
+
+    def close(self, wait: bool = True):
+        """
+        Stop accepting requests; queued requests still run, then the workers
+        exit and the dispatcher leaves the gauges
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._unregister_if_drained()
+        if wait:
+            for worker in self._workers:
+                worker.join()
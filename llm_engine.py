@@ -1,59 +1,93 @@
 from typing import Dict, List, Optional, Tuple
 import os
-import ollama
 import json
 import subprocess
 import sys
 import time
 from datetime import datetime
-import urllib.request
 import re
 import tempfile
 import traceback
-import openai
+from artifact_store import get_artifact_store
+from workspace import allocate_workspace, new_job_id
+from circuit_spec import CIRCUIT_SPEC_SCHEMA, CircuitSpecError, circuit_spec_prompt, parse_circuit_spec
+from circuit_review import REVIEW_SCHEMA, CircuitReviewer, ReviewCache, parse_review, review_prompt
+from erc import check_netlist
+from conversation_memory import ConversationMemory, compact_context, estimate_tokens
+from llm_backends import LLMBackend, OllamaBackend, create_backend
+from llm_dispatcher import LLMDispatcher, PRIORITY_INTERACTIVE, PRIORITY_NORMAL, PRIORITY_BACKGROUND
+from generation_profiles import GenerationStats, get_profile
+from tracing import add_attributes, span, traced
+import metrics
+from request_log import add_llm_call, logged_request
+from model_tiers import (KIND_CHAT, KIND_CODE, KIND_REVIEW, KIND_SPEC, ModelTier, TieringPolicy,
+                         hardware_options)
+
+# Prompt budgets (estimated tokens) inside num_ctx=4096: the fixed
+# instructions and example take ~800 and the reply needs room too
+MEMORY_TOKEN_BUDGET = 768
+CONTEXT_TOKEN_BUDGET = 512
 
 class LLMEngine:
     """
     Core LLM integration engine for KiCad AI Assistant using Ollama with Llama 2
     """
-    def __init__(self, model_name: str = "llama2"):
+    def __init__(self, model_name: str = "llama2", backend: Optional[LLMBackend] = None,
+                 tiers: Optional[TieringPolicy] = None):
+        """
+        Args:
+            model_name: Model to use for complex requests
+            backend: Model server (see llm_backends.py); defaults to the one
+                configured by LLM_BACKEND / LLM_BASE_URL, normally local Ollama
+            tiers: Which model, context size and reply cap serve each request
+                (see model_tiers.py); defaults to model_name plus LLM_SMALL_MODEL
+        """
         print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Initializing KiCad AI Assistant...")
         self.model_name = model_name
-        self.context_history = []
+        self.backend = backend or create_backend()
+        self.tiers = tiers or TieringPolicy.from_env(model_name)
+        self.generation_stats = GenerationStats()
+        # Every request goes through one queue: identical prompts share a call,
+        # interactive requests go first and the server gets at most this many at once
+        self.dispatcher = LLMDispatcher(self.backend, max_in_flight=int(os.environ.get('LLM_MAX_IN_FLIGHT', 2)))
+        self._reviewer = None
         self.check_ollama_installation()
         self.initialize_model()
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Initialization complete!")
     
+    def close(self):
+        """Stop background reviews and the dispatcher; requests already queued still run"""
+        if self._reviewer is not None:
+            self._reviewer.shutdown(wait=False)
+        self.dispatcher.close(wait=False)
+    
     def check_ollama_installation(self):
-        """Check if Ollama is installed and accessible"""
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Checking Ollama installation...")
+        """Check that the model server is reachable, starting a local Ollama if needed"""
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Checking {self.backend.name} server...")
         try:
-            # First check if Ollama service is running
-            try:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Checking if Ollama service is running...")
-                ollama.list()
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] ✓ Ollama service is running")
+            # First check if the service is running
+            if self.backend.ping():
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] ✓ {self.backend.name} service is running")
                 return
-            except Exception:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Ollama service not running, attempting to start...")
-                # Try to start the Ollama service
-                subprocess.Popen(
-                    ['ollama', 'serve'],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    creationflags=subprocess.CREATE_NO_WINDOW
-                )
-                # Wait for service to start
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Waiting for Ollama service to start (5s)...")
-                time.sleep(5)  # Give the service time to start
-                
-                # Verify service is now running
-                try:
-                    ollama.list()
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] ✓ Ollama service started successfully")
-                    return
-                except Exception as e:
-                    raise Exception(f"Failed to start Ollama service: {str(e)}")
+            if not isinstance(self.backend, OllamaBackend):
+                raise Exception(f"{self.backend.name} server is not reachable")
+            
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Ollama service not running, attempting to start...")
+            # Try to start the Ollama service
+            subprocess.Popen(
+                ['ollama', 'serve'],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+            )
+            # Wait for service to start
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Waiting for Ollama service to start (5s)...")
+            time.sleep(5)  # Give the service time to start
+            
+            # Verify service is now running
+            if not self.backend.ping():
+                raise Exception("Failed to start Ollama service")
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ✓ Ollama service started successfully")
                 
         except FileNotFoundError:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] ✗ ERROR: Ollama is not installed or not in PATH")
@@ -63,66 +97,101 @@ class LLMEngine:
             print("2. Add Ollama to your system PATH")
             sys.exit(1)
         except Exception as e:
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] ✗ Error checking Ollama installation: {str(e)}")
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ✗ Error checking model server: {str(e)}")
             sys.exit(1)
     
     def initialize_model(self):
-        """Initialize the Llama 2 model with Ollama"""
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Initializing Llama 2 model...")
+        """Make sure every tier's model is available on the server"""
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Initializing {', '.join(self.tiers.models)} model(s)...")
         try:
             # List available models
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Checking available models...")
-            models_response = ollama.list()
-            available_models = []
-            
-            # Safely extract model names
-            if hasattr(models_response, 'models'):
-                for model in models_response.models:
-                    if hasattr(model, 'name'):
-                        available_models.append(model.name)
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Available models: {', '.join(available_models)}")
+            available_models = [name for name in self.backend.list_models() if name]
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Available models: {', '.join(available_models)}")
             
-            # Download model if not available
-            if self.model_name not in available_models:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Downloading {self.model_name} model (this may take a few minutes)...")
-                start_time = time.time()
-                ollama.pull(self.model_name)
-                elapsed_time = time.time() - start_time
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] ✓ Model {self.model_name} downloaded successfully in {elapsed_time:.1f}s")
-            else:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] ✓ Model {self.model_name} is already available")
+            for model in self.tiers.models:
+                # Download model if not available ("llama2" is served as "llama2:latest")
+                if model not in available_models and f"{model}:latest" not in available_models:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] Downloading {model} model (this may take a few minutes)...")
+                    start_time = time.time()
+                    self.backend.pull(model)
+                    elapsed_time = time.time() - start_time
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] ✓ Model {model} downloaded successfully in {elapsed_time:.1f}s")
+                else:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] ✓ Model {model} is already available")
             
-            # Set model parameters optimized for technical/engineering tasks
+            # Sampling parameters for technical/engineering tasks; the tier
+            # adds num_ctx and num_predict per request, and thread/GPU
+            # settings are left to the server unless configured
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Configuring model parameters...")
             self.model_params = {
-                "num_gpu": 1,  # Use GPU acceleration
                 "temperature": 0.7,  # Balanced between creativity and precision
                 "top_p": 0.9,  # High coherence for technical responses
-                "num_ctx": 4096,  # Large context window for complex circuits
-                "num_thread": 8  # Utilize multiple CPU threads
+                **hardware_options()
             }
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] ✓ Model parameters configured")
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ✓ Model parameters configured "
+                  f"(small: {self.tiers.small.model}, large: {self.tiers.large.model})")
         except Exception as e:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] ✗ Error initializing model: {str(e)}")
-            print("Please ensure Ollama is installed and running")
+            print("Please ensure the model server is installed and running")
             raise
     
-    def generate_response(self, prompt: str) -> str:
+    def _generate(self, prompt: str, tier: ModelTier, priority: int, kind: Optional[str] = None,
+                  format=None, **overrides) -> Dict:
+        """
+        Send one request on a tier, limited by the generation profile of its
+        prompt type (see generation_profiles.py)
+        Returns:
+            The backend's reply, with a section closed again if a stop sequence cut its end marker
+        """
+        options = dict(tier.options(self.model_params), **overrides)
+        profile = get_profile(kind) if kind else None
+        if profile is not None:
+            options = profile.options(options)
+        label = kind or "other"
+        start = time.perf_counter()
+        with span("llm.generate", kind=kind or "", tier=tier.name, model=tier.model,
+                  prompt_tokens_est=estimate_tokens(prompt)) as generate_span:
+            try:
+                reply = self.dispatcher.generate(tier.model, prompt, options=options, format=format, priority=priority)
+            except Exception as e:
+                metrics.LLM_REQUESTS.labels(label, tier.name, "error").inc()
+                add_llm_call(kind, tier.name, tier.model, options, format, prompt, time.perf_counter() - start, error=str(e))
+                raise
+            finally:
+                metrics.LLM_SECONDS.labels(label).observe(time.perf_counter() - start)
+            add_llm_call(kind, tier.name, tier.model, options, format, prompt, time.perf_counter() - start, reply)
+            metrics.LLM_REQUESTS.labels(label, tier.name, "success").inc()
+            metrics.LLM_TOKENS.labels(label, "prompt").inc(reply.get('prompt_tokens', 0))
+            metrics.LLM_TOKENS.labels(label, "completion").inc(reply.get('completion_tokens', 0))
+            generate_span.set(completion_tokens=reply.get('completion_tokens', 0), done_reason=reply.get('done_reason', ''))
+            if profile is None:
+                return reply
+            text = profile.finish(reply['response'])
+            wasted = self.generation_stats.record(kind, reply, profile.used(text))
+            metrics.LLM_WASTED_TOKENS.labels(label).inc(wasted)
+            generate_span.set(wasted_tokens=wasted)
+        if wasted:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {kind}: ~{wasted} of {reply.get('completion_tokens', 0)} generated tokens unused")
+        return dict(reply, response=text)
+    
+    def generate_response(self, prompt: str, priority: int = PRIORITY_NORMAL,
+                          tier: Optional[ModelTier] = None, kind: Optional[str] = None) -> str:
         """
         Generate a response using Llama 2
         Args:
             prompt: Input prompt for the model
+            priority: Dispatcher priority (PRIORITY_INTERACTIVE goes first)
+            tier: Model tier to run on; defaults to the large tier
+            kind: Prompt type whose generation profile (reply cap, stop sequences) applies
         Returns:
             Generated response
         """
+        tier = tier or self.tiers.large
         try:
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Generating response...")
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Generating response ({tier.name} tier)...")
             start_time = time.time()
-            response = ollama.generate(
-                model=self.model_name,
-                prompt=prompt,
-                options=self.model_params
-            )
+            response = self._generate(prompt, tier, priority, kind)
             elapsed_time = time.time() - start_time
             print(f"[{datetime.now().strftime('%H:%M:%S')}] ✓ Response generated in {elapsed_time:.1f}s")
             return response['response']
@@ -130,123 +199,193 @@ class LLMEngine:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] ✗ Error generating response: {str(e)}")
             return f"Error generating response: {str(e)}"
     
-    def analyze_circuit(self, circuit_data: Dict) -> Dict:
+    def generate_structured(self, prompt: str, schema: Dict, priority: int = PRIORITY_INTERACTIVE,
+                            tier: Optional[ModelTier] = None) -> str:
         """
-        Analyze circuit design and provide insights using Llama 3.2
+        Generate a reply constrained to a JSON schema
+        The schema is sent as Ollama's format option (response_format on
+        OpenAI-compatible servers), which restricts decoding to JSON matching the schema,
+        so the reply needs no extraction and carries no surrounding prose.
         Args:
-            circuit_data: Dictionary containing circuit information
+            prompt: Input prompt for the model
+            schema: JSON schema the reply must follow
+            priority: Dispatcher priority
+            tier: Model tier to run on; defaults to the large tier
         Returns:
-            Dictionary containing analysis results
+            The raw JSON text
+        Raises:
+            LLMBackendError: If the server fails; callers decide how to report it
         """
-        prompt = f"""
-        As an expert electronics engineer, analyze this circuit and provide detailed insights:
-        
-        Circuit Name: {circuit_data.get('name', 'Unnamed')}
-        Description: {circuit_data.get('description', 'No description')}
-        Components: {', '.join(circuit_data.get('components', []))}
-        Connections: {', '.join(circuit_data.get('nets', []))}
-        
-        Please provide a comprehensive analysis including:
-        1. Detailed component analysis and their roles
-        2. Circuit topology and design patterns
-        3. Potential performance characteristics
-        4. Possible issues or reliability concerns
-        5. Specific suggestions for improvement
+        return self._structured_reply(prompt, schema, priority, tier or self.tiers.large)['response']
+    
+    def _structured_reply(self, prompt: str, schema: Dict, priority: int, tier: ModelTier,
+                          kind: Optional[str] = None) -> Dict:
+        """The backend's full reply (text, token counts, done_reason) for generate_structured"""
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Generating structured response ({tier.name} tier)...")
+        start_time = time.time()
+        # Deterministic decoding: the schema already fixes the shape of the answer
+        response = self._generate(prompt, tier, priority, kind, format=schema, temperature=0)
+        elapsed_time = time.time() - start_time
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] ✓ Structured response generated in {elapsed_time:.1f}s")
+        return response
+    
+    def _escalate(self, tier: ModelTier, reply: Dict) -> Optional[ModelTier]:
+        """Tier to retry a rejected structured reply on, or None"""
+        truncated = reply.get('done_reason') == 'length' or reply.get('completion_tokens', 0) >= tier.num_predict
+        return self.tiers.escalate(tier, truncated=truncated)
+    
+    @traced("llm.circuit_spec")
+    def generate_circuit_spec(self, user_request: str) -> Dict:
         """
-        
-        response = self.generate_response(prompt)
-        
-        # Parse the response into structured data
+        Describe the requested circuit as a validated circuit spec (see circuit_spec.py)
+        Simple requests go to the small tier; a spec it gets wrong is
+        regenerated on the large tier.
+        Args:
+            user_request: Natural language description of the circuit
+        Returns:
+            Dict with "success", "spec" (on success), "message", the raw "response" and the "tier" used
+        """
+        response = ""
+        prompt = circuit_spec_prompt(user_request)
+        tier = self.tiers.select(KIND_SPEC, prompt, text=user_request)
         try:
-            # Extract sections from the response
-            components = []
-            suggestions = []
-            potential_issues = []
-            
-            # Simple parsing (can be improved)
-            current_section = None
-            for line in response.split('\n'):
-                if 'Component analysis' in line or 'Circuit topology' in line:
-                    current_section = 'components'
-                elif 'Potential issues' in line or 'reliability concerns' in line:
-                    current_section = 'issues'
-                elif 'Suggestions' in line or 'improvement' in line:
-                    current_section = 'suggestions'
-                elif line.strip() and current_section:
-                    if current_section == 'components':
-                        components.append(line.strip())
-                    elif current_section == 'issues':
-                        potential_issues.append(line.strip())
-                    elif current_section == 'suggestions':
-                        suggestions.append(line.strip())
-            
+            while True:
+                reply = self._structured_reply(prompt, CIRCUIT_SPEC_SCHEMA, PRIORITY_INTERACTIVE, tier, KIND_SPEC)
+                response = reply['response']
+                try:
+                    with span("spec.parse", tier=tier.name, chars=len(response)):
+                        spec = parse_circuit_spec(response)
+                    break
+                except (CircuitSpecError, ValueError) as e:
+                    larger = self._escalate(tier, reply)
+                    if larger is None:
+                        raise
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {tier.name} tier spec rejected ({e}); retrying on {larger.name} tier")
+                    tier = larger
             return {
-                "components": components,
-                "suggestions": suggestions,
-                "potential_issues": potential_issues,
-                "raw_response": response
+                "success": True,
+                "spec": spec,
+                "message": f"Circuit spec with {len(spec['parts'])} parts and {len(spec['nets'])} nets",
+                "response": response,
+                "tier": tier.name
             }
+        except CircuitSpecError as e:
+            return {"success": False, "message": f"Invalid circuit spec: {e}", "response": response, "tier": tier.name}
+        except Exception as e:
+            return {"success": False, "message": f"Error generating circuit spec: {str(e)}", "response": response, "tier": tier.name}
+    
+    @property
+    def reviewer(self) -> CircuitReviewer:
+        """Reviews cached by circuit content hash, shared with other workers via the artifact store"""
+        if self._reviewer is None:
+            cache = ReviewCache(os.path.join(get_artifact_store().root, 'reviews'))
+            self._reviewer = CircuitReviewer(self._run_review, cache, model_name=self.model_name)
+        return self._reviewer
+    
+    @traced("review.run")
+    def _run_review(self, circuit_data: Dict) -> Dict:
+        """One structured call returning analysis, issues and suggestions together"""
+        prompt = review_prompt(circuit_data)
+        tier = self.tiers.select(KIND_REVIEW, prompt, circuit=circuit_data)
+        while True:
+            reply = self._structured_reply(prompt, REVIEW_SCHEMA, PRIORITY_BACKGROUND, tier, KIND_REVIEW)
+            try:
+                with span("review.parse", tier=tier.name, chars=len(reply['response'])):
+                    return parse_review(reply['response'])
+            except ValueError:
+                tier = self._escalate(tier, reply)
+                if tier is None:
+                    raise
+    
+    def review_circuit(self, circuit_data: Dict) -> Dict:
+        """
+        Review a circuit: summary, component roles, potential issues and
+        categorized suggestions from a single LLM call
+        Args:
+            circuit_data: Dictionary with name, description, components and nets
+        Returns:
+            The review (cached per circuit content hash), or {"error": ...}
+        """
+        try:
+            return self.reviewer.review(circuit_data)
         except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ✗ Error reviewing circuit: {str(e)}")
+            return {"error": f"Error reviewing circuit: {str(e)}"}
+    
+    def submit_review(self, circuit_data: Dict):
+        """Start reviewing a circuit in the background; returns a Future"""
+        with span("review.submit") as submit_span:
+            future = self.reviewer.submit(circuit_data)
+            submit_span.set(cache_hit=future.done())
+            metrics.count_cache("review", future.done())
+            return future
+    
+    def cached_review(self, circuit_data: Dict) -> Optional[Dict]:
+        """The finished review for a circuit, or None if it is not ready"""
+        return self.reviewer.cached(circuit_data)
+    
+    def review_failure(self, circuit_data: Dict) -> Optional[str]:
+        """Why the last review of a circuit failed, or None; submit_review retries"""
+        return self.reviewer.failure(circuit_data)
+    
+    def analyze_circuit(self, circuit_data: Dict) -> Dict:
+        """
+        Analyze circuit design and provide insights
+        Shares one cached review call with suggest_improvements.
+        Args:
+            circuit_data: Dictionary containing circuit information
+        Returns:
+            Dictionary containing analysis results
+        """
+        review = self.review_circuit(circuit_data)
+        if 'error' in review:
             return {
                 "components": [],
                 "suggestions": [],
-                "potential_issues": [f"Error parsing response: {str(e)}"],
-                "raw_response": response
+                "potential_issues": [review['error']],
+                "raw_response": ""
             }
+        return {
+            "summary": review['summary'],
+            "components": review['components'],
+            "suggestions": [item['suggestion'] for item in review['suggestions']],
+            "potential_issues": review['potential_issues'],
+            "raw_response": json.dumps(review, indent=2)
+        }
     
     def suggest_improvements(self, circuit_data: Dict) -> List[Dict]:
         """
-        Suggest possible improvements for the circuit using Llama 3.2's expertise
+        Suggest possible improvements for the circuit
+        Shares one cached review call with analyze_circuit.
         Args:
             circuit_data: Dictionary containing circuit information
         Returns:
-            List of suggested improvements
-        """
-        prompt = f"""
-        As an expert electronics engineer, suggest detailed improvements for this circuit:
-        
-        Circuit Name: {circuit_data.get('name', 'Unnamed')}
-        Description: {circuit_data.get('description', 'No description')}
-        Components: {', '.join(circuit_data.get('components', []))}
-        Connections: {', '.join(circuit_data.get('nets', []))}
-        
-        Please provide specific, actionable improvements for:
-        1. Performance optimization
-        2. Reliability enhancement
-        3. Cost reduction opportunities
-        4. Power efficiency improvements
-        5. EMC/EMI considerations
-        6. Thermal management
-        7. Manufacturing optimization
+            List of suggested improvements ({"category", "suggestion"})
         """
-        
-        response = self.generate_response(prompt)
-        
-        # Convert response to structured format
-        improvements = []
-        current_category = None
-        
-        for line in response.split('\n'):
-            if any(category in line.lower() for category in 
-                  ['performance', 'reliability', 'cost', 'power', 'emc', 'thermal', 'manufacturing']):
-                current_category = line.strip()
-            elif line.strip() and current_category:
-                improvements.append({
-                    "category": current_category,
-                    "suggestion": line.strip()
-                })
-        
-        return improvements
+        review = self.review_circuit(circuit_data)
+        return list(review.get('suggestions', []))
+    
+    def new_conversation(self, session_id: Optional[str] = None) -> ConversationMemory:
+        """Empty conversation memory for one chat session, sized for this engine's prompts"""
+        return ConversationMemory(MEMORY_TOKEN_BUDGET, session_id=session_id)
     
-    def process_user_query(self, query: str, context: Optional[Dict] = None) -> str:
+    @logged_request("chat", route="llm")
+    @traced("chat.query")
+    def process_user_query(self, query: str, context: Optional[Dict] = None, *,
+                           memory: ConversationMemory) -> str:
         """
         Process a natural language query using Llama 2's capabilities
         Args:
             query: User's question or request
             context: Additional context about the current circuit
+            memory: The chat session's conversation (see new_conversation);
+                the engine is shared by every session and keeps none itself
         Returns:
             Response to the user's query
         """
+        with span("prompt.build") as prompt_span:
+            history = memory.render() or 'This is the first message.'
+            circuit_context = compact_context(context, CONTEXT_TOKEN_BUDGET)
         # Build prompt with context and engineering focus
         example_code = '''from skidl import *
 import os
@@ -334,20 +473,27 @@ generate_netlist(file_=f'{circuit_name}.net')'''
         - Make sure to define circuit_name before using it in generate_netlist
         - IMPORTANT: Always include the library download code as shown in the example
         
+        Conversation so far:
+        {history}
+        
         Current request: {query}
         
         Circuit Context:
-        {json.dumps(context, indent=2) if context else 'No circuit loaded'}
+        {circuit_context}
         """
+        prompt_span.set(history_tokens=estimate_tokens(history), context_tokens=estimate_tokens(circuit_context),
+                        prompt_tokens_est=estimate_tokens(prompt))
         
+        tier = self.tiers.select(KIND_CHAT, prompt, text=query, circuit=context,
+                                 memory_tokens=estimate_tokens(history))
         try:
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Generating focused response...")
-            response = ollama.generate(
-                model=self.model_name,
-                prompt=prompt,
-                options=self.model_params
-            )
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Generating focused response ({tier.name} tier)...")
+            response = self._generate(prompt, tier, PRIORITY_INTERACTIVE, KIND_CHAT)
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Response generated successfully")
+            # Remember the explanation rather than the whole code listing
+            explanation = re.search(r'\[EXPLANATION\](.*?)\[/EXPLANATION\]', response['response'], re.DOTALL)
+            memory.add("user", query)
+            memory.add("assistant", explanation.group(1).strip() if explanation else response['response'])
             return response['response']
         except Exception as e:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Error generating response: {str(e)}")
@@ -381,10 +527,13 @@ generate_netlist(file_=f'{circuit_name}.net')'''
             # Look for code between [CODE] tags
             code_match = re.search(r'\[CODE\](.*?)\[/CODE\]', response, re.DOTALL)
             if code_match:
-                return code_match.group(1).strip()
+                code = code_match.group(1).strip()
+                # Some replies still fence the code inside the tags
+                fenced = re.fullmatch(r'```(?:python)?\s*\n(.*?)\s*```', code, re.DOTALL)
+                return fenced.group(1).strip() if fenced else code
             
-            # Fallback: look for code between triple backticks
-            code_match = re.search(r'```python\s*(.*?)\s*```', response, re.DOTALL)
+            # Fallback: look for code between triple backticks, with or without a language
+            code_match = re.search(r'```(?:python)?\s*\n(.*?)\s*```', response, re.DOTALL)
             if code_match:
                 return code_match.group(1).strip()
             
@@ -398,6 +547,9 @@ generate_netlist(file_=f'{circuit_name}.net')'''
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Error extracting code: {str(e)}")
             return None
 
+    @traced("code.execute")
+    @metrics.timed(metrics.CODE_EXECUTION_SECONDS.labels(), metrics.CODE_EXECUTIONS.labels("success"),
+                   metrics.CODE_EXECUTIONS.labels("error"), lambda result: not result[0])
     def execute_circuit_code(self, code: str, circuit_name: str = "generated_circuit") -> Tuple[bool, str, List[str]]:
         """
         Execute LLM-generated circuit code safely and generate output files
@@ -410,8 +562,10 @@ generate_netlist(file_=f'{circuit_name}.net')'''
             Tuple of (success, message, list_of_generated_files)
         """
         try:
-            # Create a temporary directory for execution
-            with tempfile.TemporaryDirectory() as temp_dir:
+            # Create a private workspace for execution; nothing in the
+            # generated script touches the caller's working directory
+            with allocate_workspace(circuit_name) as workspace:
+                temp_dir = workspace.path
                 # Create the Python file
                 code_file = os.path.join(temp_dir, f"{circuit_name}.py")
                 
@@ -421,16 +575,10 @@ import sys
 import traceback
 from datetime import datetime
 
-# Add current directory to path for imports
-sys.path.insert(0, os.getcwd())
-
-# Set up output directory
-output_dir = os.path.join(os.getcwd(), 'kicad_output', '{circuit_name}')
+# The script runs with its private workspace as the working directory
+output_dir = os.path.join(os.getcwd(), 'output')
 os.makedirs(output_dir, exist_ok=True)
 
-# Change to temp directory for execution
-os.chdir(temp_dir)
-
 try:
 {chr(10).join('    ' + line for line in code.split(chr(10)))}
     
@@ -467,22 +615,26 @@ except Exception as e:
                     cwd=temp_dir,
                     timeout=60  # 60 second timeout
                 )
+                add_attributes(returncode=result.returncode, code_bytes=len(safe_code), stdout_bytes=len(result.stdout))
                 
                 if result.returncode == 0:
-                    # Success - collect generated files
+                    # Success - move generated files into the artifact store
+                    # before the temporary directory goes away
                     generated_files = []
-                    output_dir = os.path.join(os.getcwd(), 'kicad_output', circuit_name)
+                    output_dir = os.path.join(temp_dir, 'output')
+                    store = get_artifact_store()
                     
                     # Check for netlist file
                     netlist_file = os.path.join(output_dir, f"{circuit_name}.net")
                     if os.path.exists(netlist_file):
-                        generated_files.append(netlist_file)
+                        generated_files.append(store.put_file(netlist_file, kind="netlist")['path'])
                     
                     # Check for schematic file
                     schematic_file = os.path.join(output_dir, f"{circuit_name}.kicad_sch")
                     if os.path.exists(schematic_file):
-                        generated_files.append(schematic_file)
+                        generated_files.append(store.put_file(schematic_file, kind="schematic")['path'])
                     
+                    add_attributes(files=len(generated_files))
                     return True, result.stdout, generated_files
                 else:
                     return False, f"Code execution failed: {result.stderr}", []
@@ -492,6 +644,7 @@ except Exception as e:
         except Exception as e:
             return False, f"Error executing code: {str(e)}", []
 
+    @traced("llm.code_generation")
     def generate_and_execute_circuit(self, user_request: str) -> Dict:
         """
         Generate circuit code from user request and execute it
@@ -527,7 +680,7 @@ You are a KiCad and electronics expert. Generate Python code using the SKiDL lib
 8. Use proper capacitor values (standard: 0.1µF, 1µF, 10µF, 100µF, etc.)
 
 **CODE TEMPLATE:**
-```python
+[CODE]
 from skidl import *
 import os
 
@@ -542,7 +695,7 @@ set_default_tool('kicad')
 
 # Generate netlist
 generate_netlist()
-```
+[/CODE]
 
 **USER REQUEST:** {user_request}
 
@@ -553,11 +706,13 @@ Generate the complete Python code that creates this circuit. Make sure to:
 - Add helpful comments
 - Handle any errors gracefully
 
-Return ONLY the Python code, no explanations.
+Return ONLY the Python code between [CODE] and [/CODE], as in the template: no explanations, no markdown fences.
 """
             
-            response = self.generate_response(prompt)
-            code = self.extract_code_from_response(response)
+            response = self.generate_response(prompt, tier=self.tiers.select(KIND_CODE, prompt), kind=KIND_CODE)
+            with span("code.extract", chars=len(response)) as extract_span:
+                code = self.extract_code_from_response(response)
+                extract_span.set(found=bool(code), code_chars=len(code or ''))
             
             if not code:
                 return {
@@ -568,16 +723,22 @@ Return ONLY the Python code, no explanations.
                 }
             
             # Execute the code
-            circuit_name = f"circuit_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            circuit_name = f"circuit_{new_job_id()}"
             success, message, generated_files = self.execute_circuit_code(code, circuit_name)
             
+            # Check the netlist the script wrote; generated code is where
+            # dangling pins and shorted nets come from
+            netlists = [path for path in generated_files if path.endswith('.net')]
+            erc_report = check_netlist(netlists[0]) if success and netlists else None
+            
             return {
                 "success": success,
                 "message": message,
                 "response": response,
                 "code": code,
                 "generated_files": generated_files,
-                "circuit_name": circuit_name
+                "circuit_name": circuit_name,
+                "erc": erc_report
             }
             
         except Exception as e:
@@ -0,0 +1,336 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import os
+import sys
+import time
+import bisect
+import functools
+import threading
+
+# In-process metrics in the Prometheus text exposition format. Counters and
+# histograms keep one cell per thread: an increment only touches the
+# calling thread's own cell, so the hot path takes no lock and threads never
+# contend. Reading (a scrape) sums the cells; cells of finished threads are
+# folded into a retired total so thread churn does not grow the registry.
+#
+#   METRICS_PORT   serve GET /metrics on 127.0.0.1:<port> (METRICS_HOST to
+#                  bind elsewhere); unset: metrics are collected but not served
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+class _Shards:
+    """Per-thread cells of `size` numbers, summed on read"""
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._cells: List[Tuple[threading.Thread, List[float]]] = []
+        self._retired = [0.0] * size
+        self._lock = threading.Lock()
+
+    def cell(self) -> List[float]:
+        """The calling thread's cell; only this thread writes to it"""
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0.0] * self._size
+            with self._lock:
+                self._cells.append((threading.current_thread(), cell))
+            self._local.cell = cell
+            return cell
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            live = []
+            for thread, cell in self._cells:
+                if thread.is_alive():
+                    live.append((thread, cell))
+                else:
+                    for i, value in enumerate(cell):
+                        self._retired[i] += value
+            self._cells = live
+            totals = list(self._retired)
+            for _, cell in live:
+                for i, value in enumerate(cell):
+                    totals[i] += value
+        return totals
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _label_text(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    """A metric family: one child per combination of label values"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **named):
+        """The child for these label values, created on first use"""
+        key = tuple(str(named[n]) for n in self.labelnames) if named else tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _unlabelled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} needs labels {self.labelnames}")
+        return self.labels()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+class _CounterChild:
+    __slots__ = ("_shards",)
+
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1):
+        self._shards.cell()[0] += amount
+
+    def value(self) -> float:
+        return self._shards.totals()[0]
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_label_text(labelnames, key)} {_format_value(self.value())}"]
+
+class Counter(_Metric):
+    """A total that only goes up"""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self._unlabelled().inc(amount)
+
+class _HistogramChild:
+    __slots__ = ("_buckets", "_shards")
+
+    def __init__(self, buckets):
+        self._buckets = buckets
+        # One count per bucket, one for +Inf, then the sum
+        self._shards = _Shards(len(buckets) + 2)
+
+    def observe(self, value: float):
+        cell = self._shards.cell()
+        cell[bisect.bisect_left(self._buckets, value)] += 1
+        cell[-1] += value
+
+    def snapshot(self) -> Dict:
+        totals = self._shards.totals()
+        return {"counts": totals[:-1], "sum": totals[-1], "count": sum(totals[:-1])}
+
+    def render(self, name, labelnames, key):
+        snapshot = self.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(list(self._buckets) + [float('inf')], snapshot["counts"]):
+            cumulative += count
+            le = 'le="%s"' % _format_value(bound)
+            lines.append(f"{name}_bucket{_label_text(labelnames, key, le)} {_format_value(cumulative)}")
+        lines.append(f"{name}_sum{_label_text(labelnames, key)} {_format_value(snapshot['sum'])}")
+        lines.append(f"{name}_count{_label_text(labelnames, key)} {_format_value(snapshot['count'])}")
+        return lines
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+class _GaugeChild:
+    __slots__ = ("_value", "_function")
+
+    def __init__(self):
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self._value = value
+
+    def set_function(self, function: Optional[Callable[[], float]]):
+        """Read the value from function at scrape time"""
+        self._function = function
+
+    def value(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return float('nan')
+        return self._value
+
+    def render(self, name, labelnames, key):
+        value = self.value()
+        return [f"{name}{_label_text(labelnames, key)} {'NaN' if value != value else _format_value(value)}"]
+
+class Gauge(_Metric):
+    """A value that is set, or read from a function when scraped"""
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+    def set_function(self, function: Optional[Callable[[], float]]):
+        self._unlabelled().set_function(function)
+
+class MetricsRegistry:
+    """The metrics of a process, rendered together"""
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in the text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+# Metrics of the generation service
+
+REQUESTS = Counter("kicad_ai_requests_total", "Circuit build requests by circuit type and outcome", ("type", "outcome"))
+REQUEST_SECONDS = Histogram("kicad_ai_request_seconds", "Circuit build time by circuit type", ("type",))
+LLM_REQUESTS = Counter("kicad_ai_llm_requests_total", "LLM requests by prompt type, tier and outcome", ("kind", "tier", "outcome"))
+LLM_SECONDS = Histogram("kicad_ai_llm_request_seconds", "LLM request time including queueing, by prompt type", ("kind",))
+LLM_TOKENS = Counter("kicad_ai_llm_tokens_total", "Tokens processed by prompt type and direction (prompt, completion)", ("kind", "direction"))
+LLM_WASTED_TOKENS = Counter("kicad_ai_llm_wasted_tokens_total", "Generated tokens outside the part of the reply that was used", ("kind",))
+LLM_TOKENS_PER_SECOND = Histogram("kicad_ai_llm_decode_tokens_per_second", "Completion tokens per second of decoding, by model", ("model",),
+                                  buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 250, 500))
+LLM_QUEUE_DEPTH = Gauge("kicad_ai_llm_queue_depth", "LLM requests waiting for a dispatcher slot")
+LLM_IN_FLIGHT = Gauge("kicad_ai_llm_in_flight", "LLM requests being served")
+CODE_EXECUTIONS = Counter("kicad_ai_code_executions_total", "Generated SKiDL scripts run, by outcome", ("outcome",))
+CODE_EXECUTION_SECONDS = Histogram("kicad_ai_code_execution_seconds", "Run time of generated SKiDL scripts")
+PROJECT_BUILD_SECONDS = Histogram("kicad_ai_project_build_seconds", "Netlist to zipped KiCad project time")
+CACHE_REQUESTS = Counter("kicad_ai_cache_requests_total", "Cache lookups by cache and result (hit, miss)", ("cache", "result"))
+ARTIFACT_BYTES = Counter("kicad_ai_artifact_bytes_written_total", "Bytes written to the artifact store, by artifact kind", ("kind",))
+ERC_VIOLATIONS = Counter("kicad_ai_erc_violations_total", "Electrical rules violations found in generated circuits, by check and severity", ("code", "severity"))
+
+def timed(seconds, succeeded, failed, is_failure: Callable = lambda result: False):
+    """
+    Decorator: observe each call's duration in the histogram child seconds and
+    count it on the counter child failed if it raises or is_failure(result),
+    else on succeeded
+    """
+    def decorate(func: Callable):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            failure = True
+            try:
+                result = func(*args, **kwargs)
+                failure = is_failure(result)
+                return result
+            finally:
+                seconds.observe(time.perf_counter() - start)
+                (failed if failure else succeeded).inc()
+        return wrapper
+    return decorate
+
+def observe_build(circuit_type: str):
+    """Decorator for circuit builders returning a result dict with "error" on failure"""
+    return timed(REQUEST_SECONDS.labels(circuit_type), REQUESTS.labels(circuit_type, "success"),
+                 REQUESTS.labels(circuit_type, "error"),
+                 lambda result: isinstance(result, dict) and 'error' in result)
+
+def count_cache(cache: str, hit: bool, count: int = 1):
+    """Record cache lookups"""
+    if count:
+        CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc(count)
+
+_servers: Dict[Tuple[str, int], object] = {}
+_servers_lock = threading.Lock()
+
+def start_metrics_server(port: Optional[int] = None, host: Optional[str] = None, registry: MetricsRegistry = None):
+    """
+    Serve GET /metrics on a background thread
+    Args:
+        port: TCP port; defaults to METRICS_PORT (0 picks a free port)
+        host: Interface to bind; defaults to METRICS_HOST or 127.0.0.1
+    Returns:
+        The running server (server.server_address holds the bound port), or
+        None if no port is configured
+    """
+    if port is None:
+        if not os.environ.get('METRICS_PORT'):
+            return None
+        port = int(os.environ['METRICS_PORT'])
+    host = host or os.environ.get('METRICS_HOST') or "127.0.0.1"
+    registry = registry if registry is not None else REGISTRY
+    with _servers_lock:
+        if port and (host, port) in _servers:
+            return _servers[(host, port)]
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood the console
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        _servers[(host, server.server_address[1])] = server
+        print(f"Metrics on http://{host}:{server.server_address[1]}/metrics", file=sys.stderr)
+        return server
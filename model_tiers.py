@@ -0,0 +1,170 @@
+from typing import Dict, List, Optional
+import os
+import re
+import threading
+from conversation_memory import estimate_tokens
+
+# Model tiering: each request is classified by how much work it is and sent
+# to a tier, a model together with the context size and reply cap it runs
+# with. Small requests (a few passives, no prior conversation, a short
+# circuit to review) go to a small, fast model with a small KV cache; large
+# circuits, loaded context and code generation go to the large model.
+# A small-tier reply that does not validate is retried on the large tier
+# (when that is a different model, or the reply ran into the small reply
+# cap), so hard prompts succeed as often as before.
+#
+#   LLM_SMALL_MODEL   model for the small tier (default: the engine's model,
+#                     run with the large tier's context and the smaller
+#                     reply cap)
+#   LLM_NUM_THREAD    CPU threads per request (default: server decides)
+#   LLM_NUM_GPU       layers offloaded to the GPU (default: server decides)
+#
+# num_ctx is fixed per tier rather than sized per request: Ollama reloads a
+# model whenever num_ctx changes, which costs far more than it saves.
+
+TIER_SMALL = "small"
+TIER_LARGE = "large"
+
+# Request kinds the engine classifies
+KIND_CHAT = "chat"
+KIND_SPEC = "spec"
+KIND_REVIEW = "review"
+KIND_CODE = "code"
+
+# Anything beyond a handful of passives, LEDs and supply symbols
+COMPLEX_TERMS = re.compile(
+    r"\b(micro-?controllers?|mcu|arduino|esp32|esp8266|stm32|atmega|attiny|raspberry|"
+    r"op-?amps?|amplifiers?|comparators?|regulators?|buck|boost|ldo|h-?bridge|"
+    r"oscillators?|555|timers?|adc|dac|usb|uart|i2c|spi|can bus|rs-?485|sensors?|motors?|"
+    r"transistors?|mosfets?|bjt|relays?|crystal|pll|multiplexers?|shift register|"
+    r"(?:band-?pass|notch|active|\d+(?:st|nd|rd|th)[- ]order) filters?)\b",
+    re.IGNORECASE)
+
+# Limits of a small request
+SMALL_REQUEST_TOKENS = 48      # Circuit request text
+SMALL_CIRCUIT_PARTS = 12       # Parts in a circuit under review or in context
+SMALL_CIRCUIT_NETS = 16
+SMALL_MEMORY_TOKENS = 256      # Conversation memory carried into a chat prompt
+
+class ModelTier:
+    """A model with the context window and reply cap it is run with"""
+    def __init__(self, name: str, model: str, num_ctx: int, num_predict: int):
+        self.name = name
+        self.model = model
+        self.num_ctx = num_ctx
+        self.num_predict = num_predict
+
+    def options(self, base: Dict) -> Dict:
+        """Request options: base sampling options plus this tier's limits"""
+        return dict(base, num_ctx=self.num_ctx, num_predict=self.num_predict)
+
+    def fits(self, prompt: str) -> bool:
+        """True if the prompt and a full-length reply fit the context window"""
+        return estimate_tokens(prompt) + self.num_predict <= self.num_ctx
+
+    def __repr__(self):
+        return f"ModelTier({self.name!r}, {self.model!r}, num_ctx={self.num_ctx}, num_predict={self.num_predict})"
+
+def hardware_options() -> Dict:
+    """
+    Thread and GPU options, only when configured (LLM_NUM_THREAD, LLM_NUM_GPU)
+    Left unset, the server picks them for the host: a fixed num_gpu asks a
+    CPU-only host for GPU layers, and a fixed num_thread oversubscribes
+    small machines.
+    """
+    options = {}
+    if os.environ.get('LLM_NUM_THREAD'):
+        options["num_thread"] = int(os.environ['LLM_NUM_THREAD'])
+    if os.environ.get('LLM_NUM_GPU'):
+        options["num_gpu"] = int(os.environ['LLM_NUM_GPU'])
+    return options
+
+def _circuit_size(circuit: Optional[Dict]):
+    """(parts, nets) of circuit data or a circuit context, 0 when unknown"""
+    if not isinstance(circuit, dict):
+        return 0, 0
+    parts = circuit.get('components') or circuit.get('parts') or []
+    nets = circuit.get('nets') or []
+    return (len(parts) if isinstance(parts, (list, tuple, dict)) else 0,
+            len(nets) if isinstance(nets, (list, tuple, dict)) else 0)
+
+class TieringPolicy:
+    """
+    Picks the tier for each request and counts the choices
+    """
+    def __init__(self, large_model: str, small_model: Optional[str] = None,
+                 small_ctx: int = 2048, small_predict: int = 512,
+                 large_ctx: int = 4096, large_predict: int = 1536):
+        """
+        Args:
+            large_model: Model for complex requests (the engine's model)
+            small_model: Model for simple requests; defaults to large_model
+            small_ctx, small_predict: Context window and reply cap of the small tier;
+                small_ctx is ignored when both tiers use the same model
+            large_ctx, large_predict: Context window and reply cap of the large tier
+        """
+        small_model = small_model or large_model
+        if small_model == large_model:
+            small_ctx = large_ctx  # One model, one num_ctx: a change would reload it
+        self.small = ModelTier(TIER_SMALL, small_model, small_ctx, small_predict)
+        self.large = ModelTier(TIER_LARGE, large_model, large_ctx, large_predict)
+        self.counts = {TIER_SMALL: 0, TIER_LARGE: 0, "escalated": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, large_model: str) -> "TieringPolicy":
+        """Policy for large_model with the small model from LLM_SMALL_MODEL"""
+        return cls(large_model, os.environ.get('LLM_SMALL_MODEL') or None)
+
+    @property
+    def models(self) -> List[str]:
+        """Distinct models the tiers use"""
+        return list(dict.fromkeys([self.large.model, self.small.model]))
+
+    def classify(self, kind: str, text: str = "", circuit: Optional[Dict] = None,
+                 memory_tokens: int = 0) -> str:
+        """
+        Tier name for a request
+        Args:
+            kind: KIND_CHAT, KIND_SPEC, KIND_REVIEW or KIND_CODE
+            text: The user's request
+            circuit: Circuit under review, or the circuit loaded as chat context
+            memory_tokens: Conversation memory carried into the prompt
+        """
+        if kind == KIND_CODE:
+            return TIER_LARGE  # Generated code is executed; only used when the spec path failed
+        parts, nets = _circuit_size(circuit)
+        if parts > SMALL_CIRCUIT_PARTS or nets > SMALL_CIRCUIT_NETS:
+            return TIER_LARGE
+        if kind == KIND_REVIEW:
+            return TIER_SMALL
+        if kind == KIND_CHAT and (circuit or memory_tokens > SMALL_MEMORY_TOKENS):
+            return TIER_LARGE
+        if estimate_tokens(text) > SMALL_REQUEST_TOKENS or COMPLEX_TERMS.search(text):
+            return TIER_LARGE
+        return TIER_SMALL
+
+    def select(self, kind: str, prompt: str, text: str = "", circuit: Optional[Dict] = None,
+               memory_tokens: int = 0) -> ModelTier:
+        """Tier for a request whose full prompt is prompt; too long a prompt goes to the large tier"""
+        tier = self.small if self.classify(kind, text, circuit, memory_tokens) == TIER_SMALL else self.large
+        if tier is self.small and not tier.fits(prompt):
+            tier = self.large
+        with self._lock:
+            self.counts[tier.name] += 1
+        return tier
+
+    def escalate(self, tier: ModelTier, truncated: bool = False) -> Optional[ModelTier]:
+        """
+        The tier to retry a rejected reply on, or None if a retry cannot help
+        Args:
+            tier: Tier that produced the reply
+            truncated: The reply stopped at the tier's num_predict cap
+        """
+        if tier is self.large:
+            return None
+        if self.small.model == self.large.model and not truncated:
+            return None  # Same model, same deterministic answer
+        with self._lock:
+            self.counts["escalated"] += 1
+        return self.large
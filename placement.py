@@ -0,0 +1,228 @@
+from typing import Dict, List, Optional, Tuple
+
+# Paper sizes in mm (landscape), as accepted by the KiCad (paper "...") token
+PAPER_SIZES = {
+    "A4": (297.0, 210.0),
+    "A3": (420.0, 297.0),
+    "A2": (594.0, 420.0),
+    "A1": (841.0, 594.0),
+    "A0": (1189.0, 841.0),
+}
+
+# Keep clear of the sheet border and the title block in the bottom right
+SHEET_MARGIN = 25.4
+TITLE_BLOCK_HEIGHT = 40.64
+
+# Schematic grid; every coordinate handed out is a multiple of this
+GRID = 2.54
+
+class Placement:
+    """
+    Result of a placement run
+    positions: {ref: (x, y)} in mm on the part's own sheet
+    sheets: {ref: sheet_index}, numbered from 0 in page order
+    """
+    def __init__(self, positions: Dict[str, Tuple[float, float]], sheets: Dict[str, int], num_sheets: int, paper: str):
+        self.positions = positions
+        self.sheets = sheets
+        self.num_sheets = num_sheets
+        self.paper = paper
+
+    def refs_on_sheet(self, sheet: int) -> List[str]:
+        """Return the refs placed on the given sheet, in placement order"""
+        return [ref for ref, s in self.sheets.items() if s == sheet]
+
+def _snap(value: float) -> float:
+    return round(value / GRID) * GRID
+
+def _find(parent: List[int], i: int) -> int:
+    root = i
+    while parent[root] != root:
+        root = parent[root]
+    while parent[i] != root:
+        parent[i], i = root, parent[i]
+    return root
+
+def cluster_components(refs: List[str], net_map: Dict[str, List[Tuple[str, str]]], max_net_size: int = 16) -> List[List[str]]:
+    """
+    Group parts into clusters of parts that share small nets
+
+    Nets with more than max_net_size pins (GND, supply rails, busses) would
+    merge everything into one cluster, so they are ignored. Within each
+    cluster parts are ordered breadth-first from the most connected part,
+    which keeps directly connected parts next to each other. Clusters are
+    returned largest first.
+    """
+    index = {ref: i for i, ref in enumerate(refs)}
+    parent = list(range(len(refs)))
+    adjacency: List[List[int]] = [[] for _ in refs]
+
+    for nodes in net_map.values():
+        members = sorted({index[ref] for ref, _ in nodes if ref in index})
+        if len(members) < 2 or len(members) > max_net_size:
+            continue
+        first = members[0]
+        for other in members[1:]:
+            root_a, root_b = _find(parent, first), _find(parent, other)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+            adjacency[first].append(other)
+            adjacency[other].append(first)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(refs)):
+        groups.setdefault(_find(parent, i), []).append(i)
+
+    clusters = []
+    for members in groups.values():
+        seed = max(members, key=lambda i: (len(adjacency[i]), -i))
+        order = [seed]
+        seen = {seed}
+        head = 0
+        while head < len(order):
+            for j in adjacency[order[head]]:
+                if j not in seen:
+                    seen.add(j)
+                    order.append(j)
+            head += 1
+        # Parts only reachable through ignored nets
+        order.extend(i for i in members if i not in seen)
+        clusters.append([refs[i] for i in order])
+
+    clusters.sort(key=lambda c: (-len(c), c[0]))
+    return clusters
+
+def _serpentine_slots(cols: int, rows: int) -> List[Tuple[int, int]]:
+    """Cells of one sheet in boustrophedon order, so consecutive slots touch"""
+    slots = []
+    for row in range(rows):
+        cells = range(cols) if row % 2 == 0 else range(cols - 1, -1, -1)
+        slots.extend((col, row) for col in cells)
+    return slots
+
+def _pack_clusters(clusters: List[List[str]], cols: int, rows: int) -> List[Tuple[List[str], int, List[Tuple[int, int]]]]:
+    """
+    Lay clusters out along a serpentine path through each sheet's cells
+
+    A cluster that does not fit in what is left of the current sheet starts
+    a new sheet; only clusters bigger than a whole sheet are split.
+    Returns:
+        List of (refs, sheet, [(col, row), ...]) per block
+    """
+    slots = _serpentine_slots(cols, rows)
+    capacity = len(slots)
+    placed = []
+    sheet, used = 0, 0
+    for cluster in clusters:
+        if used and len(cluster) > capacity - used and len(cluster) <= capacity:
+            sheet, used = sheet + 1, 0
+        start = 0
+        while start < len(cluster):
+            if used == capacity:
+                sheet, used = sheet + 1, 0
+            take = min(len(cluster) - start, capacity - used)
+            placed.append((cluster[start:start + take], sheet, slots[used:used + take]))
+            start += take
+            used += take
+    return placed
+
+def _refine(slot_xy: "np.ndarray", part_block: "np.ndarray", pin_part: "np.ndarray", pin_net: "np.ndarray",
+            num_nets: int, iterations: int, row_pitch: float) -> "np.ndarray":
+    """
+    Barycentric refinement: move every part towards the centroid of the nets
+    it is on, then re-seat parts onto their block's slots in sorted order
+
+    Slots never change, only which part sits in which slot, so the result
+    stays on the grid and overlap-free. Each pass is O(pins + n log n).
+    """
+    import numpy as np
+    num_parts = len(part_block)
+    assignment = np.arange(num_parts)  # slot index for each part
+    # Slots of each block in row-major order (stable sort keeps it per block)
+    slot_order = np.lexsort((slot_xy[:, 0], slot_xy[:, 1], part_block))
+    degree = np.bincount(pin_part, minlength=num_parts).astype(float)
+    net_size = np.bincount(pin_net, minlength=num_nets).astype(float)
+
+    for _ in range(iterations):
+        xy = slot_xy[assignment]
+        net_sum = np.zeros((num_nets, 2))
+        np.add.at(net_sum, pin_net, xy[pin_part])
+        net_centroid = net_sum / np.maximum(net_size, 1.0)[:, None]
+
+        target = np.zeros((num_parts, 2))
+        np.add.at(target, pin_part, net_centroid[pin_net])
+        has_nets = degree > 0
+        target[has_nets] /= degree[has_nets][:, None]
+        target[~has_nets] = xy[~has_nets]
+
+        row_bucket = np.round(target[:, 1] / row_pitch)
+        part_order = np.lexsort((target[:, 0], row_bucket, part_block))
+        assignment = np.empty(num_parts, dtype=int)
+        assignment[part_order] = slot_order
+    return slot_xy[assignment]
+
+def place_components(refs: List[str], net_map: Dict[str, List[Tuple[str, str]]],
+                     cell_size: Tuple[float, float] = (25.4, 20.32), paper: str = "A4",
+                     max_net_size: int = 16, iterations: int = 4, origin: Optional[Tuple[float, float]] = None) -> Placement:
+    """
+    Place parts on a grid, grouped by net connectivity, spilling onto
+    additional sheets when a sheet is full
+    Args:
+        refs: Part references in netlist order
+        net_map: {net_name: [(ref, pin), ...]}
+        cell_size: Width and height reserved for each part in mm
+        paper: Sheet size, a key of PAPER_SIZES
+        max_net_size: Nets with more pins than this don't pull parts together
+        iterations: Barycentric refinement passes
+        origin: Top-left corner of the placement area on each sheet
+    Returns:
+        Placement with positions snapped to the schematic grid
+    """
+    if not refs:
+        return Placement({}, {}, 1, paper)
+    # NumPy is only needed once there is something to place
+    import numpy as np
+
+    width, height = PAPER_SIZES.get(paper, PAPER_SIZES["A4"])
+    cell_w, cell_h = _snap(cell_size[0]) or GRID, _snap(cell_size[1]) or GRID
+    x0, y0 = origin or (_snap(SHEET_MARGIN + cell_w / 2), _snap(SHEET_MARGIN + cell_h / 2))
+    cols = max(1, int((width - 2 * SHEET_MARGIN) // cell_w))
+    rows = max(1, int((height - 2 * SHEET_MARGIN - TITLE_BLOCK_HEIGHT) // cell_h))
+
+    clusters = cluster_components(refs, net_map, max_net_size)
+    blocks = _pack_clusters(clusters, cols, rows)
+
+    ordered_refs = []
+    slot_list = []
+    block_ids = []
+    sheet_list = []
+    for block_id, (block, sheet, slots) in enumerate(blocks):
+        ordered_refs.extend(block)
+        slot_list.extend(slots)
+        block_ids.extend([block_id] * len(block))
+        sheet_list.extend([sheet] * len(block))
+
+    slot_xy = np.array(slot_list, dtype=float) * np.array([cell_w, cell_h]) + np.array([x0, y0])
+    part_block = np.array(block_ids)
+    # Sheets side by side, so refinement never mixes up parts from different sheets
+    sheet_offset = np.zeros_like(slot_xy)
+    sheet_offset[:, 0] = np.array(sheet_list) * width
+
+    if iterations > 0:
+        index = {ref: i for i, ref in enumerate(ordered_refs)}
+        pin_part = []
+        pin_net = []
+        net_id = 0
+        for nodes in net_map.values():
+            members = sorted({index[ref] for ref, _ in nodes if ref in index})
+            if 2 <= len(members) <= max_net_size:
+                pin_part.extend(members)
+                pin_net.extend([net_id] * len(members))
+                net_id += 1
+        if net_id:
+            slot_xy = _refine(slot_xy + sheet_offset, part_block, np.array(pin_part), np.array(pin_net),
+                              net_id, iterations, cell_h) - sheet_offset
+
+    positions = {ref: (round(float(x), 2), round(float(y), 2)) for ref, (x, y) in zip(ordered_refs, slot_xy)}
+    sheets = dict(zip(ordered_refs, sheet_list))
+    return Placement(positions, sheets, max(sheet_list) + 1, paper)
@@ -0,0 +1,115 @@
+from typing import Dict, Optional
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from tracing import add_attributes
+
+# Opt-in profiling of single requests. A profiled request runs with a
+# sampling profiler: a background thread reads the request thread's stack
+# every SAMPLE_INTERVAL seconds (sys._current_frames) and counts identical
+# stacks. The result is stored next to the request's other artifacts in
+# collapsed-stack format, one "frame;frame;frame count" line per stack, which
+# flamegraph.pl, speedscope and inferno read directly.
+#
+# Sampling measures wall-clock time: a request waiting on the model server
+# or a SKiDL subprocess shows up in Future.result / subprocess.run, where a
+# deterministic profiler would only count CPU time in Python calls. Requests
+# that are not profiled pay nothing: no thread, no trace hook, one flag test.
+#
+#   UI_ADMIN   show the profiling switch (and the other admin controls) in the chat UI
+
+SAMPLE_INTERVAL = 0.005
+# Frames deeper than this are cut from the root side of a stack
+MAX_DEPTH = 128
+
+def frame_label(code) -> str:
+    """'function (file.py:line)' for a code object, as flame graph tools expect"""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Counts the stacks of one thread, sampled at a fixed interval"""
+    def __init__(self, thread_id: Optional[int] = None, interval: float = SAMPLE_INTERVAL):
+        """
+        Args:
+            thread_id: Thread to sample; defaults to the calling thread
+            interval: Seconds between samples
+        """
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = 0.0
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.seconds = time.perf_counter() - self._started
+
+    def _run(self):
+        labels: Dict = {}  # Labels per code object, built once
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            del frame
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Samples in collapsed-stack format, most frequent stack first"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class RequestProfile:
+    """Outcome of a profiled request: the stored collapsed stacks"""
+    def __init__(self):
+        self.path = None
+        self.hash = None
+        self.samples = 0
+
+@contextmanager
+def profile_request(name: str, enabled: bool = False, store=None, metadata: Optional[Dict] = None):
+    """
+    Profile the block when enabled and store its collapsed stacks as a
+    "profile" artifact named <name>.collapsed
+    Yields:
+        RequestProfile (path set once the block ends), or None when disabled
+    """
+    if not enabled:
+        yield None
+        return
+    from artifact_store import get_artifact_store
+    profile = RequestProfile()
+    sampler = StackSampler()
+    sampler.start()
+    try:
+        yield profile
+    finally:
+        sampler.stop()
+        profile.samples = sampler.samples
+        record = (store or get_artifact_store()).put_bytes(
+            sampler.collapsed().encode('utf-8'), name=f"{name}.collapsed", kind="profile",
+            metadata=dict(metadata or {}, samples=sampler.samples, interval_ms=sampler.interval * 1000,
+                          seconds=round(sampler.seconds, 3))
+        )
+        profile.path, profile.hash = record['path'], record['hash']
+        add_attributes(profile=record['hash'], profile_samples=sampler.samples)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Re-drive requests captured by the request log (request_log.py)
+
+Each record is replayed at its original offset from the first one, divided
+by --speed (2 = twice as fast, 0 = back to back), so bursts and idle gaps
+of real traffic are kept. Requests run through the pipeline in this process
+against the configured model server (LLM_BACKEND / LLM_BASE_URL, e.g. a
+running Ollama); --llm-only re-sends just the recorded model calls, with
+their original model, prompt, options and format, straight to the server.
+
+Afterwards it prints recorded and replayed latency side by side and counts
+requests whose outcome or artifact hash changed.
+
+Usage: python replay_requests.py LOG [--speed N] [--max-concurrency N] [--limit N]
+                                     [--types custom,chat] [--llm-only] [--report FILE]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from request_log import get_request_log, read_request_log, result_error, set_request_log
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+def _builders():
+    from generate_circuit import create_voltage_divider, create_rc_low_pass_filter, create_led_circuit
+    return {"voltage_divider": create_voltage_divider, "rc_low_pass_filter": create_rc_low_pass_filter,
+            "led": create_led_circuit}
+
+def pipeline_driver(generator, engine):
+    """
+    Replay a record through the pipeline in this process. Chat requests of
+    one recorded session share a conversation; unrecorded sessions get a new one.
+    """
+    builders = _builders()
+    sessions = {}
+    lock = threading.Lock()
+
+    def conversation(session_id):
+        if session_id is None:
+            return engine.new_conversation()
+        with lock:
+            if session_id not in sessions:
+                sessions[session_id] = engine.new_conversation(session_id)
+            return sessions[session_id]
+
+    def drive(record):
+        params = record.get("params") or {}
+        kind = record["type"]
+        if kind == "custom":
+            return generator.generate_custom_circuit(params.get("user_request", record.get("prompt", "")))
+        if kind == "chat":
+            return engine.process_user_query(params.get("query", record.get("prompt", "")), params.get("context"),
+                                             memory=conversation(record.get("session")))
+        if kind in builders:
+            return builders[kind](**params)
+        raise ValueError(f"Cannot replay request type {kind!r}")
+    return drive
+
+def llm_driver(backend):
+    """Replay a record's model calls, one after another, straight to the backend"""
+    def drive(record):
+        for call in record.get("llm", []):
+            backend.generate(call["model"], call["prompt"], options=call.get("options"), format=call.get("format"))
+        return None
+    return drive
+
+def _summary(result):
+    """(outcome, error, artifact hash) of a replayed result"""
+    error = result_error(result)
+    artifact_hash = result.get('artifact_hash') if isinstance(result, dict) else None
+    if artifact_hash is None and isinstance(result, dict) and result.get('generated_files'):
+        artifact_hash = os.path.splitext(os.path.basename(result['generated_files'][-1]))[0]
+    return ("error" if error else "success"), error, artifact_hash
+
+def replay(records, drive, speed: float = 1.0, max_concurrency: int = 16):
+    """
+    Replay records with their original pacing
+    Args:
+        records: Request log records, oldest first
+        drive: Callable running one record and returning its result
+        speed: Pacing factor; 0 sends every request as soon as a slot is free
+        max_concurrency: Requests running at once
+    Returns:
+        One result dict per record, in record order
+    """
+    records = list(records)
+    if not records:
+        return []
+    origin = records[0]["ts"]
+    results = [None] * len(records)
+    start = time.perf_counter()
+
+    def run(index, record, due):
+        began = time.perf_counter()
+        outcome, error, artifact_hash = "error", None, None
+        try:
+            result = drive(record)
+            outcome, error, artifact_hash = _summary(result)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        results[index] = {
+            "id": record.get("id"), "type": record.get("type"),
+            "lag_s": round(max(0.0, began - start - due), 4),
+            "recorded_s": record.get("seconds"), "replayed_s": round(time.perf_counter() - began, 4),
+            "recorded_outcome": record.get("outcome"), "outcome": outcome, "error": error,
+            "recorded_hash": record.get("artifact_hash"), "hash": artifact_hash,
+        }
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        for index, record in enumerate(records):
+            due = (record["ts"] - origin) / speed if speed > 0 else 0.0
+            wait = start + due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            pool.submit(run, index, record, due)
+    return results
+
+def compare(results) -> dict:
+    """Recorded vs replayed latency, and requests whose outcome or artifact changed"""
+    recorded = [r["recorded_s"] for r in results if r["recorded_s"] is not None]
+    replayed = [r["replayed_s"] for r in results]
+    return {
+        "requests": len(results),
+        "recorded_p50_s": round(percentile(recorded, 0.50), 4),
+        "recorded_p95_s": round(percentile(recorded, 0.95), 4),
+        "replayed_p50_s": round(percentile(replayed, 0.50), 4),
+        "replayed_p95_s": round(percentile(replayed, 0.95), 4),
+        "max_lag_s": max((r["lag_s"] for r in results), default=0.0),
+        "errors": sum(1 for r in results if r["outcome"] == "error"),
+        "outcome_changed": [r["id"] for r in results if r["recorded_outcome"] and r["outcome"] != r["recorded_outcome"]],
+        "hash_changed": [r["id"] for r in results if r["recorded_hash"] and r["hash"] and r["hash"] != r["recorded_hash"]],
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a captured request log")
+    parser.add_argument("log", help="Request log (its rotated files are read too)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Pacing factor: 1 original, 10 ten times faster, 0 no pacing")
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--limit", type=int, help="Replay only the first N records")
+    parser.add_argument("--types", help="Comma-separated request types to replay (default: all)")
+    parser.add_argument("--llm-only", action="store_true", help="Send only the recorded model calls to the server")
+    parser.add_argument("--model", help="Model to use instead of the recorded ones")
+    parser.add_argument("--report", help="Write per-request results to this JSON file")
+    args = parser.parse_args()
+
+    records = list(read_request_log(args.log))
+    if args.types:
+        wanted = set(args.types.split(","))
+        records = [r for r in records if r.get("type") in wanted]
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        print(f"No records to replay in {args.log}")
+        sys.exit(1)
+    if args.model:
+        for record in records:
+            for call in record.get("llm", []):
+                call["model"] = args.model
+
+    current_log = get_request_log()
+    if current_log is not None and current_log.path == os.path.abspath(args.log):
+        set_request_log(None)  # Do not append the replay to the log being replayed
+
+    from llm_backends import create_backend
+    if args.llm_only:
+        drive = llm_driver(create_backend())
+    else:
+        from llm_engine import LLMEngine
+        from generate_circuit import CircuitGenerator
+        engine = LLMEngine(args.model or "llama2")
+        generator = CircuitGenerator(llm_engine_factory=lambda: engine)
+        drive = pipeline_driver(generator, engine)
+
+    span_s = records[-1]["ts"] - records[0]["ts"]
+    print(f"Replaying {len(records)} requests recorded over {span_s:.1f}s at speed {args.speed or 'unpaced'}")
+    results = replay(records, drive, args.speed, args.max_concurrency)
+    summary = compare(results)
+    print(f"{'':>10} {'p50 s':>9} {'p95 s':>9}")
+    print(f"{'recorded':>10} {summary['recorded_p50_s']:>9.3f} {summary['recorded_p95_s']:>9.3f}")
+    print(f"{'replayed':>10} {summary['replayed_p50_s']:>9.3f} {summary['replayed_p95_s']:>9.3f}")
+    print(f"Errors: {summary['errors']}, outcome changed: {len(summary['outcome_changed'])}, "
+          f"artifact changed: {len(summary['hash_changed'])}, max start lag: {summary['max_lag_s']:.2f}s")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({"summary": summary, "results": results}, f, indent=2)
+    sys.exit(1 if summary["errors"] else 0)
@@ -0,0 +1,194 @@
+from typing import Callable, Dict, Iterator, List, Optional
+import os
+import sys
+import json
+import time
+import inspect
+import functools
+import threading
+import contextvars
+from workspace import new_job_id
+
+# Append-only log of every circuit and chat request, one JSON object per
+# line, for load tests and before/after comparisons (see replay_requests.py).
+# A record holds what is needed to re-drive the request and to compare the
+# result:
+#
+#   ts, id, type, params      when and what was asked (type: custom, chat,
+#                             voltage_divider, rc_low_pass_filter, led)
+#   prompt                    the user's request text, if any
+#   session                   chat session the request continues, if any
+#   route                     template (no LLM), spec, code or llm
+#   llm                       each model call: kind, tier, model, options,
+#                             format, prompt, timings and token counts
+#   artifacts, artifact_hash  stored files (content hashes) and the main one
+#   seconds, outcome, error   how it went
+#
+#   REQUEST_LOG              log file (default: off); e.g. logs/requests.jsonl
+#   REQUEST_LOG_MAX_BYTES    rotate when the file would grow past this (10 MB)
+#   REQUEST_LOG_BACKUPS      rotated files kept as REQUEST_LOG.1 ... .N (5)
+#
+# Records are written whole with one write each, so concurrent requests
+# never interleave lines. Rotation is coordinated within one process only.
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+
+_current_record: "contextvars.ContextVar[Optional[Dict]]" = contextvars.ContextVar("current_request", default=None)
+
+class RequestLog:
+    """Size-rotated, append-only JSONL file"""
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["RequestLog"]:
+        """The log configured by REQUEST_LOG, or None"""
+        if not os.environ.get('REQUEST_LOG'):
+            return None
+        return cls(os.environ['REQUEST_LOG'],
+                   int(os.environ.get('REQUEST_LOG_MAX_BYTES', DEFAULT_MAX_BYTES)),
+                   int(os.environ.get('REQUEST_LOG_BACKUPS', DEFAULT_BACKUPS)))
+
+    def files(self) -> List[str]:
+        """Existing log files, oldest first"""
+        rotated = [f"{self.path}.{i}" for i in range(self.backups, 0, -1)]
+        return [p for p in rotated + [self.path] if os.path.exists(p)]
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def write(self, record: Dict):
+        line = (json.dumps(record, default=str, separators=(',', ':')) + "\n").encode('utf-8')
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                size = 0
+            if size and size + len(line) > self.max_bytes:
+                self._rotate()
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+def read_request_log(path: str, backups: int = DEFAULT_BACKUPS) -> Iterator[Dict]:
+    """Records from a log and its rotated files, oldest first"""
+    for name in RequestLog(path, backups=backups).files():
+        with open(name, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by a crash
+
+_log: Optional[RequestLog] = RequestLog.from_env()
+
+def get_request_log() -> Optional[RequestLog]:
+    """The log records are written to, or None"""
+    return _log
+
+def set_request_log(log: Optional[RequestLog]):
+    """Write records to log (None: stop logging)"""
+    global _log
+    _log = log
+
+def annotate(**fields):
+    """Set fields (e.g. route) on the request being recorded, if any"""
+    record = _current_record.get()
+    if record is not None:
+        record.update(fields)
+
+def add_llm_call(kind: Optional[str], tier: str, model: str, options: Dict, format, prompt: str,
+                 seconds: float, reply: Optional[Dict] = None, error: Optional[str] = None):
+    """Add one model call to the request being recorded, if any"""
+    record = _current_record.get()
+    if record is None:
+        return
+    call = {"kind": kind, "tier": tier, "model": model, "options": options, "format": format,
+            "prompt": prompt, "seconds": round(seconds, 4)}
+    if reply is not None:
+        call.update(prompt_tokens=reply.get('prompt_tokens', 0), completion_tokens=reply.get('completion_tokens', 0),
+                    done_reason=reply.get('done_reason', ''))
+    if error:
+        call["error"] = error
+    record["llm"].append(call)
+
+def add_artifact(kind: str, digest: str, size: int, dedup: bool):
+    """Add a stored file to the request being recorded, if any"""
+    record = _current_record.get()
+    if record is not None:
+        record["artifacts"].append({"kind": kind, "hash": digest, "bytes": size, "dedup": dedup})
+
+def result_error(result) -> Optional[str]:
+    """Error message of a failed result, or None"""
+    if isinstance(result, dict):
+        if 'error' in result:
+            return str(result['error'])
+        if result.get('success') is False:
+            return str(result.get('message', 'failed'))
+    return None
+
+def logged_request(request_type: str, route: Optional[str] = None):
+    """
+    Decorator: record each call as one request. Calls made while another
+    request is being recorded (a builder inside a custom request) are part
+    of that request and are not recorded again.
+    Args:
+        request_type: Type written to the record, used by the replay tool
+        route: Route to record unless the call annotates one
+    """
+    def decorate(func: Callable):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            log = _log
+            if log is None or _current_record.get() is not None:
+                return func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k not in ('self', 'memory')}
+            record = {"ts": time.time(), "id": new_job_id(), "type": request_type, "params": params,
+                      "prompt": next((v for v in params.values() if isinstance(v, str)), None),
+                      "route": route, "llm": [], "artifacts": []}
+            memory = bound.arguments.get('memory')
+            if memory is not None:
+                record["session"] = memory.session_id
+            token = _current_record.set(record)
+            start = time.perf_counter()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            except BaseException as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                _current_record.reset(token)
+                record["seconds"] = round(time.perf_counter() - start, 4)
+                error = record.get("error") or result_error(result)
+                record["outcome"] = "error" if error else "success"
+                if error:
+                    record["error"] = error
+                if isinstance(result, dict) and result.get('artifact_hash'):
+                    record["artifact_hash"] = result['artifact_hash']
+                elif record["artifacts"]:
+                    record["artifact_hash"] = record["artifacts"][-1]["hash"]
+                try:
+                    log.write(record)
+                except OSError as e:
+                    print(f"Request log write failed: {e}", file=sys.stderr)
+        return wrapper
+    return decorate
@@ -0,0 +1,278 @@
+from typing import Dict, List, Optional, Tuple
+
+# Length of the wire stub between a pin and its net label
+LABEL_STUB = 5.08
+
+# Wire bends land on this grid; detours clear end points by DETOUR
+ROUTE_GRID = 1.27
+DETOUR = 5.08
+
+_EPS = 1e-6
+
+Point = Tuple[float, float]
+Rect = Tuple[float, float, float, float]
+
+class GridIndex:
+    """
+    Uniform-grid spatial index over axis-aligned segments, rectangles and
+    points, bucketed per sheet. Inserts and queries touch only the cells an
+    item covers, so lookups stay O(1) on average however large the sheet.
+    """
+    def __init__(self, cell: float = 10.16):
+        self.cell = cell
+        self.buckets: Dict[Tuple[int, int, int], List[int]] = {}
+        self.items: List[Optional[Tuple[str, str, Rect]]] = []  # (kind, owner, box)
+
+    def _cells(self, sheet: int, box: Rect):
+        x1, y1, x2, y2 = box
+        for cx in range(int(x1 // self.cell), int(x2 // self.cell) + 1):
+            for cy in range(int(y1 // self.cell), int(y2 // self.cell) + 1):
+                yield (sheet, cx, cy)
+
+    def insert(self, sheet: int, kind: str, owner: str, box: Rect) -> int:
+        """Add an item; kind is "body", "wire" or "pin", owner a ref or net name"""
+        item_id = len(self.items)
+        self.items.append((kind, owner, box))
+        for key in self._cells(sheet, box):
+            self.buckets.setdefault(key, []).append(item_id)
+        return item_id
+
+    def remove(self, item_id: int):
+        """Drop an item; its bucket entries are skipped from now on"""
+        self.items[item_id] = None
+
+    def query(self, sheet: int, box: Rect) -> List[Tuple[str, str, Rect]]:
+        """Return items whose cells overlap box (a superset of true hits)"""
+        seen = set()
+        hits = []
+        for key in self._cells(sheet, box):
+            for item_id in self.buckets.get(key, ()):
+                if item_id not in seen and self.items[item_id] is not None:
+                    seen.add(item_id)
+                    hits.append(self.items[item_id])
+        return hits
+
+class RoutingResult:
+    """
+    Output of route_nets, grouped by kind
+    wires: (sheet, net, start, end)
+    junctions: (sheet, net, point)
+    net_labels: (sheet, net, point) local label naming a wired net
+    label_pins: (sheet, net, ref, pin, pin_point, label_point) label stubs
+    """
+    def __init__(self):
+        self.wires: List[Tuple[int, str, Point, Point]] = []
+        self.junctions: List[Tuple[int, str, Point]] = []
+        self.net_labels: List[Tuple[int, str, Point]] = []
+        self.label_pins: List[Tuple[int, str, str, str, Point, Point]] = []
+        self.routed_nets: List[str] = []
+        self.labelled_nets: List[str] = []
+
+def _box(a: Point, b: Point) -> Rect:
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[0], b[0]), max(a[1], b[1]))
+
+def _on_segment(p: Point, box: Rect) -> bool:
+    """True if point p lies on the axis-aligned segment spanned by box"""
+    return box[0] - _EPS <= p[0] <= box[2] + _EPS and box[1] - _EPS <= p[1] <= box[3] + _EPS
+
+def _segment_conflicts(seg: Rect, net: str, index: GridIndex, sheet: int, ends: Tuple[Point, Point]) -> bool:
+    """
+    Check a candidate wire against everything near it. A wire may not
+    enter a symbol body, touch another net's pin, or touch another net's
+    wire anywhere except a clean perpendicular crossing.
+    """
+    horizontal = abs(seg[1] - seg[3]) < _EPS
+    for kind, owner, box in index.query(sheet, seg):
+        if kind == "body":
+            if horizontal:
+                if box[1] + _EPS < seg[1] < box[3] - _EPS and max(seg[0], box[0]) < min(seg[2], box[2]) - _EPS:
+                    return True
+            elif box[0] + _EPS < seg[0] < box[2] - _EPS and max(seg[1], box[1]) < min(seg[3], box[3]) - _EPS:
+                return True
+        elif owner == net:
+            continue
+        elif kind == "pin":
+            if _on_segment((box[0], box[1]), seg):
+                return True
+        else:
+            other_horizontal = abs(box[1] - box[3]) < _EPS
+            if horizontal == other_horizontal:
+                # Collinear segments connect if they share any point
+                if horizontal and abs(box[1] - seg[1]) < _EPS and box[0] <= seg[2] + _EPS and seg[0] <= box[2] + _EPS:
+                    return True
+                if not horizontal and abs(box[0] - seg[0]) < _EPS and box[1] <= seg[3] + _EPS and seg[1] <= box[3] + _EPS:
+                    return True
+            else:
+                cross = (box[0], seg[1]) if horizontal else (seg[0], box[1])
+                if _on_segment(cross, seg) and _on_segment(cross, box):
+                    # Crossing is fine unless it lands on an end of either wire
+                    other_ends = ((box[0], box[1]), (box[2], box[3]))
+                    for end in ends + other_ends:
+                        if abs(end[0] - cross[0]) < _EPS and abs(end[1] - cross[1]) < _EPS:
+                            return True
+    return False
+
+def _polyline(points: List[Point]) -> List[Tuple[Point, Point]]:
+    """Consecutive segments through points, skipping zero-length ones"""
+    return [(a, b) for a, b in zip(points, points[1:]) if abs(a[0] - b[0]) > _EPS or abs(a[1] - b[1]) > _EPS]
+
+def _snap(value: float) -> float:
+    return round(round(value / ROUTE_GRID) * ROUTE_GRID, 2)
+
+def _candidate_routes(a: Point, b: Point) -> List[List[Tuple[Point, Point]]]:
+    """
+    Orthogonal routes from a to b, simplest first: the straight or L-shaped
+    routes, then Z-shaped routes through the midpoint and detours around
+    the two end points
+    """
+    if abs(a[0] - b[0]) < _EPS or abs(a[1] - b[1]) < _EPS:
+        routes = [[a, b]]
+    else:
+        routes = [[a, (b[0], a[1]), b], [a, (a[0], b[1]), b]]
+    mid_x = _snap((a[0] + b[0]) / 2)
+    mid_y = _snap((a[1] + b[1]) / 2)
+    low_y, high_y = min(a[1], b[1]), max(a[1], b[1])
+    low_x, high_x = min(a[0], b[0]), max(a[0], b[0])
+    for x in (mid_x, low_x - DETOUR, high_x + DETOUR):
+        routes.append([a, (x, a[1]), (x, b[1]), b])
+    for y in (mid_y, low_y - DETOUR, high_y + DETOUR):
+        routes.append([a, (a[0], y), (b[0], y), b])
+    return [_polyline(route) for route in routes]
+
+def _spanning_edges(points: List[Point]) -> List[Tuple[int, int]]:
+    """Prim's minimum spanning tree under Manhattan distance (small nets only)"""
+    in_tree = [False] * len(points)
+    best = [float('inf')] * len(points)
+    parent = [-1] * len(points)
+    best[0] = 0.0
+    edges = []
+    for _ in range(len(points)):
+        u = min((i for i in range(len(points)) if not in_tree[i]), key=lambda i: best[i])
+        in_tree[u] = True
+        if parent[u] >= 0:
+            edges.append((parent[u], u))
+        for v in range(len(points)):
+            if not in_tree[v]:
+                d = abs(points[u][0] - points[v][0]) + abs(points[u][1] - points[v][1])
+                if d < best[v]:
+                    best[v], parent[v] = d, u
+    return edges
+
+def _anchors(point: Point, parent: Point, segments: List[Tuple[Point, Point]]) -> List[Point]:
+    """
+    Points a new pin may connect to: its spanning-tree parent, or the
+    closest point on any wire already laid for the net, nearest first
+    """
+    anchors = {parent}
+    for s, e in segments:
+        box = _box(s, e)
+        anchors.add((min(max(point[0], box[0]), box[2]), min(max(point[1], box[1]), box[3])))
+    anchors.discard(point)
+    return sorted(anchors, key=lambda q: (abs(q[0] - point[0]) + abs(q[1] - point[1]), q))
+
+def _route_net(net: str, pins: List[Tuple[str, str, int, float, float]], index: GridIndex) -> Optional[List[Tuple[Point, Point]]]:
+    """Route one net on one sheet, or return None if any pin can't be reached"""
+    sheet = pins[0][2]
+    points = [(x, y) for _, _, _, x, y in pins]
+    segments = []
+    inserted = []
+    for a, b in _spanning_edges(points):
+        found = None
+        for anchor in _anchors(points[b], points[a], segments):
+            for route in _candidate_routes(points[b], anchor):
+                if not any(_segment_conflicts(_box(s, e), net, index, sheet, (s, e)) for s, e in route):
+                    found = route
+                    break
+            if found is not None:
+                break
+        if found is None:
+            # Give the space back to the nets routed after this one
+            for item_id in inserted:
+                index.remove(item_id)
+            return None
+        segments.extend(found)
+        # Later edges of the same net must see this one
+        for s, e in found:
+            inserted.append(index.insert(sheet, "wire", net, _box(s, e)))
+    return segments
+
+def _junctions(pins: List[Tuple[str, str, int, float, float]], segments: List[Tuple[Point, Point]]) -> List[Point]:
+    """Points where three or more connections meet, or a wire ends mid-wire"""
+    counts: Dict[Point, int] = {}
+    for _, _, _, x, y in pins:
+        counts[(round(x, 2), round(y, 2))] = counts.get((round(x, 2), round(y, 2)), 0) + 1
+    for s, e in segments:
+        for p in (s, e):
+            key = (round(p[0], 2), round(p[1], 2))
+            counts[key] = counts.get(key, 0) + 1
+    found = {p for p, n in counts.items() if n >= 3}
+    for s, e in segments:
+        for p in (s, e):
+            for s2, e2 in segments:
+                box = _box(s2, e2)
+                is_end = any(abs(p[0] - q[0]) < _EPS and abs(p[1] - q[1]) < _EPS for q in (s2, e2))
+                if not is_end and _on_segment(p, box):
+                    found.add((round(p[0], 2), round(p[1], 2)))
+    return sorted(found)
+
+def route_nets(pins_by_net: Dict[str, List[Tuple[str, str, int, float, float]]],
+               bodies: Dict[str, Tuple[int, Rect]],
+               max_pins: int = 8, max_span: float = 76.2) -> RoutingResult:
+    """
+    Wire short, local nets orthogonally and label everything else
+    Args:
+        pins_by_net: {net: [(ref, pin, sheet, x, y), ...]} absolute pin points
+        bodies: {ref: (sheet, (x1, y1, x2, y2))} symbol bodies to route around
+        max_pins: Nets with more pins get labels (rails, busses)
+        max_span: Nets whose bounding box is wider or taller get labels
+    Returns:
+        RoutingResult; nets are wired only if every edge found a clear path
+    """
+    result = RoutingResult()
+    index = GridIndex()
+    for ref, (sheet, box) in bodies.items():
+        index.insert(sheet, "body", ref, box)
+    for net, pins in pins_by_net.items():
+        for _, _, sheet, x, y in pins:
+            index.insert(sheet, "pin", net, (x, y, x, y))
+
+    def span(pins):
+        xs = [p[3] for p in pins]
+        ys = [p[4] for p in pins]
+        return max(max(xs) - min(xs), max(ys) - min(ys))
+
+    local = []
+    long_nets = []
+    for net, pins in pins_by_net.items():
+        if len(pins) < 2:
+            continue
+        if len(pins) <= max_pins and len({p[2] for p in pins}) == 1 and span(pins) <= max_span:
+            local.append(net)
+        else:
+            long_nets.append(net)
+
+    def add_labels(net):
+        result.labelled_nets.append(net)
+        for ref, pin, sheet, px, py in pins_by_net[net]:
+            body = bodies.get(ref)
+            center_x = (body[1][0] + body[1][2]) / 2 if body else px
+            label = (px + LABEL_STUB, py) if px < center_x else (px - LABEL_STUB, py)
+            result.label_pins.append((sheet, net, ref, pin, (px, py), label))
+            index.insert(sheet, "wire", net, _box((px, py), label))
+
+    for net in long_nets:
+        add_labels(net)
+
+    # Shortest nets first: they have the fewest alternatives
+    for net in sorted(local, key=lambda n: (span(pins_by_net[n]), n)):
+        pins = pins_by_net[net]
+        segments = _route_net(net, pins, index)
+        if segments is None:
+            add_labels(net)
+            continue
+        sheet = pins[0][2]
+        result.routed_nets.append(net)
+        result.wires.extend((sheet, net, s, e) for s, e in segments)
+        result.junctions.extend((sheet, net, p) for p in _junctions(pins, segments))
+        result.net_labels.append((sheet, net, (pins[0][3], pins[0][4])))
+    return result
@@ -0,0 +1,96 @@
+import re
+
+# Reading side of the S-expression files the pipeline handles: KiCad
+# netlists and .kicad_sym symbol libraries (sexpr_writer.py is the writing
+# side). Kept free of pipeline imports so the symbol cache and the ERC can
+# use it without loading generate_circuit.
+
+_TOKEN = re.compile(r'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()"]+')
+
+def parse_sexpr(text):
+    """Parse S-expression text into nested lists of string atoms"""
+    stack = [[]]
+    for token in _TOKEN.findall(text):
+        if token == '(':
+            stack.append([])
+        elif token == ')':
+            node = stack.pop()
+            stack[-1].append(node)
+        elif token.startswith('"'):
+            stack[-1].append(token[1:-1].replace('\\"', '"').replace('\\\\', '\\'))
+        else:
+            stack[-1].append(token)
+    return stack[0]
+
+def sexpr_child(node, key):
+    """Return the first child list of an S-expression node whose head is key"""
+    for item in node[1:]:
+        if isinstance(item, list) and item and item[0] == key:
+            return item
+    return None
+
+def sexpr_value(node, key, default=""):
+    """Return the first atom of the child list named key, or default"""
+    child = sexpr_child(node, key)
+    if child is None or len(child) < 2 or isinstance(child[1], list):
+        return default
+    return child[1]
+
+def parse_netlist(netlist: str):
+    """
+    Parse a KiCad netlist (S-expression or legacy XML export).
+    Returns:
+        Tuple of ({ref: (value, lib, part)}, {net_name: [(ref, pin), ...]})
+    """
+    comp_map = {}
+    net_map = {}
+
+    if netlist.lstrip().startswith('<'):
+        comp_pattern = re.compile(r'<comp ref="(.*?)">.*?<value>(.*?)</value>.*?<libsource lib="(.*?)" part="(.*?)"', re.DOTALL)
+        for ref, value, lib, part in comp_pattern.findall(netlist):
+            comp_map[ref] = (value, lib, part)
+        net_pattern = re.compile(r'<net name="(.*?)" code="(\d+)">(.*?)</net>', re.DOTALL)
+        for net_name, code, net_body in net_pattern.findall(netlist):
+            net_map[net_name] = re.findall(r'<node ref="(.*?)" pin="(.*?)"', net_body)
+        return comp_map, net_map
+
+    tree = parse_sexpr(netlist)
+    export = tree[0] if tree else []
+
+    components = sexpr_child(export, 'components') or []
+    for comp in components[1:]:
+        if not isinstance(comp, list) or comp[0] != 'comp':
+            continue
+        libsource = sexpr_child(comp, 'libsource') or []
+        comp_map[sexpr_value(comp, 'ref')] = (
+            sexpr_value(comp, 'value'),
+            sexpr_value(libsource, 'lib'),
+            sexpr_value(libsource, 'part'),
+        )
+
+    nets = sexpr_child(export, 'nets') or []
+    for net in nets[1:]:
+        if not isinstance(net, list) or net[0] != 'net':
+            continue
+        net_map[sexpr_value(net, 'name')] = [
+            (sexpr_value(node, 'ref'), sexpr_value(node, 'pin'))
+            for node in net[1:]
+            if isinstance(node, list) and node[0] == 'node'
+        ]
+
+    return comp_map, net_map
+
+def collect_pins(node, pins, types=None):
+    """Collect {pin_number: (x, y)} (and {pin_number: type} into types) from every (pin ...) below node"""
+    for item in node[1:]:
+        if not isinstance(item, list) or not item:
+            continue
+        if item[0] == 'pin':
+            at = sexpr_child(item, 'at')
+            number = sexpr_value(item, 'number')
+            if at is not None and number and number not in pins:
+                pins[number] = (float(at[1]), float(at[2]))
+                if types is not None:
+                    types[number] = item[1] if len(item) > 1 and not isinstance(item[1], list) else "unspecified"
+        elif item[0] == 'symbol':
+            collect_pins(item, pins, types)
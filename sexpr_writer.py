@@ -0,0 +1,103 @@
+from typing import BinaryIO, Union
+import os
+import sys
+import gzip
+from functools import lru_cache
+
+# Blocks repeated on nearly every schematic item, shared instead of re-built
+FONT_EFFECTS = sys.intern('(effects (font (size 1.27 1.27)))')
+LABEL_EFFECTS = sys.intern('(effects (font (size 1.27 1.27)) (justify left bottom))')
+WIRE_STROKE = sys.intern('(stroke (width 0.1524) (type default))')
+
+@lru_cache(maxsize=65536)
+def fmt_mm(value: float) -> str:
+    """Format a coordinate in mm; grid coordinates repeat, so they are cached"""
+    return f"{value:.2f}"
+
+@lru_cache(maxsize=65536)
+def quote(text: str) -> str:
+    """Quote a string atom, escaping backslashes and double quotes"""
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+class SExprWriter:
+    """
+    Streaming S-expression writer
+
+    Lines are written through a small chunk buffer straight to a file, a
+    socket file object or any binary stream, so memory use stays flat
+    however large the document gets. With compress=True the output is
+    gzipped on the fly (with a fixed header mtime, so output stays
+    byte-stable).
+
+    Usage:
+        with SExprWriter("out.kicad_sch") as w:
+            w.begin('(kicad_sch (version 20211123)')
+            w.line('(paper ', quote("A4"), ')')
+            w.end()
+    """
+    def __init__(self, target: Union[str, os.PathLike, BinaryIO], compress: bool = False,
+                 indent: str = "  ", buffer_size: int = 64 * 1024):
+        if isinstance(target, (str, os.PathLike)):
+            self._raw = open(target, 'wb')
+            self._owns_raw = True
+        else:
+            self._raw = target
+            self._owns_raw = False
+        self._stream = gzip.GzipFile(fileobj=self._raw, mode='wb', mtime=0) if compress else self._raw
+        self._indents = [sys.intern(indent * depth) for depth in range(16)]
+        self._indent = indent
+        self._chunks = []
+        self._pending = 0
+        self.buffer_size = buffer_size
+        self.depth = 0
+        self.bytes_written = 0
+
+    def _prefix(self) -> str:
+        if self.depth < len(self._indents):
+            return self._indents[self.depth]
+        return self._indent * self.depth
+
+    def line(self, *parts: str):
+        """Write one line at the current depth"""
+        self._chunks.append(self._prefix())
+        self._chunks.extend(parts)
+        self._chunks.append('\n')
+        self._pending += len(self._indent) * self.depth + sum(map(len, parts)) + 1
+        if self._pending >= self.buffer_size:
+            self.flush()
+
+    def begin(self, *parts: str):
+        """Write the opening line of a list whose children follow"""
+        self.line(*parts)
+        self.depth += 1
+
+    def end(self):
+        """Close the list opened by the matching begin()"""
+        self.depth -= 1
+        self.line(')')
+
+    def flush(self):
+        """Push buffered chunks to the underlying stream"""
+        if self._chunks:
+            data = "".join(self._chunks).encode('utf-8')
+            self._stream.write(data)
+            self.bytes_written += len(data)
+            self._chunks = []
+            self._pending = 0
+
+    def close(self):
+        """Flush, finish the gzip member if any, and close files this writer opened"""
+        self.flush()
+        if self._stream is not self._raw:
+            self._stream.close()
+        if self._owns_raw:
+            self._raw.close()
+        else:
+            self._raw.flush()
+
+    def __enter__(self) -> "SExprWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,235 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+import os
+import glob
+import mmap
+import struct
+import hashlib
+import tempfile
+import threading
+from sexpr_reader import collect_pins, parse_sexpr, sexpr_value
+
+# Binary symbol/pin cache, one file per library content hash:
+#
+#   header   magic, format version, symbol count, pin count, string table
+#            size, SHA-256 of the source library
+#   symbols  (name offset, name length, first pin, pin count), sorted by name
+#   pins     (number offset, number length, x, y, type offset, type length),
+#            positions in mm, type the pin's electrical type (passive,
+#            input, power_out, ...) as used by the ERC (erc.py)
+#   strings  UTF-8 names, pin numbers and pin types
+#
+# Every table is fixed-width, so a reader memory-maps the file read-only
+# and binary-searches it in place. Processes mapping the same file share
+# one copy in the page cache instead of each parsing the library.
+
+CACHE_MAGIC = b"KSYMCACH"
+CACHE_VERSION = 2
+CACHE_SUFFIX = f".v{CACHE_VERSION}.ksym"
+
+_HEADER = struct.Struct('<8sIIII32s')
+_SYMBOL = struct.Struct('<IIII')
+_PIN = struct.Struct('<IIddII')
+
+class SymbolCacheError(Exception):
+    """A cache file is missing, truncated or was built by another format version"""
+
+class SymbolCache:
+    """Read-only, memory-mapped view of one library's symbol/pin cache"""
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SymbolCacheError(f"{path} is empty")
+        if len(self._map) < _HEADER.size:
+            raise SymbolCacheError(f"{path} is truncated")
+        magic, version, self.num_symbols, self.num_pins, strings_size, digest = _HEADER.unpack_from(self._map, 0)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            raise SymbolCacheError(f"{path} is not a v{CACHE_VERSION} symbol cache")
+        self.source_sha256 = digest.hex()
+        self._symbols_at = _HEADER.size
+        self._pins_at = self._symbols_at + self.num_symbols * _SYMBOL.size
+        self._strings_at = self._pins_at + self.num_pins * _PIN.size
+        if len(self._map) != self._strings_at + strings_size:
+            raise SymbolCacheError(f"{path} is truncated")
+
+    def _string(self, offset: int, length: int) -> bytes:
+        start = self._strings_at + offset
+        return self._map[start:start + length]
+
+    def _symbol(self, index: int) -> Tuple[bytes, int, int]:
+        name_offset, name_length, first_pin, pin_count = _SYMBOL.unpack_from(self._map, self._symbols_at + index * _SYMBOL.size)
+        return self._string(name_offset, name_length), first_pin, pin_count
+
+    def _pin_rows(self, name: str) -> Optional[Iterator[Tuple]]:
+        """Binary-search a symbol; its unpacked pin rows, or None if the library lacks it"""
+        key = name.encode('utf-8')
+        low, high = 0, self.num_symbols
+        while low < high:
+            mid = (low + high) // 2
+            mid_name, first_pin, pin_count = self._symbol(mid)
+            if mid_name < key:
+                low = mid + 1
+            elif mid_name > key:
+                high = mid
+            else:
+                return (_PIN.unpack_from(self._map, self._pins_at + i * _PIN.size)
+                        for i in range(first_pin, first_pin + pin_count))
+        return None
+
+    def pins(self, name: str) -> Optional[Dict[str, Tuple[float, float]]]:
+        """Return {pin_number: (x, y)} for a symbol, or None if the library lacks it"""
+        rows = self._pin_rows(name)
+        if rows is None:
+            return None
+        return {self._string(number_offset, number_length).decode('utf-8'): (x, y)
+                for number_offset, number_length, x, y, _, _ in rows}
+
+    def pin_types(self, name: str) -> Optional[Dict[str, str]]:
+        """Return {pin_number: electrical type} for a symbol, or None if the library lacks it"""
+        rows = self._pin_rows(name)
+        if rows is None:
+            return None
+        return {self._string(number_offset, number_length).decode('utf-8'): self._string(type_offset, type_length).decode('utf-8')
+                for number_offset, number_length, _, _, type_offset, type_length in rows}
+
+    def names(self) -> Iterator[str]:
+        """Symbol names in sorted order"""
+        for i in range(self.num_symbols):
+            yield self._symbol(i)[0].decode('utf-8')
+
+    def __len__(self) -> int:
+        return self.num_symbols
+
+    def __contains__(self, name: str) -> bool:
+        return self.pins(name) is not None
+
+    def close(self):
+        self._map.close()
+
+def _extract_symbols(library_text: str) -> Dict[str, Dict[str, Tuple[float, float, str]]]:
+    """Parse a .kicad_sym library into {symbol: {pin: (x, y, type)}}, resolving extends"""
+    tree = parse_sexpr(library_text)
+    own_pins = {}
+    parents = {}
+    for node in tree[0][1:] if tree else []:
+        if isinstance(node, list) and node and node[0] == 'symbol' and len(node) > 1:
+            name = node[1]
+            parents[name] = sexpr_value(node, 'extends')
+            pins = {}
+            types = {}
+            collect_pins(node, pins, types)
+            own_pins[name] = {number: (x, y, types[number]) for number, (x, y) in pins.items()}
+
+    symbols = {}
+    for name in own_pins:
+        # Derived symbols draw their pins from the base symbol
+        seen = set()
+        base = name
+        while parents.get(base) and parents[base] in own_pins and base not in seen:
+            seen.add(base)
+            base = parents[base]
+        symbols[name] = own_pins[base]
+    return symbols
+
+def _encode_cache(symbols: Dict[str, Dict[str, Tuple[float, float, str]]], source_sha256: str) -> bytes:
+    strings = bytearray()
+    offsets = {}
+
+    def intern(text):
+        if text not in offsets:
+            offsets[text] = len(strings)
+            strings.extend(text.encode('utf-8'))
+        return offsets[text], len(text.encode('utf-8'))
+
+    symbol_rows = []
+    pin_rows = []
+    for name in sorted(symbols, key=lambda n: n.encode('utf-8')):
+        pins = symbols[name]
+        symbol_rows.append(_SYMBOL.pack(*intern(name), len(pin_rows), len(pins)))
+        for number, (x, y, pin_type) in sorted(pins.items()):
+            pin_rows.append(_PIN.pack(*intern(number), x, y, *intern(pin_type)))
+
+    header = _HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(symbol_rows), len(pin_rows), len(strings),
+                          bytes.fromhex(source_sha256))
+    return header + b"".join(symbol_rows) + b"".join(pin_rows) + bytes(strings)
+
+def cache_path_for(lib_file: str, source_sha256: str, cache_dir: Optional[str] = None) -> str:
+    """Cache file for a library's current content"""
+    cache_dir = cache_dir or os.environ.get('KICAD_SYMBOL_CACHE_DIR') or os.path.join(os.path.dirname(os.path.abspath(lib_file)), '.symcache')
+    name = os.path.basename(lib_file).rsplit('.', 1)[0]
+    return os.path.join(cache_dir, f"{name}-{source_sha256[:16]}{CACHE_SUFFIX}")
+
+def build_symbol_cache(lib_file: str, cache_path: str, library: Optional[bytes] = None) -> str:
+    """
+    Compile a library into a cache file, written to a temporary file and
+    renamed into place so readers never see a partial cache. Caches for
+    older versions of the same library, or of the cache format, are removed.
+    """
+    if library is None:
+        with open(lib_file, 'rb') as f:
+            library = f.read()
+    digest = hashlib.sha256(library).hexdigest()
+    data = _encode_cache(_extract_symbols(library.decode('utf-8')), digest)
+
+    directory = os.path.dirname(cache_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    name = os.path.basename(lib_file).rsplit('.', 1)[0]
+    for stale in glob.glob(os.path.join(directory, glob.escape(name) + "-" + "[0-9a-f]" * 16 + ".v*.ksym")):
+        if stale != cache_path:
+            try:
+                os.remove(stale)  # Processes still mapping it keep their view
+            except OSError:
+                pass
+    return cache_path
+
+_open_caches: Dict[Tuple[str, Optional[str], int, int], SymbolCache] = {}
+_open_lock = threading.Lock()
+
+def open_symbol_cache(lib_file: str, cache_dir: Optional[str] = None) -> SymbolCache:
+    """
+    Return the mapped cache for a library, building it if this version of
+    the library has not been compiled yet. Mappings are reused within a
+    process until the library file changes.
+    """
+    stat = os.stat(lib_file)
+    key = (os.path.abspath(lib_file), cache_dir and os.path.abspath(cache_dir), stat.st_mtime_ns, stat.st_size)
+    with _open_lock:
+        cache = _open_caches.get(key)
+        if cache is not None:
+            return cache
+        with open(lib_file, 'rb') as f:
+            library = f.read()
+        digest = hashlib.sha256(library).hexdigest()
+        path = cache_path_for(lib_file, digest, cache_dir)
+        try:
+            cache = SymbolCache(path)
+            if cache.source_sha256 != digest:
+                raise SymbolCacheError(f"{path} was built from different library content")
+        except (OSError, SymbolCacheError):
+            build_symbol_cache(lib_file, path, library)
+            cache = SymbolCache(path)
+        for old_key in [k for k in _open_caches if k[:2] == key[:2]]:
+            del _open_caches[old_key]  # Left for the GC; callers may still hold it
+        _open_caches[key] = cache
+        return cache
+
+def close_symbol_caches():
+    """Forget every mapped cache in this process (they are re-opened on demand)"""
+    with _open_lock:
+        _open_caches.clear()
+
+def warm_symbol_caches(lib_files: List[str], cache_dir: Optional[str] = None) -> List[str]:
+    """Build caches for several libraries up front, e.g. before forking workers"""
+    return [open_symbol_cache(lib_file, cache_dir).path for lib_file in lib_files]
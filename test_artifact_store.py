@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the content-addressed artifact store
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def test_dedup():
+    """Identical content is stored once; different content gets its own object"""
+    print("📦 Testing artifact dedup...")
+    from artifact_store import ArtifactStore
+
+    root = tempfile.mkdtemp()
+    try:
+        store = ArtifactStore(root)
+        first = store.put_bytes(b"circuit-a", "voltage_divider_5.0v_3.3v.zip", kind="kicad_project")
+        second = store.put_bytes(b"circuit-a", "voltage_divider_copy.zip", kind="kicad_project")
+        third = store.put_bytes(b"circuit-b", "voltage_divider_5.0v_3.3v.zip", kind="kicad_project")
+
+        if first['path'] != second['path'] or first['hash'] == third['hash']:
+            print("❌ Objects are not keyed by content")
+            return False
+        if len(store.list_artifacts()) != 2:
+            print(f"❌ Expected 2 objects, found {len(store.list_artifacts())}")
+            return False
+        if sorted(store.get(first['hash'])['names']) != ["voltage_divider_5.0v_3.3v.zip", "voltage_divider_copy.zip"]:
+            print("❌ Metadata index did not record both names")
+            return False
+        print("✅ Identical content deduplicated, names recorded in the index")
+        return True
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def test_concurrent_writers():
+    """Many threads writing the same and different content never corrupt objects"""
+    print("\n🧵 Testing concurrent writers...")
+    from artifact_store import ArtifactStore
+
+    root = tempfile.mkdtemp()
+    try:
+        store = ArtifactStore(root)
+        payloads = [(f"circuit_{i % 4}".encode() * 1000, f"circuit_{i}.zip") for i in range(32)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            records = list(pool.map(lambda p: store.put_bytes(*p), payloads))
+
+        for (data, _), record in zip(payloads, records):
+            with open(record['path'], 'rb') as f:
+                if f.read() != data:
+                    print(f"❌ Object {record['hash'][:12]} was corrupted")
+                    return False
+        leftovers = [name for _, _, files in os.walk(root) for name in files if name.startswith('.tmp-')]
+        if leftovers or len(store.list_artifacts()) != 4:
+            print("❌ Temporary files left behind or wrong object count")
+            return False
+        # Concurrent dedup hits on one digest must not lose each other's names
+        for record in store.list_artifacts():
+            if len(record['names']) != 8:
+                print(f"❌ {record['hash'][:12]} recorded {len(record['names'])} of 8 names")
+                return False
+        print("✅ 32 concurrent writes produced 4 intact objects with every name recorded")
+        return True
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def test_gc():
+    """GC evicts by age and by total size, oldest first"""
+    print("\n🧹 Testing garbage collection...")
+    from artifact_store import ArtifactStore
+
+    root = tempfile.mkdtemp()
+    try:
+        store = ArtifactStore(root)
+        old = time.time() - 3600
+        records = [store.put_bytes(bytes([i]) * 100, f"circuit_{i}.zip") for i in range(5)]
+        for age, record in enumerate(records):
+            os.utime(record['path'], (old - age * 60, old - age * 60))
+
+        result = store.gc(max_bytes=300)
+        remaining = {r['hash'] for r in store.list_artifacts()}
+        if result['removed'] != 2 or remaining != {r['hash'] for r in records[:3]}:
+            print(f"❌ Size-based GC removed the wrong objects: {result}")
+            return False
+        print("✅ Size-based GC evicted the two oldest objects")
+
+        store.gc(max_age=60)
+        if store.list_artifacts():
+            print("❌ Age-based GC left expired objects")
+            return False
+        print("✅ Age-based GC evicted expired objects")
+
+        # Temporary files of interrupted writes: stale ones go, fresh ones may still be renamed
+        shard_dir = os.path.dirname(records[0]['path'])
+        os.makedirs(shard_dir, exist_ok=True)
+        stale, fresh = os.path.join(shard_dir, ".tmp-stale"), os.path.join(shard_dir, ".tmp-fresh")
+        for path in (stale, fresh):
+            with open(path, 'wb') as f:
+                f.write(b"partial")
+        os.utime(stale, (old, old))
+        store.gc()
+        if os.path.exists(stale) or not os.path.exists(fresh):
+            print("❌ GC did not remove only the stale temporary file")
+            return False
+        print("✅ Stale temporary files removed, fresh ones kept")
+        return True
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Artifact Store")
+    print("=" * 40)
+
+    tests = [
+        ("Dedup", test_dedup),
+        ("Concurrent Writers", test_concurrent_writers),
+        ("Garbage Collection", test_gc)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
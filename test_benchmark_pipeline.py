@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the offline pipeline benchmark and its baseline comparison
+"""
+
+import os
+import sys
+import json
+import copy
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def test_benchmark_run():
+    """A small corpus runs offline at two concurrency levels with every stage measured"""
+    print("⏱️ Testing benchmark run...")
+    from benchmark_pipeline import DEFAULT_CORPUS, load_corpus, run_benchmark
+
+    corpus = [e for e in load_corpus(DEFAULT_CORPUS)
+              if e["id"] in ("template-divider", "spec-led", "spec-rc-ladder", "code-led")]
+    report = run_benchmark(corpus, levels=(1, 4), rounds=1)
+    levels = report["levels"]
+    if [level["concurrency"] for level in levels] != [1, 4] or any(level["errors"] for level in levels):
+        print(f"❌ Unexpected levels: {[(l['concurrency'], l['failed']) for l in levels]}")
+        return False
+    stages = levels[0]["stages"]
+    expected = {"request.custom_circuit", "llm.generate", "circuit.from_spec", "circuit.voltage_divider",
+                "code.execute", "project.build", "artifact.store"}
+    if not expected <= set(stages) or stages["request.custom_circuit"]["count"] != 4:
+        print(f"❌ Stages measured: {sorted(stages)}")
+        return False
+    # Spec artifacts dedupe against the warm-up; the SKiDL netlist is new every run
+    if levels[0]["files_written"] < 1 or levels[0]["peak_rss_mb"] <= 0 or levels[0]["peak_child_rss_mb"] <= 0:
+        print(f"❌ Missing resource figures: {levels[0]}")
+        return False
+    print(f"✅ {len(corpus)} requests at concurrency 1 and 4, {len(stages)} stages measured")
+    return True
+
+def test_baseline_comparison():
+    """Results within the thresholds pass; slower, leakier or failing runs are flagged"""
+    print("\n📏 Testing baseline comparison...")
+    from benchmark_pipeline import DEFAULT_BASELINE, compare
+
+    with open(DEFAULT_BASELINE, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if compare(baseline["report"], baseline):
+        print("❌ The baseline regresses against itself")
+        return False
+
+    slower = copy.deepcopy(baseline["report"])
+    level = slower["levels"][0]
+    level["throughput_rps"] /= 2
+    level["peak_rss_mb"] *= 2
+    level["files_written"] += 5
+    level["errors"], level["failed"] = 1, ["spec-led"]
+    stage = max(level["stages"], key=lambda name: level["stages"][name]["p95_ms"])
+    level["stages"][stage]["p95_ms"] *= 3
+    regressions = compare(slower, baseline)
+    expected = ["throughput", "peak RSS", "files written", "failed requests", f"stage {stage}"]
+    missing = [word for word in expected if not any(word in message for message in regressions)]
+    if missing:
+        print(f"❌ Not flagged: {missing} in {regressions}")
+        return False
+    print(f"✅ {len(regressions)} regressions flagged")
+    return True
+
+def test_backlog_corpus():
+    """Lines shaped like requests.jsonl replay their titles with the default SKiDL code"""
+    print("\n📜 Testing backlog corpus lines...")
+    from benchmark_pipeline import FakeLLM, load_corpus
+
+    with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+        f.write(json.dumps({"request_id": "user-001", "title": "Make an RC filter", "body": "..."}) + "\n")
+    try:
+        entries = load_corpus(f.name)
+    finally:
+        os.unlink(f.name)
+    llm = FakeLLM(entries, "/libs")
+    code = llm("**USER REQUEST:** Make an RC filter", None)
+    if entries != [{"id": "user-001", "request": "Make an RC filter"}] or \
+            llm("Make an RC filter", {"properties": {}}) != "{}" or 'r"/libs"' not in code:
+        print(f"❌ Unexpected corpus or replies: {entries}")
+        return False
+    print("✅ Backlog titles replayed through the code path")
+    return True
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Pipeline Benchmark")
+    print("=" * 40)
+
+    tests = [
+        ("Benchmark Run", test_benchmark_run),
+        ("Baseline Comparison", test_baseline_comparison),
+        ("Backlog Corpus", test_backlog_corpus)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
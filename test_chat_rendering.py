@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test script to verify chat and history rendering stays flat as history grows
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+CHAT_UI = os.path.join(REPO_DIR, "interface", "chat_ui.py")
+
+def _make_session(work_dir, count):
+    """Build messages and an indexed circuit history with count circuits"""
+    circuits = {}
+    history = []
+    messages = []
+    for i in range(count):
+        path = os.path.join(work_dir, f"circuit_{i}.zip")
+        with open(path, 'wb') as f:
+            f.write(b"PK" + bytes([i % 256]) * 1000)
+        circuit_id = f"C{i:06d}"
+        circuits[circuit_id] = {
+            "id": circuit_id,
+            "type": "voltage_divider",
+            "name": f"voltage_divider_{i}",
+            "timestamp": f"2025-01-01 00:00:{i % 60:02d}",
+            "response": f"✅ Circuit generated successfully! #{i}",
+            "generated_files": [path],
+            "download_label": f"voltage_divider_{i}.zip",
+        }
+        history.append(circuit_id)
+        messages.append({"role": "user", "content": f"make divider {i}"})
+        messages.append({"role": "assistant", "content": circuits[circuit_id]["response"], "circuit_id": circuit_id})
+    return messages, circuits, history
+
+def _render(work_dir, count, runs=2):
+    """Render the chat UI for a session of count circuits; return (app, seconds per rerun)"""
+    from streamlit.testing.v1 import AppTest
+    messages, circuits, history = _make_session(work_dir, count)
+    app = AppTest.from_file(CHAT_UI, default_timeout=120)
+    app.session_state["messages"] = messages
+    app.session_state["circuits"] = circuits
+    app.session_state["circuit_history"] = history
+    app.run()  # Warm-up: environment setup and payload cache
+    start = time.perf_counter()
+    for _ in range(runs):
+        app.run()
+    return app, (time.perf_counter() - start) / max(runs, 1)
+
+def test_render_cost_flat():
+    """Rendering 300 circuits costs about the same as rendering 20"""
+    print("📜 Testing render cost against history size...")
+    previous_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp()
+    try:
+        shutil.copytree(os.path.join(REPO_DIR, "libraries"), os.path.join(work_dir, "libraries"))
+        os.chdir(work_dir)
+        small_app, small = _render(work_dir, 20)
+        large_app, large = _render(work_dir, 300)
+        if large_app.exception:
+            print(f"❌ Chat UI raised: {large_app.exception[0].message}")
+            return False
+
+        sys.path.insert(0, os.path.dirname(CHAT_UI))
+        from chat_ui import MESSAGE_PAGE_SIZE, HISTORY_PAGE_SIZE
+        buttons = len(large_app.get("download_button"))
+        if buttons > MESSAGE_PAGE_SIZE + HISTORY_PAGE_SIZE:
+            print(f"❌ {buttons} download buttons rendered for 300 circuits")
+            return False
+        print(f"✅ {buttons} download buttons rendered for 300 circuits")
+
+        if large > 3 * small:
+            print(f"❌ 300 circuits took {large:.2f}s per rerun vs {small:.2f}s for 20")
+            return False
+        print(f"✅ {small:.2f}s per rerun for 20 circuits, {large:.2f}s for 300")
+        return True
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def test_download_payload_cached():
+    """Download payloads are read once and reused on later reruns"""
+    print("\n💾 Testing cached download payloads...")
+    previous_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp()
+    try:
+        shutil.copytree(os.path.join(REPO_DIR, "libraries"), os.path.join(work_dir, "libraries"))
+        os.chdir(work_dir)
+        app, _ = _render(work_dir, 3, runs=0)
+
+        # Rewrite a file behind the cache's back, keeping its mtime
+        path = os.path.join(work_dir, "circuit_2.zip")
+        stat = os.stat(path)
+        with open(path, 'wb') as f:
+            f.write(b"changed")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        app.run()
+
+        sizes = [m.value for m in app.markdown if m.value.startswith("**Size:**")]
+        if "**Size:** 1002 bytes" not in sizes or "**Size:** 7 bytes" in sizes:
+            print(f"❌ Payload was re-read from disk: {sizes}")
+            return False
+        print("✅ Rerun served the payload from the cache")
+        return True
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def test_admin_controls():
+    """Reload and profiling controls appear only with UI_ADMIN set"""
+    print("\n🔐 Testing admin controls...")
+    previous_dir = os.getcwd()
+    previous_admin = os.environ.pop('UI_ADMIN', None)
+    work_dir = tempfile.mkdtemp()
+    try:
+        shutil.copytree(os.path.join(REPO_DIR, "libraries"), os.path.join(work_dir, "libraries"))
+        os.chdir(work_dir)
+        shown = {}
+        for admin in (False, True):
+            if admin:
+                os.environ['UI_ADMIN'] = '1'
+            app, _ = _render(work_dir, 1, runs=0)
+            shown[admin] = ("🔄 Reload Libraries & LLM" in [b.label for b in app.button],
+                            "🔬 Profile the next request" in [c.label for c in app.checkbox])
+        if shown != {False: (False, False), True: (True, True)}:
+            print(f"❌ Controls shown (reload, profiling) without/with UI_ADMIN: {shown}")
+            return False
+        print("✅ Admin controls hidden by default, shown with UI_ADMIN=1")
+        return True
+    finally:
+        os.environ.pop('UI_ADMIN', None)
+        if previous_admin is not None:
+            os.environ['UI_ADMIN'] = previous_admin
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Chat Rendering")
+    print("=" * 40)
+
+    tests = [
+        ("Flat Render Cost", test_render_cost_flat),
+        ("Cached Payloads", test_download_payload_cached),
+        ("Admin Controls", test_admin_controls)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
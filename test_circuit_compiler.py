@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the in-process circuit spec → netlist compiler
+"""
+
+import os
+import sys
+import time
+import shutil
+import zipfile
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+def _ladder_spec(stages):
+    """RC ladder with a supply symbol: 2 * stages + 2 parts"""
+    parts = [
+        {"ref": "#PWR01", "lib": "power", "symbol": "VCC", "value": "VCC"},
+        {"ref": "#PWR02", "lib": "power", "symbol": "GND", "value": "GND"},
+    ]
+    nets = [{"name": "VCC", "pins": ["#PWR01.1", "R1.1"]}, {"name": "GND", "pins": ["#PWR02.1"]}]
+    for i in range(1, stages + 1):
+        parts.append({"ref": f"R{i}", "lib": "Device", "symbol": "R", "value": "10k",
+                      "footprint": "Resistor_SMD:R_0805_2012Metric"})
+        parts.append({"ref": f"C{i}", "lib": "Device", "symbol": "C", "value": "100nF"})
+        node = [f"R{i}.2", f"C{i}.1"] + ([f"R{i + 1}.1"] if i < stages else [])
+        nets.append({"name": f"N{i}", "pins": node})
+        nets[1]["pins"].append(f"C{i}.2")
+    return {"name": f"rc_ladder_{stages}", "description": f"{stages}-stage RC ladder", "parts": parts, "nets": nets}
+
+def test_compile_speed():
+    """A 50-part spec compiles to a netlist in milliseconds"""
+    print("⚡ Testing compile speed...")
+    from circuit_compiler import compile_to_netlist
+    from generate_circuit import parse_netlist
+
+    root = tempfile.mkdtemp()
+    try:
+        spec = _ladder_spec(24)
+        netlist_path = os.path.join(root, "ladder.net")
+        compile_to_netlist(spec, netlist_path)  # Warm the symbol caches
+        start = time.perf_counter()
+        for _ in range(10):
+            compile_to_netlist(spec, netlist_path)
+        elapsed = (time.perf_counter() - start) / 10
+
+        with open(netlist_path, 'r', encoding='utf-8') as f:
+            comp_map, net_map = parse_netlist(f.read())
+        if len(comp_map) != 50 or net_map["N3"] != [("R3", "2"), ("C3", "1"), ("R4", "1")]:
+            print(f"❌ Netlist does not match the spec: {len(comp_map)} parts, N3={net_map.get('N3')}")
+            return False
+        if elapsed > 0.05:
+            print(f"❌ 50-part compile took {elapsed * 1000:.1f} ms")
+            return False
+        print(f"✅ 50-part spec compiled in {elapsed * 1000:.2f} ms")
+        return True
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def test_symbol_validation():
+    """Unknown symbols and pins are reported together"""
+    print("\n🔍 Testing symbol validation...")
+    from circuit_compiler import compile_circuit_spec
+    from circuit_spec import CircuitSpecError
+
+    spec = _ladder_spec(2)
+    spec["parts"].append({"ref": "U1", "lib": "Device", "symbol": "NE555", "value": "NE555"})
+    spec["nets"][2]["pins"].append("C1.3")
+    try:
+        compile_circuit_spec(spec)
+        print("❌ Invalid spec compiled")
+        return False
+    except CircuitSpecError as e:
+        if len(e.errors) != 2 or "NE555" not in e.errors[0] or "C1 has no pin 3" not in e.errors[1]:
+            print(f"❌ Unexpected errors: {e.errors}")
+            return False
+    print("✅ Unknown symbol and pin both reported")
+    return True
+
+def test_project_from_spec():
+    """A spec builds a full project without SKiDL"""
+    print("\n📦 Testing project build from spec...")
+    from generate_circuit import create_circuit_from_spec
+
+    previous_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp()
+    try:
+        shutil.copytree(os.path.join(REPO_DIR, "libraries"), os.path.join(work_dir, "libraries"))
+        os.chdir(work_dir)
+        result = create_circuit_from_spec(_ladder_spec(3))
+        if "error" in result:
+            print(f"❌ {result['error']}")
+            return False
+        with zipfile.ZipFile(result["download_path"]) as z:
+            names = z.namelist()
+        if "rc_ladder_3.kicad_sch" not in names or "rc_ladder_3.net" not in names:
+            print(f"❌ Unexpected project contents: {names}")
+            return False
+        if "skidl" in sys.modules:
+            print("❌ SKiDL was loaded")
+            return False
+        print(f"✅ Project built without SKiDL: {result['response']}")
+        return True
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Circuit Compiler")
+    print("=" * 40)
+
+    tests = [
+        ("Compile Speed", test_compile_speed),
+        ("Symbol Validation", test_symbol_validation),
+        ("Project From Spec", test_project_from_spec)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script to verify single-pass, cached circuit reviews
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+CIRCUIT = {
+    "name": "voltage_divider",
+    "description": "5V to 3.3V divider",
+    "components": ["R1 1.8k (Device:R)", "R2 3.3k (Device:R)"],
+    "nets": ["GND: R2.2", "OUT: R1.2 R2.1", "VCC: R1.1"],
+}
+
+REVIEW_REPLY = json.dumps({
+    "summary": "Resistive divider feeding a high-impedance input.",
+    "components": ["R1 drops 1.7V", "R2 sets the output"],
+    "potential_issues": ["Output sags under load"],
+    "suggestions": [
+        {"category": "Power", "suggestion": "Raise both resistors 10x to cut quiescent current"},
+        {"category": "thermal", "suggestion": "  "},
+        {"category": "layout", "suggestion": "Keep OUT short"}
+    ]
+})
+
+def _engine(cache_dir, latency=0.0):
+    """LLMEngine on an in-process fake backend that replies with a fixed review"""
+    from llm_engine import LLMEngine
+    from llm_backends import FakeBackend
+    from circuit_review import CircuitReviewer, ReviewCache
+    fake = FakeBackend(response=REVIEW_REPLY, latency=latency)
+    engine = LLMEngine("test-model", backend=fake)
+    engine._reviewer = CircuitReviewer(engine._run_review, ReviewCache(cache_dir), model_name=engine.model_name)
+    return engine, fake
+
+def test_single_call_review():
+    """analyze_circuit and suggest_improvements share one LLM call"""
+    print("🔍 Testing combined review...")
+    cache_dir = tempfile.mkdtemp()
+    try:
+        engine, model = _engine(cache_dir)
+        analysis = engine.analyze_circuit(CIRCUIT)
+        improvements = engine.suggest_improvements(dict(reversed(list(CIRCUIT.items()))))
+        if len(model.calls) != 1:
+            print(f"❌ {len(model.calls)} LLM calls for analysis + suggestions")
+            return False
+        if analysis["potential_issues"] != ["Output sags under load"] or len(analysis["components"]) != 2:
+            print(f"❌ Unexpected analysis: {analysis}")
+            return False
+        if [s["category"] for s in improvements] != ["power", "reliability"]:
+            print(f"❌ Suggestions not normalised: {improvements}")
+            return False
+        print("✅ Analysis and categorized suggestions from one call")
+        return True
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+def test_background_and_shared_cache():
+    """Background reviews are single-flight and persist for other workers"""
+    print("\n🧵 Testing background reviews...")
+    cache_dir = tempfile.mkdtemp()
+    try:
+        engine, model = _engine(cache_dir, latency=0.2)
+        futures = [engine.submit_review(CIRCUIT) for _ in range(5)]
+        if engine.cached_review(CIRCUIT) is not None:
+            print("❌ Review reported ready before it finished")
+            return False
+        reviews = [f.result(timeout=10) for f in futures]
+        if len(model.calls) != 1 or any(r != reviews[0] for r in reviews):
+            print(f"❌ {len(model.calls)} LLM calls for 5 concurrent submissions")
+            return False
+        print("✅ 5 concurrent submissions made one LLM call")
+
+        other, other_model = _engine(cache_dir)
+        if other.cached_review(CIRCUIT) != reviews[0] or other_model.calls:
+            print("❌ Review not shared through the cache directory")
+            return False
+        changed = dict(CIRCUIT, components=CIRCUIT["components"] + ["C1 100nF (Device:C)"])
+        if other.cached_review(changed) is not None:
+            print("❌ A different circuit hit the cache")
+            return False
+        print("✅ Another worker reused the stored review; a changed circuit did not")
+        return True
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+def test_failed_review_not_cached():
+    """Errors are reported and the next request retries"""
+    print("\n⚠️ Testing failed reviews...")
+    cache_dir = tempfile.mkdtemp()
+    try:
+        engine, model = _engine(cache_dir)
+        model.response = "not json"
+        if "error" not in engine.review_circuit(CIRCUIT):
+            print("❌ Invalid reply was accepted")
+            return False
+        model.response = REVIEW_REPLY
+        if "error" in engine.review_circuit(CIRCUIT) or len(model.calls) != 2:
+            print("❌ Review was not retried after a failure")
+            return False
+        print("✅ Failure reported, retry succeeded")
+
+        # A failed background review stays visible until it is retried
+        changed = dict(CIRCUIT, name="divider_2")
+        model.response = "not json"
+        try:
+            engine.submit_review(changed).result(5)
+            print("❌ Invalid background reply was accepted")
+            return False
+        except ValueError:
+            pass
+        if engine.cached_review(changed) is not None or not engine.review_failure(changed):
+            print(f"❌ Background failure not reported: {engine.review_failure(changed)!r}")
+            return False
+        model.response = REVIEW_REPLY
+        retry = engine.submit_review(changed)
+        if engine.review_failure(changed) is not None or "error" in retry.result(5) or \
+                engine.cached_review(changed) is None:
+            print("❌ Background review not retried after a failure")
+            return False
+        print("✅ Background failure kept until retried")
+        return True
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Circuit Reviews")
+    print("=" * 40)
+
+    tests = [
+        ("Single Call Review", test_single_call_review),
+        ("Background Reviews", test_background_and_shared_cache),
+        ("Failed Reviews", test_failed_review_not_cached)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
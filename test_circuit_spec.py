@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script to verify structured-output circuit specs
+"""
+
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+VOLTAGE_DIVIDER = {
+    "name": "Voltage Divider 5V-3.3V",
+    "description": "Divides 5V down to 3.3V",
+    "parameters": {"vin": 5.0, "vout": 3.3},
+    "parts": [
+        {"ref": "R1", "lib": "Device", "symbol": "R", "value": "1.8k", "footprint": "Resistor_SMD:R_0805_2012Metric"},
+        {"ref": "R2", "lib": "Device", "symbol": "R", "value": "3.3k"}
+    ],
+    "nets": [
+        {"name": "VCC", "pins": ["R1.1"]},
+        {"name": "OUT", "pins": ["R1.2", " R2.1 "]},
+        {"name": "GND", "pins": ["R2.2"]}
+    ]
+}
+
+def test_parse_valid_spec():
+    """A schema-shaped reply parses and is normalised"""
+    print("🧾 Testing valid circuit spec...")
+    from circuit_spec import parse_circuit_spec, CIRCUIT_SPEC_SCHEMA
+
+    json.dumps(CIRCUIT_SPEC_SCHEMA)  # Sent to Ollama as the format option
+    spec = parse_circuit_spec(json.dumps(VOLTAGE_DIVIDER))
+    if spec["name"] != "voltage_divider_5v_3_3v":
+        print(f"❌ Unexpected name: {spec['name']}")
+        return False
+    if spec["nets"][1]["pins"] != ["R1.2", "R2.1"] or len(spec["parts"]) != 2:
+        print(f"❌ Unexpected nets: {spec['nets']}")
+        return False
+    print("✅ Spec parsed, name and pins normalised")
+    return True
+
+def test_invalid_specs_rejected():
+    """Every structural problem is reported"""
+    print("\n🚫 Testing invalid circuit specs...")
+    from circuit_spec import parse_circuit_spec, CircuitSpecError
+
+    bad = json.loads(json.dumps(VOLTAGE_DIVIDER))
+    bad["parts"].append({"ref": "R1", "lib": "Resistors", "symbol": "R", "value": "1k"})
+    bad["nets"].append({"name": "FB", "pins": ["R3.1", "R2.2", "R2"]})
+    try:
+        parse_circuit_spec(bad)
+        print("❌ Invalid spec was accepted")
+        return False
+    except CircuitSpecError as e:
+        expected = ["defined twice", "unknown library", "unknown part R3", "on both GND and FB", "REF.PIN"]
+        missing = [text for text in expected if not any(text in error for error in e.errors)]
+        if missing:
+            print(f"❌ Missing errors {missing}: {e.errors}")
+            return False
+    for reply in ("Here is your circuit: {", "[]"):
+        try:
+            parse_circuit_spec(reply)
+            print(f"❌ {reply!r} was accepted")
+            return False
+        except CircuitSpecError:
+            pass
+    print("✅ Duplicate refs, unknown libraries/parts, shorted pins and non-JSON replies rejected")
+    return True
+
+def test_circuit_generator_reads_bare_json():
+    """CircuitGenerator accepts structured-output replies and still reads free text"""
+    print("\n🔌 Testing circuit description parsing...")
+    from circuit_generator import CircuitGenerator
+
+    generator = CircuitGenerator.__new__(CircuitGenerator)
+    reply = json.dumps(VOLTAGE_DIVIDER)
+    if generator.parse_circuit_description(reply) != VOLTAGE_DIVIDER:
+        print("❌ Bare JSON reply not parsed")
+        return False
+    if generator.parse_circuit_description(f"Sure! {reply} Hope this helps.") != VOLTAGE_DIVIDER:
+        print("❌ JSON embedded in text not parsed")
+        return False
+    print("✅ Bare and embedded JSON both parsed")
+    return True
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Circuit Specs")
+    print("=" * 40)
+
+    tests = [
+        ("Valid Spec", test_parse_valid_spec),
+        ("Invalid Specs", test_invalid_specs_rejected),
+        ("Description Parsing", test_circuit_generator_reads_bare_json)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
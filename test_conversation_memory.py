@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script to verify bounded conversation memory
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def _converse(memory, turns):
+    """Feed a synthetic design conversation into memory"""
+    for i in range(turns):
+        memory.add("user", f"Change the RC filter cutoff to {1000 + i} Hz and use a {i % 7 + 1}0nF capacitor.")
+        memory.add("assistant", f"Updated the filter to {1000 + i} Hz. " + "R1 is now 15k and C1 is 10nF. " * (i % 5 + 1))
+
+def test_token_estimate():
+    """The estimate tracks typical tokenizer counts"""
+    print("🔢 Testing token estimate...")
+    from conversation_memory import estimate_tokens, truncate_to_tokens
+
+    # About 20 tokens with the Llama 2 tokenizer
+    sentence = "Create a voltage divider that converts 5V to 3.3V using standard resistors."
+    estimate = estimate_tokens(sentence)
+    if not 16 <= estimate <= 24:
+        print(f"❌ Estimated {estimate} tokens for a ~20-token sentence")
+        return False
+    cut = truncate_to_tokens(sentence * 20, 50)
+    if estimate_tokens(cut) > 50 or not cut.startswith("Create"):
+        print(f"❌ Truncation overshot: {estimate_tokens(cut)} tokens")
+        return False
+    print(f"✅ Estimated {estimate} tokens for a ~20-token sentence; truncation stays in budget")
+    return True
+
+def test_memory_stays_in_budget():
+    """Rendered memory is bounded and flat as the conversation grows"""
+    print("\n🧠 Testing memory budget...")
+    from conversation_memory import ConversationMemory
+
+    sizes = {}
+    for turns in (5, 50, 500):
+        memory = ConversationMemory(token_budget=400, window_turns=6)
+        _converse(memory, turns)
+        sizes[turns] = memory.token_count()
+        if sizes[turns] > 400:
+            print(f"❌ {turns} turns rendered {sizes[turns]} tokens (budget 400)")
+            return False
+    if sizes[500] > sizes[50] + 40:
+        print(f"❌ Memory keeps growing: {sizes}")
+        return False
+    print(f"✅ Rendered tokens for 5/50/500 turns: {sizes[5]}/{sizes[50]}/{sizes[500]}")
+
+    text = memory.render()
+    if "Change the RC filter cutoff to 1499 Hz" not in text or "1497 Hz" not in text:
+        print("❌ Most recent turns or their summary are missing")
+        return False
+    if "1000 Hz" in text:
+        print("❌ Oldest turns were never dropped")
+        return False
+    print("✅ Recent turns verbatim, recent history summarized, oldest dropped")
+    return True
+
+def test_compact_context():
+    """Large circuit contexts are shortened to fit their budget"""
+    print("\n📦 Testing circuit context budget...")
+    from conversation_memory import compact_context, estimate_tokens
+
+    small = {"name": "rc_filter", "components": ["R1 10k", "C1 100nF"]}
+    if compact_context(small) != '{"name":"rc_filter","components":["R1 10k","C1 100nF"]}':
+        print(f"❌ Small context changed: {compact_context(small)}")
+        return False
+    large = {"name": "big", "components": [f"R{i} 10k (Device:R)" for i in range(2000)],
+             "notes": "x" * 20000}
+    text = compact_context(large, 256)
+    if estimate_tokens(text) > 256 or '"name":"big"' not in text or "more" not in text:
+        print(f"❌ Large context not compacted: {estimate_tokens(text)} tokens")
+        return False
+    print(f"✅ 2000-component context compacted to {estimate_tokens(text)} tokens")
+    return True
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Conversation Memory")
+    print("=" * 40)
+
+    tests = [
+        ("Token Estimate", test_token_estimate),
+        ("Memory Budget", test_memory_stays_in_budget),
+        ("Context Budget", test_compact_context)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test script to verify net_to_project produces byte-stable output
+"""
+
+import os
+import sys
+import shutil
+import hashlib
+import tempfile
+import zipfile
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+SAMPLE_NETLIST = '''(export (version "D")
+  (design
+    (source "voltage_divider.py")
+    (date "{date}")
+    (tool "SKiDL (2.3.0)"))
+  (components
+    (comp (ref "R1")
+      (value "1800")
+      (fields
+        (field (name "SKiDL Tag") "{tag}"))
+      (libsource (lib "Device") (part "R"))
+      (tstamps "{tstamp}"))
+    (comp (ref "R2")
+      (value "3300")
+      (libsource (lib "Device") (part "R"))))
+  (nets
+    (net (code 1) (name "GND")
+      (node (ref "R2") (pin "2")))
+    (net (code 2) (name "OUT")
+      (node (ref "R1") (pin "2"))
+      (node (ref "R2") (pin "1")))
+    (net (code 3) (name "VCC")
+      (node (ref "R1") (pin "1")))))
+'''
+
+def _digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _build_project(work_dir, date, tag, tstamp, deterministic=True):
+    """Write the sample netlist and convert it, returning digests of the ZIP and its entries"""
+    from generate_circuit import net_to_project
+    from artifact_store import ArtifactStore
+
+    netlist_path = os.path.join(work_dir, "voltage_divider_test.net")
+    with open(netlist_path, 'w', encoding='utf-8') as f:
+        f.write(SAMPLE_NETLIST.format(date=date, tag=tag, tstamp=tstamp))
+
+    store = ArtifactStore(os.path.join(work_dir, "artifacts"))
+    zip_path = net_to_project(netlist_path, deterministic=deterministic, store=store)
+    digests = {"zip": _digest(zip_path)}
+    with zipfile.ZipFile(zip_path) as zipf:
+        for name in sorted(zipf.namelist()):
+            digests[name] = hashlib.sha256(zipf.read(name)).hexdigest()
+    return digests
+
+def _read_schematic(work_dir):
+    """Return the schematic text of the most recently stored project"""
+    from artifact_store import ArtifactStore
+
+    record = ArtifactStore(os.path.join(work_dir, "artifacts")).find("voltage_divider_test.zip")[0]
+    with zipfile.ZipFile(record['path']) as zipf:
+        return zipf.read("voltage_divider_test.kicad_sch").decode('utf-8')
+
+def test_byte_identical_output():
+    """Two runs over the same circuit must produce identical bytes"""
+    print("🔁 Testing deterministic project output...")
+    old_cwd = os.getcwd()
+    work_dir = tempfile.mkdtemp()
+    try:
+        os.makedirs(os.path.join(work_dir, "libraries"))
+        shutil.copy(os.path.join(REPO_DIR, "libraries", "Device.kicad_sym"), os.path.join(work_dir, "libraries"))
+        os.chdir(work_dir)
+
+        first = _build_project(work_dir, "06/19/2025 02:40 AM", "seROEWOfsU", "3760327f-8ba3-5a41-aa9f-5c3f74f4920b")
+        second = _build_project(work_dir, "10/19/2026 03:35 AM", "2sJnZSvHaA", "80e7cc3f-19fa-540c-8ef8-5013c509d865")
+        if first != second:
+            changed = [name for name in first if first[name] != second.get(name)]
+            print(f"❌ Output differs between runs: {', '.join(changed)}")
+            return False
+        print(f"✅ {len(first)} files byte-identical across runs")
+
+        schematic = _read_schematic(work_dir)
+        if '(label "OUT"' not in schematic or "(wire " not in schematic:
+            print("❌ Expected the OUT net to be wired and labelled")
+            return False
+        print("✅ Schematic contains wires for the OUT net")
+
+        random_run = _build_project(work_dir, "06/19/2025 02:40 AM", "seROEWOfsU", "3760327f-8ba3-5a41-aa9f-5c3f74f4920b", deterministic=False)
+        if random_run["voltage_divider_test.kicad_sch"] == first["voltage_divider_test.kicad_sch"]:
+            print("❌ Non-deterministic mode should still use random UUIDs")
+            return False
+        print("✅ Non-deterministic mode keeps random UUIDs")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error testing deterministic output: {e}")
+        return False
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Deterministic Output")
+    print("=" * 40)
+
+    tests = [
+        ("Byte-Identical Output", test_byte_identical_output)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
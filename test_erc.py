@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the in-process ERC over generated netlists
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+LIBRARIES_DIR = os.path.join(REPO_DIR, "libraries")
+
+LED_SPEC = {"name": "led_indicator", "description": "LED with series resistor",
+            "parts": [{"ref": "D1", "lib": "Device", "symbol": "LED", "value": "red"},
+                      {"ref": "R1", "lib": "Device", "symbol": "R", "value": "330"}],
+            "nets": [{"name": "VCC", "pins": ["R1.1"]}, {"name": "A", "pins": ["R1.2", "D1.2"]},
+                     {"name": "GND", "pins": ["D1.1"]}]}
+
+# Two daisy-chained addressable LEDs (pin 1 DOUT, 2 VDD, 3 GND, 4 DIN)
+PIXELS = {"U1": ("APA-106-F5", "LED", "APA-106-F5"), "U2": ("APA-106-F5", "LED", "APA-106-F5"),
+          "R1": ("330", "Device", "R"), "R2": ("10k", "Device", "R"), "#PWR1": ("+5V", "power", "+5V")}
+PIXEL_NETS = {"+5V": [("U1", "2"), ("U2", "2"), ("R1", "1"), ("#PWR1", "1")],
+              "GND": [("U1", "3"), ("U2", "3"), ("R2", "2")],
+              "DIN": [("R1", "2"), ("U1", "4")],
+              "CHAIN": [("U1", "1"), ("U2", "4")],
+              "DOUT": [("U2", "1"), ("R2", "1")]}
+
+def test_checks():
+    """A correct circuit passes; each kind of mistake is reported with its pins"""
+    print("⚡ Testing ERC checks...")
+    from erc import run_erc
+
+    clean = run_erc(PIXELS, PIXEL_NETS, LIBRARIES_DIR)
+    if clean['violations'] or not clean['ok']:
+        print(f"❌ Clean circuit flagged: {clean['violations']}")
+        return False
+
+    comps = dict(PIXELS, U3=("APA-106-F5", "LED", "APA-106-F5"), U4=("APA-106-F5", "LED", "APA-106-F5"),
+                 R3=("1k", "Device", "R"), R4=("1k", "Device", "R"), X1=("?", "Device", "NoSuchPart"))
+    nets = {name: list(nodes) for name, nodes in PIXEL_NETS.items()}
+    nets["CHAIN"].append(("U2", "1"))         # U2's output also drives U1's
+    nets["GND"].append(("R1", "1"))           # +5V shorted to ground
+    nets["SENSE"] = [("R3", "1"), ("R4", "1")]
+    nets["TAP"] = [("R3", "1"), ("R3", "2")]  # Shares R3.1 with SENSE
+    nets["VLOCAL"] = [("U3", "2"), ("R4", "2")]
+    nets["DIN2"] = [("U3", "4"), ("U4", "4")]
+    nets["STUB"] = [("U4", "2")]
+    nets["BAD"] = [("R4", "2"), ("R4", "7")]
+    report = run_erc(comps, nets, LIBRARIES_DIR)
+    codes = {v['code'] for v in report['violations']}
+    expected = {"pin_conflict", "power_short", "shorted_nets", "power_not_driven", "input_not_driven",
+                "single_pin_net", "unconnected_pin", "unknown_pin", "unknown_symbol"}
+    if codes != expected or report['ok']:
+        print(f"❌ Codes {sorted(codes)}, expected {sorted(expected)}")
+        return False
+    conflict = next(v for v in report['violations'] if v['code'] == "pin_conflict")
+    shorted = next(v for v in report['violations'] if v['code'] == "shorted_nets" and "SENSE" in v['nets'])
+    unconnected = {pin for v in report['violations'] if v['code'] == "unconnected_pin" for pin in v['pins']}
+    if sorted(conflict['pins']) != ["U1.1", "U2.1"] or shorted['nets'] != ["SENSE", "TAP"] or \
+            shorted['pins'] != ["R3.1"] or unconnected != {"U3.1", "U3.3", "U4.1", "U4.3"}:
+        print(f"❌ Wrong details: {conflict}, {shorted}, {sorted(unconnected)}")
+        return False
+    print(f"✅ {report['errors']} errors, {report['warnings']} warnings found: {', '.join(sorted(codes))}")
+    return True
+
+def chain(length):
+    """A chain of resistors between VCC and GND"""
+    comp_map = {f"R{i}": ("1k", "Device", "R") for i in range(length)}
+    net_map = {"VCC": [("R0", "1")], "GND": [(f"R{length - 1}", "2")]}
+    for i in range(length - 1):
+        net_map[f"N{i}"] = [(f"R{i}", "2"), (f"R{i + 1}", "1")]
+    return comp_map, net_map
+
+def test_linear_time():
+    """Ten times the netlist costs about ten times the time"""
+    print("\n📈 Testing scaling...")
+    from erc import run_erc
+
+    timings = {}
+    for length in (4000, 40000):
+        comp_map, net_map = chain(length)
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            report = run_erc(comp_map, net_map, LIBRARIES_DIR)
+            best = min(best, time.perf_counter() - start)
+        if report['violations'] or report['pins'] != 2 * length:
+            print(f"❌ Chain of {length}: {report['pins']} pins, {report['violations'][:2]}")
+            return False
+        timings[length] = best
+    ratio = timings[40000] / timings[4000]
+    if ratio > 30:  # Quadratic work would take ~100x
+        print(f"❌ 10x the parts took {ratio:.1f}x the time ({timings})")
+        return False
+    print(f"✅ 40000 parts checked in {timings[40000] * 1000:.0f} ms ({ratio:.1f}x the time of 4000)")
+    return True
+
+def test_pipeline():
+    """Spec and template builds carry an ERC report and leave no SKiDL files behind"""
+    print("\n🏭 Testing pipeline reports...")
+    from generate_circuit import create_circuit_from_spec, create_led_circuit
+
+    previous_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp()
+    try:
+        shutil.copytree(LIBRARIES_DIR, os.path.join(work_dir, "libraries"))
+        os.chdir(work_dir)
+        good = create_circuit_from_spec(json.dumps(LED_SPEC))
+        if "error" in good or good.get("erc", {}).get("violations") != []:
+            print(f"❌ LED spec: {good.get('error') or good.get('erc')}")
+            return False
+
+        broken = dict(LED_SPEC, nets=LED_SPEC["nets"][:2])  # Cathode left open
+        result = create_circuit_from_spec(broken)
+        if "error" in result or not result["erc"]["ok"] or result["erc"]["violations"][0]["pins"] != ["D1.1"]:
+            print(f"❌ Broken spec: {result.get('error') or result.get('erc')}")
+            return False
+
+        led = create_led_circuit(voltage=5.0)
+        if "error" in led or not led.get("erc", {}).get("ok"):
+            print(f"❌ LED template: {led.get('error') or led.get('erc')}")
+            return False
+        stray = [f for f in os.listdir(work_dir) if f.endswith(('.erc', '.log', '_sklib.py'))]
+        if stray:
+            print(f"❌ Files left in the working directory: {stray}")
+            return False
+        print("✅ Reports attached to spec and template results, working directory clean")
+        return True
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing ERC")
+    print("=" * 40)
+
+    tests = [
+        ("Checks", test_checks),
+        ("Linear Time", test_linear_time),
+        ("Pipeline", test_pipeline)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
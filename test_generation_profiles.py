@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test script to verify per-prompt reply caps, stop sequences and wasted-token counts
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+CODE = "from skidl import *\nr1 = Part('Device', 'R', value='1k')\ngenerate_netlist()"
+EXPLANATION = " ".join(["This code creates a resistor and writes its netlist."] * 40)
+CODE_REPLY = f"Here is the code:\n[CODE]\n{CODE}\n[/CODE]\n\n{EXPLANATION}"
+FENCED_CODE_REPLY = f"Here is the code:\n[CODE]\n```\n{CODE}\n```\n[/CODE]\n\n{EXPLANATION}"
+CHAT_REPLY = ("[EXPLANATION]\nA single resistor.\n[/EXPLANATION]\n\n[CODE]\n" + CODE + "\n[/CODE]\n\n"
+              "[INSTRUCTIONS]\nRun it.\n[/INSTRUCTIONS]\n\n" + EXPLANATION)
+
+def test_profiles():
+    """Profiles cap replies, add stop sequences and restore cut markers"""
+    print("✂️ Testing generation profiles...")
+    from generation_profiles import get_profile
+    from model_tiers import KIND_CODE, KIND_CHAT, KIND_SPEC
+
+    code = get_profile(KIND_CODE)
+    options = code.options({"temperature": 0.7, "num_predict": 512})
+    if options["num_predict"] != 512 or options["stop"] != ["[/CODE]"]:
+        print(f"❌ Code options {options}")
+        return False
+    if get_profile(KIND_SPEC).options({"num_predict": 4096})["num_predict"] != 1536:
+        print("❌ Spec cap not applied")
+        return False
+    # A stop on a fence would also match this bare opening fence; the tag cannot
+    if "[/CODE]" in "Here is the code:\n```\nfrom skidl import *":
+        print("❌ Closing tag matches an opening fence")
+        return False
+    cut = CODE_REPLY[:CODE_REPLY.index("[/CODE]")]
+    finished = code.finish(cut)
+    if not finished.endswith(f"{CODE}\n[/CODE]") or code.finish(finished) != finished:
+        print(f"❌ Closing tag not restored once: {finished!r}")
+        return False
+    if code.used(CODE_REPLY) != f"Here is the code:\n[CODE]\n{CODE}\n[/CODE]":
+        print(f"❌ Used part of code reply: {code.used(CODE_REPLY)!r}")
+        return False
+    chat = get_profile(KIND_CHAT)
+    if not chat.finish(CHAT_REPLY[:CHAT_REPLY.index("[/INSTRUCTIONS]")]).endswith("Run it.\n[/INSTRUCTIONS]"):
+        print("❌ Chat instructions section not closed")
+        return False
+    print("✅ Caps, stop sequences and closing markers")
+    return True
+
+def test_engine_stops_early():
+    """Generation stops at the closing tag of code and chat replies"""
+    print("\n🛑 Testing stop sequences through the engine...")
+    from llm_backends import FakeBackend
+    from llm_engine import LLMEngine
+    from model_tiers import KIND_CODE
+
+    def respond(prompt, schema):
+        if "Current request" in prompt:
+            return CHAT_REPLY
+        return FENCED_CODE_REPLY if "fenced" in prompt else CODE_REPLY
+    fake = FakeBackend(responder=respond)
+    engine = LLMEngine("llama2", backend=fake)
+
+    response = engine.generate_response("Return ONLY the Python code", kind=KIND_CODE)
+    if engine.extract_code_from_response(response) != CODE or not response.endswith("[/CODE]"):
+        print(f"❌ Code reply not closed at the tag: {response!r}")
+        return False
+    # The explanation after the tag is never generated, not just trimmed
+    stats = engine.generation_stats.snapshot()["code"]
+    before_tag = len(CODE_REPLY[:CODE_REPLY.index("[/CODE]")].split())
+    if fake.calls[-1]["options"]["stop"] != ["[/CODE]"] or stats["stopped"] != 1 or \
+            stats["generated_tokens"] != before_tag:
+        print(f"❌ Generation ran past the closing tag: {stats}, {before_tag} tokens before it")
+        return False
+    # A fenced block inside the tags still yields the bare code
+    response = engine.generate_response("Return ONLY the Python code (fenced)", kind=KIND_CODE)
+    if engine.extract_code_from_response(response) != CODE:
+        print(f"❌ Fenced code inside the tags not extracted: {response!r}")
+        return False
+    if fake.calls[-1]["options"]["num_predict"] != 1024:
+        print(f"❌ Code cap not sent: {fake.calls[-1]['options']}")
+        return False
+
+    memory = engine.new_conversation()
+    response = engine.process_user_query("make a resistor", memory=memory)
+    if not response.rstrip().endswith("[/INSTRUCTIONS]") or "This code creates" in response:
+        print(f"❌ Chat reply not cut after the instructions: {response[-80:]!r}")
+        return False
+    if "A single resistor." not in memory.render():
+        print("❌ Explanation not remembered")
+        return False
+
+    stats = engine.generation_stats.snapshot()
+    # Only the "Here is the code:" preamble is left unused
+    if stats["code"]["wasted_tokens"] > 5 or stats["chat"]["wasted_tokens"] or stats["code"]["stopped"] != 2 or \
+            stats["chat"]["stopped"] != 1:
+        print(f"❌ Stopped replies should waste almost nothing: {stats}")
+        return False
+    print(f"✅ Replies stopped at their end markers: {stats}")
+    return True
+
+def test_wasted_tokens():
+    """Tokens outside the used part and replies that hit the cap are counted"""
+    print("\n📉 Testing wasted-token telemetry...")
+    from generation_profiles import GenerationStats, get_profile
+    from model_tiers import KIND_CODE
+
+    stats = GenerationStats()
+    # What a reply costs without a stop sequence: the explanation is discarded
+    wasted = stats.record(KIND_CODE, {"response": CODE_REPLY, "completion_tokens": 500, "done_reason": "stop"},
+                          get_profile(KIND_CODE).used(CODE_REPLY))
+    stats.record(KIND_CODE, {"response": "[CODE]\nfrom", "completion_tokens": 3, "done_reason": "length"},
+                 "[CODE]\nfrom")
+    snapshot = stats.snapshot()[KIND_CODE]
+    if not 400 < wasted < 500 or snapshot["hit_cap"] != 1 or snapshot["requests"] != 2:
+        print(f"❌ Wasted {wasted}, stats {snapshot}")
+        return False
+    print(f"✅ {wasted} of 500 tokens wasted without a stop sequence; share {snapshot['wasted_share']:.0%}")
+    return True
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Generation Profiles")
+    print("=" * 40)
+
+    tests = [
+        ("Profiles", test_profiles),
+        ("Engine Stops Early", test_engine_stops_early),
+        ("Wasted Tokens", test_wasted_tokens)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script to verify module import stays fast (python -X importtime)
+
+Heavy dependencies (SKiDL, PySpice, NumPy, the Ollama/OpenAI clients) must
+only load on first use, not when a module is imported.
+"""
+
+import os
+import sys
+import subprocess
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+# Cumulative import time budget per module, in milliseconds
+IMPORT_BUDGET_MS = {
+    "generate_circuit": 300,
+    "llm_engine": 300,
+    "circuit_generator": 300,
+}
+
+HEAVY_MODULES = ("skidl", "PySpice", "numpy", "ollama", "openai", "httpx")
+
+def measure_import(module):
+    """
+    Import module in a fresh interpreter with -X importtime
+    Returns:
+        Tuple of (cumulative import time in ms, set of top-level packages loaded)
+    """
+    code = f"import sys; sys.path.insert(0, {REPO_DIR!r}); import {module}"
+    # Run from a scratch directory so nothing the import might write lands in the repo
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                                cwd=cwd, capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    cumulative_ms = None
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        loaded.add(name.strip().split(".")[0])
+        if name.strip() == module:
+            cumulative_ms = int(cumulative) / 1000
+    return cumulative_ms, loaded
+
+def test_no_heavy_imports():
+    """Importing the core modules does not pull in heavy dependencies"""
+    print("🪶 Testing lazy dependency loading...")
+    ok = True
+    for module in IMPORT_BUDGET_MS:
+        _, loaded = measure_import(module)
+        eager = [name for name in HEAVY_MODULES if name in loaded]
+        if eager:
+            print(f"❌ import {module} eagerly loads {', '.join(eager)}")
+            ok = False
+        else:
+            print(f"✅ import {module} loads no heavy dependencies")
+    return ok
+
+def test_import_budget():
+    """Each core module imports within its time budget"""
+    print("\n⏱️ Testing import time budget...")
+    ok = True
+    for module, budget_ms in IMPORT_BUDGET_MS.items():
+        # Best of three, so a cold disk cache doesn't fail the test
+        elapsed_ms = min(measure_import(module)[0] for _ in range(3))
+        if elapsed_ms > budget_ms:
+            print(f"❌ import {module} took {elapsed_ms:.0f} ms (budget {budget_ms} ms)")
+            ok = False
+        else:
+            print(f"✅ import {module}: {elapsed_ms:.0f} ms (budget {budget_ms} ms)")
+    return ok
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Import Time")
+    print("=" * 40)
+
+    tests = [
+        ("Lazy Dependencies", test_no_heavy_imports),
+        ("Import Budget", test_import_budget)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test script to verify offline library bundles and verified, atomic fetches
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+LIBRARIES_DIR = os.path.join(REPO_DIR, "libraries")
+
+def _leftovers(directory):
+    """Temporary files left behind in directory"""
+    return [name for name in os.listdir(directory) if name.startswith('.tmp-')]
+
+def test_bundle_round_trip():
+    """Bundles are byte-stable and install the pinned libraries"""
+    print("📦 Testing bundle build and install...")
+    from library_bundle import build_bundle, provision_libraries, sha256_file, PINNED_LIBRARIES
+
+    root = tempfile.mkdtemp()
+    try:
+        first = os.path.join(root, "first.tar.gz")
+        second = os.path.join(root, "second.tar.gz")
+        build_bundle(LIBRARIES_DIR, first, names=sorted(PINNED_LIBRARIES))
+        build_bundle(LIBRARIES_DIR, second, names=sorted(PINNED_LIBRARIES))
+        if sha256_file(first) != sha256_file(second):
+            print("❌ Building the same libraries twice gave different bundles")
+            return False
+        print("✅ Bundle output is byte-stable")
+
+        target = os.path.join(root, "libraries")
+        result = provision_libraries(target, sources=[first])
+        if sorted(result["installed"]) != sorted(PINNED_LIBRARIES):
+            print(f"❌ Bundle installed {sorted(result['installed'])}")
+            return False
+        if any(sha256_file(os.path.join(target, n)) != d for n, d in PINNED_LIBRARIES.items()):
+            print("❌ Installed libraries do not match their pins")
+            return False
+        again = provision_libraries(target, sources=[])
+        if again["installed"] or sorted(again["present"]) != sorted(PINNED_LIBRARIES):
+            print("❌ Verified libraries were fetched again")
+            return False
+        print("✅ Bundle installs pinned libraries offline; second run is a no-op")
+        return True
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def test_corrupt_bundle_rejected():
+    """A tampered bundle is rejected and leaves nothing behind"""
+    print("\n🛡️ Testing corrupt bundle handling...")
+    from library_bundle import build_bundle, provision_libraries, LibraryError, PINNED_LIBRARIES
+
+    root = tempfile.mkdtemp()
+    try:
+        bundle = os.path.join(root, "libs.tar.gz")
+        build_bundle(LIBRARIES_DIR, bundle, names=sorted(PINNED_LIBRARIES))
+        with open(bundle, 'r+b') as f:
+            f.seek(os.path.getsize(bundle) // 2)
+            f.write(b"\x00" * 64)
+
+        target = os.path.join(root, "libraries")
+        try:
+            provision_libraries(target, sources=[bundle])
+            print("❌ Corrupt bundle was accepted")
+            return False
+        except LibraryError:
+            pass
+        if os.listdir(target):
+            print(f"❌ Files left behind: {os.listdir(target)}")
+            return False
+        print("✅ Corrupt bundle rejected, library directory untouched")
+        return True
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def test_mirror_fallback():
+    """Mirrors are tried in order and only verified bytes are installed"""
+    print("\n🪞 Testing mirror fetch...")
+    from library_bundle import provision_libraries, sha256_file, PINNED_LIBRARIES, UPSTREAM_URL, LIBRARY_SET_TAG
+
+    root = tempfile.mkdtemp()
+    try:
+        bad_mirror = os.path.join(root, "bad")
+        os.makedirs(bad_mirror)
+        for name in PINNED_LIBRARIES:
+            with open(os.path.join(bad_mirror, name), 'wb') as f:
+                f.write(b"(kicad_symbol_lib truncated")
+
+        target = os.path.join(root, "libraries")
+        os.makedirs(target)
+        # A half-written library from an interrupted download gets replaced
+        with open(os.path.join(target, "Device.kicad_sym"), 'wb') as f:
+            f.write(b"(kicad_symbol_lib")
+
+        result = provision_libraries(target, sources=[bad_mirror, LIBRARIES_DIR])
+        if set(result["installed"].values()) != {LIBRARIES_DIR}:
+            print(f"❌ Unexpected sources used: {result['installed']}")
+            return False
+        if any(sha256_file(os.path.join(target, n)) != d for n, d in PINNED_LIBRARIES.items()) or _leftovers(target):
+            print("❌ Installed libraries are wrong or temporary files remain")
+            return False
+        print("✅ Corrupt mirror skipped, partial file replaced atomically")
+
+        if f"/raw/{LIBRARY_SET_TAG}/" not in UPSTREAM_URL or "{name}" not in UPSTREAM_URL:
+            print(f"❌ Upstream not read at the pinned tag: {UPSTREAM_URL}")
+            return False
+        print(f"✅ Upstream pinned to {UPSTREAM_URL.format(name='Device.kicad_sym')}")
+        return True
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Library Bundles")
+    print("=" * 40)
+
+    tests = [
+        ("Bundle Round Trip", test_bundle_round_trip),
+        ("Corrupt Bundle", test_corrupt_bundle_rejected),
+        ("Mirror Fallback", test_mirror_fallback)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Test script to verify pluggable LLM backends and pooled HTTP connections
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+class StubModelServer:
+    """Local HTTP server speaking the Ollama and OpenAI APIs, with counters"""
+    def __init__(self, delay=0.0, fail_first=0):
+        self.connections = 0
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delay = delay
+        self.fail_first = fail_first
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with stub.lock:
+                    stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._reply(200, {"models": [{"name": "llama2:latest"}]})
+                elif self.path == "/v1/models":
+                    self._reply(200, {"data": [{"id": "local-model"}]})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.requests.append((self.path, body))
+                    failing = len(stub.requests) <= stub.fail_first
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    if failing:
+                        self._reply(503, {"error": "busy"})
+                    elif self.path == "/api/generate":
+                        self._reply(200, {"response": f"echo: {body['prompt']}", "prompt_eval_count": 3, "eval_count": 2})
+                    elif self.path == "/v1/chat/completions":
+                        self._reply(200, {"choices": [{"message": {"content": f"chat: {body['messages'][0]['content']}"}}],
+                                          "usage": {"prompt_tokens": 3, "completion_tokens": 2}})
+                    else:
+                        self._reply(400, {"error": "bad request"})
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def test_keep_alive_pool():
+    """Sequential requests reuse one connection"""
+    print("🔌 Testing keep-alive connection reuse...")
+    from llm_backends import HTTPClient, OllamaBackend
+
+    stub = StubModelServer()
+    try:
+        client = HTTPClient(stub.url)
+        backend = OllamaBackend(client)
+        replies = [backend.generate("llama2", f"prompt {i}")["response"] for i in range(20)]
+        if replies[7] != "echo: prompt 7":
+            print(f"❌ Unexpected reply: {replies[7]}")
+            return False
+        if stub.connections != 1 or client.connections_opened != 1:
+            print(f"❌ 20 requests opened {stub.connections} connections")
+            return False
+        print("✅ 20 requests over 1 connection")
+        client.close()
+        return True
+    finally:
+        stub.close()
+
+def test_retries_and_errors():
+    """5xx replies are retried; 4xx replies fail at once"""
+    print("\n🔁 Testing retries...")
+    from llm_backends import HTTPClient, LLMBackendError
+
+    stub = StubModelServer(fail_first=2)
+    try:
+        client = HTTPClient(stub.url, retries=2, backoff=0.01)
+        reply = client.request("POST", "/api/generate", {"model": "m", "prompt": "hi"})
+        if reply.get("response") != "echo: hi" or len(stub.requests) != 3:
+            print(f"❌ Retry failed after {len(stub.requests)} requests")
+            return False
+        print("✅ Two 503 replies retried, third attempt succeeded")
+        try:
+            client.request("POST", "/api/unknown", {})
+            print("❌ HTTP 400 was not raised")
+            return False
+        except LLMBackendError as e:
+            if e.status != 400 or len(stub.requests) != 4:
+                print(f"❌ HTTP 400 handled wrongly: {e}")
+                return False
+        print("✅ HTTP 400 raised without retrying")
+        return True
+    finally:
+        stub.close()
+
+def test_timeout_not_resent():
+    """A timeout on a reused connection counts as an attempt; the request is not silently re-sent"""
+    print("\n⏱️ Testing timeout on a reused connection...")
+    from llm_backends import HTTPClient, LLMBackendError
+
+    stub = StubModelServer()
+    try:
+        client = HTTPClient(stub.url, retries=0, backoff=0.01)
+        client.request("POST", "/api/generate", {"model": "m", "prompt": "warm"})
+        stub.delay = 0.5
+        try:
+            client.request("POST", "/api/generate", {"model": "m", "prompt": "slow"}, timeout=0.1)
+            print("❌ Timeout was not raised")
+            return False
+        except LLMBackendError:
+            pass
+        time.sleep(0.8)
+        slow = [body for path, body in stub.requests if body.get("prompt") == "slow"]
+        if len(slow) != 1:
+            print(f"❌ Timed-out request sent {len(slow)} times")
+            return False
+        print("✅ Timed-out request sent exactly once")
+        return True
+    finally:
+        stub.close()
+
+def test_concurrency_limit():
+    """At most max_connections requests reach the server at once"""
+    print("\n🚦 Testing concurrency limit...")
+    from llm_backends import HTTPClient, OllamaBackend
+
+    stub = StubModelServer(delay=0.05)
+    try:
+        backend = OllamaBackend(HTTPClient(stub.url, max_connections=2))
+        threads = [threading.Thread(target=backend.generate, args=("llama2", f"p{i}")) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if len(stub.requests) != 10 or stub.max_in_flight > 2 or stub.connections > 2:
+            print(f"❌ {stub.max_in_flight} in flight over {stub.connections} connections")
+            return False
+        print(f"✅ 10 concurrent calls, at most {stub.max_in_flight} in flight over {stub.connections} connections")
+        return True
+    finally:
+        stub.close()
+
+def test_engine_backends():
+    """LLMEngine runs unchanged on the OpenAI-compatible and fake backends"""
+    print("\n🧩 Testing LLMEngine with other backends...")
+    from llm_backends import create_backend, FakeBackend
+    from llm_engine import LLMEngine
+
+    stub = StubModelServer()
+    try:
+        engine = LLMEngine("local-model", backend=create_backend("openai", base_url=f"{stub.url}/v1", retries=0))
+        if engine.generate_response("hello") != "chat: hello":
+            print("❌ OpenAI-compatible backend reply not returned")
+            return False
+        engine.generate_structured("describe", {"type": "object"})
+        sent = stub.requests[-1][1]
+        if sent.get("response_format", {}).get("type") != "json_schema" or sent.get("temperature") != 0:
+            print(f"❌ Structured request not translated: {sent}")
+            return False
+        print("✅ OpenAI-compatible backend: plain and schema-constrained requests")
+    finally:
+        stub.close()
+
+    spec = {"name": "divider", "parts": [{"ref": "R1", "lib": "Device", "symbol": "R", "value": "1k"}],
+            "nets": [{"name": "VCC", "pins": ["R1.1"]}]}
+    fake = FakeBackend(responder=lambda prompt, schema: json.dumps(spec))
+    engine = LLMEngine("llama2", backend=fake)
+    result = engine.generate_circuit_spec("a divider")
+    if not result["success"] or fake.models != ["llama2"] or fake.calls[-1]["format"] is None:
+        print(f"❌ Fake backend run failed: {result['message']}")
+        return False
+    print("✅ Fake backend: model pulled, circuit spec generated in process")
+    return True
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing LLM Backends")
+    print("=" * 40)
+
+    tests = [
+        ("Keep-Alive Pool", test_keep_alive_pool),
+        ("Retries", test_retries_and_errors),
+        ("Timeout Not Re-sent", test_timeout_not_resent),
+        ("Concurrency Limit", test_concurrency_limit),
+        ("Engine Backends", test_engine_backends)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Test script to verify LLM request single-flight, in-flight caps and priorities
+"""
+
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+class TrackingResponder:
+    """Reply callable for FakeBackend that records order and concurrency"""
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.order = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, prompt, schema):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.order.append(prompt)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        if prompt == "fail":
+            raise RuntimeError("model crashed")
+        return f"reply to {prompt}"
+
+def test_single_flight():
+    """Concurrent identical prompts share one backend call"""
+    print("🔗 Testing single-flight...")
+    from llm_backends import FakeBackend
+    from llm_dispatcher import LLMDispatcher
+
+    responder = TrackingResponder(delay=0.2)
+    backend = FakeBackend(responder=responder)
+    dispatcher = LLMDispatcher(backend, max_in_flight=4)
+    futures = [dispatcher.submit("m", "same prompt", {"temperature": 0}) for _ in range(8)]
+    futures.append(dispatcher.submit("m", "same prompt", {"temperature": 0.7}))
+    replies = [f.result(timeout=5)["response"] for f in futures]
+    dispatcher.close()
+    if len(backend.calls) != 2 or set(replies) != {"reply to same prompt"}:
+        print(f"❌ {len(backend.calls)} backend calls for 8 identical + 1 different request")
+        return False
+    if dispatcher.metrics()["coalesced"] != 7:
+        print(f"❌ Coalesced count {dispatcher.metrics()['coalesced']}")
+        return False
+    print("✅ 8 identical requests made 1 call; different options made their own")
+    return True
+
+def test_in_flight_cap():
+    """No more than max_in_flight requests reach the backend at once"""
+    print("\n🚦 Testing in-flight cap...")
+    from llm_backends import FakeBackend
+    from llm_dispatcher import LLMDispatcher
+
+    responder = TrackingResponder(delay=0.05)
+    dispatcher = LLMDispatcher(FakeBackend(responder=responder), max_in_flight=2)
+    futures = [dispatcher.submit("m", f"prompt {i}") for i in range(12)]
+    for future in futures:
+        future.result(timeout=5)
+    metrics = dispatcher.metrics()
+    dispatcher.close()
+    if responder.max_active != 2 or metrics["max_queue_depth"] < 10 or metrics["completed"] != 12:
+        print(f"❌ {responder.max_active} active at once, metrics {metrics}")
+        return False
+    print(f"✅ 12 requests, at most {responder.max_active} in flight, queue peaked at {metrics['max_queue_depth']}")
+    return True
+
+def test_priority_order():
+    """Interactive requests overtake queued background work"""
+    print("\n⏫ Testing priority scheduling...")
+    from llm_backends import FakeBackend
+    from llm_dispatcher import LLMDispatcher, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+
+    responder = TrackingResponder(delay=0.05)
+    dispatcher = LLMDispatcher(FakeBackend(responder=responder), max_in_flight=1)
+    futures = [dispatcher.submit("m", "running", priority=PRIORITY_BACKGROUND)]
+    time.sleep(0.02)  # "running" now occupies the only slot
+    futures += [dispatcher.submit("m", f"review {i}", priority=PRIORITY_BACKGROUND) for i in range(4)]
+    futures += [dispatcher.submit("m", f"chat {i}", priority=PRIORITY_INTERACTIVE) for i in range(2)]
+    # An identical interactive request promotes queued "review 3"; it keeps its
+    # place in arrival order, ahead of the later chat requests
+    futures.append(dispatcher.submit("m", "review 3", priority=PRIORITY_INTERACTIVE))
+    for future in futures:
+        future.result(timeout=5)
+    metrics = dispatcher.metrics()
+    dispatcher.close()
+    expected = ["running", "review 3", "chat 0", "chat 1", "review 0", "review 1", "review 2"]
+    if responder.order != expected:
+        print(f"❌ Served in order {responder.order}")
+        return False
+    if metrics["wait"]["background"]["max_s"] <= metrics["wait"]["interactive"]["max_s"]:
+        print(f"❌ Wait metrics do not reflect priorities: {metrics['wait']}")
+        return False
+    print(f"✅ Served {responder.order}")
+    return True
+
+def test_failures_propagate():
+    """A failed request fails every caller sharing it and is counted"""
+    print("\n💥 Testing failures...")
+    from llm_backends import FakeBackend
+    from llm_dispatcher import LLMDispatcher
+
+    dispatcher = LLMDispatcher(FakeBackend(responder=TrackingResponder(delay=0.1)), max_in_flight=1)
+    futures = [dispatcher.submit("m", "fail") for _ in range(3)]
+    errors = [f.exception(timeout=5) for f in futures]
+    ok = dispatcher.generate("m", "fine", timeout=5)["response"]
+    metrics = dispatcher.metrics()
+    dispatcher.close()
+    if not all(isinstance(e, RuntimeError) for e in errors) or metrics["failed"] != 1 or ok != "reply to fine":
+        print(f"❌ Errors {errors}, metrics {metrics}")
+        return False
+    print("✅ Shared failure raised in all 3 callers; dispatcher kept serving")
+    return True
+
+def _gauge(name):
+    """Current value of an unlabelled gauge as scraped"""
+    from metrics import REGISTRY
+    line = next(l for l in REGISTRY.render().splitlines() if l.startswith(name + " "))
+    return float(line.split()[1])
+
+def test_gauges_follow_every_dispatcher():
+    """A closed dispatcher counts in the gauges until drained, then leaves them and stops its workers"""
+    print("\n📏 Testing queue gauges...")
+    from llm_backends import FakeBackend
+    from llm_dispatcher import LLMDispatcher, _live_dispatchers
+
+    old = LLMDispatcher(FakeBackend(responder=TrackingResponder(delay=0.3)), max_in_flight=1)
+    futures = [old.submit("m", f"prompt {i}") for i in range(3)]
+    time.sleep(0.1)
+    old.close(wait=False)
+    new = LLMDispatcher(FakeBackend(responder=TrackingResponder()), max_in_flight=1)
+    depth, in_flight = _gauge("kicad_ai_llm_queue_depth"), _gauge("kicad_ai_llm_in_flight")
+    for future in futures:
+        future.result(timeout=5)
+    new.close()
+    if depth != 2 or in_flight != 1:
+        print(f"❌ Gauges read queue depth {depth}, in flight {in_flight}; expected 2 and 1")
+        return False
+    if _gauge("kicad_ai_llm_queue_depth") != 0 or _gauge("kicad_ai_llm_in_flight") != 0:
+        print("❌ Gauges did not return to zero once drained")
+        return False
+    for worker in old._workers:
+        worker.join(timeout=5)
+    if old in _live_dispatchers or new in _live_dispatchers or any(w.is_alive() for w in old._workers + new._workers):
+        print("❌ Closed dispatchers still registered or their workers still running")
+        return False
+    print("✅ Old dispatcher's queue still reported after a new one started; both left once closed")
+    return True
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing LLM Dispatcher")
+    print("=" * 40)
+
+    tests = [
+        ("Single Flight", test_single_flight),
+        ("In-Flight Cap", test_in_flight_cap),
+        ("Priority Order", test_priority_order),
+        ("Failures", test_failures_propagate),
+        ("Queue Gauges", test_gauges_follow_every_dispatcher)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
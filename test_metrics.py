@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the metrics registry, text exposition and HTTP endpoint
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LED_SPEC = {"name": "led_indicator", "description": "LED with series resistor",
+            "parts": [{"ref": "D1", "lib": "Device", "symbol": "LED", "value": "red"},
+                      {"ref": "R1", "lib": "Device", "symbol": "R", "value": "330"}],
+            "nets": [{"name": "VCC", "pins": ["R1.1"]}, {"name": "A", "pins": ["R1.2", "D1.2"]},
+                     {"name": "GND", "pins": ["D1.1"]}]}
+
+def parse_exposition(text):
+    """{'name{labels}': value} from text exposition, skipping comments"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+def test_concurrent_updates():
+    """Increments from many threads are all counted; histogram buckets are cumulative"""
+    print("🧮 Testing concurrent updates...")
+    from metrics import Counter, Histogram, Gauge, MetricsRegistry
+
+    registry = MetricsRegistry()
+    counter = Counter("test_events_total", "Events", ("kind",), registry=registry)
+    histogram = Histogram("test_seconds", "Durations", buckets=(0.1, 1), registry=registry)
+    gauge = Gauge("test_depth", "Depth", registry=registry)
+    gauge.set_function(lambda: 7)
+
+    def work():
+        ok = counter.labels(kind="ok")
+        for i in range(10000):
+            ok.inc()
+            if i % 100 == 0:
+                histogram.observe(0.05 if i % 200 == 0 else 5)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.labels("error").inc(2)
+
+    samples = parse_exposition(registry.render())
+    expected = {
+        'test_events_total{kind="ok"}': 80000,
+        'test_events_total{kind="error"}': 2,
+        'test_seconds_bucket{le="0.1"}': 400,
+        'test_seconds_bucket{le="1"}': 400,
+        'test_seconds_bucket{le="+Inf"}': 800,
+        'test_seconds_count': 800,
+        'test_depth': 7,
+    }
+    wrong = {k: samples.get(k) for k, v in expected.items() if samples.get(k) != v}
+    if wrong:
+        print(f"❌ Unexpected samples: {wrong}")
+        return False
+    if abs(samples['test_seconds_sum'] - (400 * 0.05 + 400 * 5)) > 1e-6:
+        print(f"❌ Histogram sum {samples['test_seconds_sum']}")
+        return False
+    print("✅ 80000 increments from 8 threads counted; buckets cumulative")
+    return True
+
+def test_http_endpoint():
+    """GET /metrics serves the registry in text exposition format"""
+    print("\n🌐 Testing HTTP endpoint...")
+    from metrics import Counter, MetricsRegistry, start_metrics_server
+
+    registry = MetricsRegistry()
+    Counter("test_scrapes_total", "Scrapes", registry=registry).inc(3)
+    server = start_metrics_server(port=0, registry=registry)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+            content_type = response.headers["Content-Type"]
+            body = response.read().decode("utf-8")
+        if not content_type.startswith("text/plain; version=0.0.4") or \
+                parse_exposition(body).get("test_scrapes_total") != 3 or "# TYPE test_scrapes_total counter" not in body:
+            print(f"❌ Unexpected response ({content_type}):\n{body}")
+            return False
+        try:
+            urllib.request.urlopen(f"{url}/other", timeout=5)
+            print("❌ Unknown path was served")
+            return False
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                print(f"❌ Unknown path returned {e.code}")
+                return False
+        print(f"✅ Scraped {url}/metrics")
+        return True
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_pipeline_metrics():
+    """A custom circuit request updates the request, LLM, build and cache metrics"""
+    print("\n📈 Testing pipeline metrics...")
+    from metrics import REGISTRY
+    from llm_backends import FakeBackend
+    from llm_engine import LLMEngine
+    from generate_circuit import CircuitGenerator
+
+    before = parse_exposition(REGISTRY.render())
+    previous_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp()
+    try:
+        shutil.copytree(os.path.join(REPO_DIR, "libraries"), os.path.join(work_dir, "libraries"))
+        os.chdir(work_dir)
+        engine = LLMEngine("llama2", backend=FakeBackend(responder=lambda prompt, schema: json.dumps(LED_SPEC)))
+        generator = CircuitGenerator(llm_engine_factory=lambda: engine, setup_environment=False)
+        result = generator.generate_custom_circuit("an LED with a resistor")
+        if "error" in result:
+            print(f"❌ {result['error']}")
+            return False
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    after = parse_exposition(REGISTRY.render())
+    delta = {name: value - before.get(name, 0) for name, value in after.items()}
+    expected = [
+        'kicad_ai_requests_total{type="from_spec",outcome="success"}',
+        'kicad_ai_request_seconds_count{type="from_spec"}',
+        'kicad_ai_llm_requests_total{kind="spec",tier="small",outcome="success"}',
+        'kicad_ai_llm_tokens_total{kind="spec",direction="completion"}',
+        'kicad_ai_project_build_seconds_count',
+        'kicad_ai_artifact_bytes_written_total{kind="kicad_project"}',
+        'kicad_ai_cache_requests_total{cache="review",result="miss"}',
+    ]
+    missing = [name for name in expected if delta.get(name, 0) <= 0]
+    if missing:
+        print(f"❌ Not updated: {missing}")
+        return False
+    if 'kicad_ai_llm_queue_depth' not in after:
+        print("❌ Dispatcher gauges missing")
+        return False
+    print(f"✅ {sum(1 for v in delta.values() if v > 0)} samples updated by one request")
+    return True
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Metrics")
+    print("=" * 40)
+
+    tests = [
+        ("Concurrent Updates", test_concurrent_updates),
+        ("HTTP Endpoint", test_http_endpoint),
+        ("Pipeline Metrics", test_pipeline_metrics)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Test script to verify request classification and model tiering
+"""
+
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SMALL_SPEC = {"name": "led", "parts": [{"ref": "D1", "lib": "LED", "symbol": "LED", "value": "red"},
+                                       {"ref": "R1", "lib": "Device", "symbol": "R", "value": "330"}],
+              "nets": [{"name": "A", "pins": ["R1.2", "D1.2"]}]}
+
+def test_classification():
+    """Simple requests are small, complex ones large"""
+    print("🏷️ Testing request classification...")
+    from model_tiers import TieringPolicy, KIND_CHAT, KIND_SPEC, KIND_REVIEW, KIND_CODE
+
+    policy = TieringPolicy("big-model", "small-model")
+    big_circuit = {"components": [f"R{i}" for i in range(20)], "nets": ["A", "B"]}
+    cases = [
+        (KIND_SPEC, dict(text="an LED with a current limiting resistor"), "small"),
+        (KIND_SPEC, dict(text="Can you make a voltage divider from 12V to 5V?"), "small"),
+        (KIND_SPEC, dict(text="an op-amp amplifier with gain 10"), "large"),
+        (KIND_SPEC, dict(text="a 2nd order filter at 1 kHz"), "large"),
+        (KIND_SPEC, dict(text="LED " * 60), "large"),
+        (KIND_REVIEW, dict(circuit={"components": ["R1", "R2"], "nets": ["VCC", "GND"]}), "small"),
+        (KIND_REVIEW, dict(circuit=big_circuit), "large"),
+        (KIND_CHAT, dict(text="add a resistor"), "small"),
+        (KIND_CHAT, dict(text="add a resistor", circuit={"name": "divider", "components": ["R1"]}), "large"),
+        (KIND_CHAT, dict(text="add a resistor", memory_tokens=500), "large"),
+        (KIND_CODE, dict(text="an LED"), "large"),
+    ]
+    for kind, signals, expected in cases:
+        tier = policy.classify(kind, **signals)
+        if tier != expected:
+            print(f"❌ {kind} {signals} classified {tier}, expected {expected}")
+            return False
+
+    # A small request whose prompt does not fit the small context goes large
+    tier = policy.select(KIND_SPEC, "x " * 3000, text="an LED")
+    if tier is not policy.large or policy.counts["large"] != 1:
+        print(f"❌ Oversized prompt sent to {tier}")
+        return False
+
+    # With one model for both tiers only a truncated reply is worth retrying
+    same = TieringPolicy("llama2")
+    if same.escalate(same.small) is not None or same.escalate(same.small, truncated=True) is not same.large:
+        print("❌ Same-model escalation retries an identical request")
+        return False
+    print(f"✅ {len(cases)} requests classified; oversized prompt moved to the large tier")
+    return True
+
+def test_options():
+    """Tiers set num_ctx and num_predict; thread and GPU settings only when configured"""
+    print("\n⚙️ Testing tier options...")
+    from model_tiers import TieringPolicy, hardware_options
+
+    saved = {k: os.environ.pop(k, None) for k in ("LLM_NUM_THREAD", "LLM_NUM_GPU", "LLM_SMALL_MODEL")}
+    try:
+        if hardware_options():
+            print(f"❌ Unconfigured hardware options: {hardware_options()}")
+            return False
+        os.environ["LLM_NUM_THREAD"] = "4"
+        if hardware_options() != {"num_thread": 4}:
+            print(f"❌ LLM_NUM_THREAD ignored: {hardware_options()}")
+            return False
+        policy = TieringPolicy.from_env("llama2")
+        if policy.models != ["llama2"] or policy.small.model != "llama2":
+            print(f"❌ Default small tier should reuse the model: {policy.models}")
+            return False
+        # Ollama reloads a model when num_ctx changes, so one model keeps one context size
+        if policy.small.num_ctx != policy.large.num_ctx:
+            print(f"❌ Default tiers use num_ctx {policy.small.num_ctx} and {policy.large.num_ctx}")
+            return False
+    finally:
+        for key, value in saved.items():
+            os.environ.pop(key, None)
+            if value is not None:
+                os.environ[key] = value
+
+    options = policy.small.options({"temperature": 0.7})
+    if options != {"temperature": 0.7, "num_ctx": 4096, "num_predict": 512}:
+        print(f"❌ Small tier options {options}")
+        return False
+    small_model = TieringPolicy("llama2", "phi3").small.options({})
+    if small_model != {"num_ctx": 2048, "num_predict": 512}:
+        print(f"❌ Separate small model options {small_model}")
+        return False
+    print(f"✅ Small tier options {options}")
+    return True
+
+def test_engine_routing():
+    """The engine sends simple requests to the small model and escalates failures"""
+    print("\n🧭 Testing engine routing...")
+    from llm_backends import FakeBackend
+    from llm_engine import LLMEngine
+    from model_tiers import TieringPolicy
+
+    replies = {"small-model": json.dumps(SMALL_SPEC), "big-model": json.dumps(SMALL_SPEC)}
+
+    class RoutingBackend(FakeBackend):
+        def generate(self, model, prompt, options=None, format=None):
+            self.responder = lambda prompt, schema: replies[model]
+            return super().generate(model, prompt, options, format)
+
+    fake = RoutingBackend(models=["big-model"])
+    engine = LLMEngine("big-model", backend=fake, tiers=TieringPolicy("big-model", "small-model"))
+    if fake.models != ["big-model", "small-model"]:
+        print(f"❌ Small model not pulled: {fake.models}")
+        return False
+    if "num_gpu" in engine.model_params or "num_thread" in engine.model_params:
+        print(f"❌ Hard-coded hardware options: {engine.model_params}")
+        return False
+
+    result = engine.generate_circuit_spec("an LED with a resistor")
+    call = fake.calls[-1]
+    if not result["success"] or result["tier"] != "small" or call["model"] != "small-model" \
+            or call["options"]["num_predict"] != 512:
+        print(f"❌ Simple request not served by the small tier: {result['message']} {call['model']}")
+        return False
+
+    result = engine.generate_circuit_spec("a microcontroller driving an H-bridge")
+    if not result["success"] or fake.calls[-1]["model"] != "big-model":
+        print(f"❌ Complex request not served by the large tier: {fake.calls[-1]['model']}")
+        return False
+
+    # The small model produces an invalid spec: the request is retried on the large model
+    replies["small-model"] = json.dumps({"name": "bad", "parts": [], "nets": []})
+    calls_before = len(fake.calls)
+    result = engine.generate_circuit_spec("two LEDs in series")
+    models = [c["model"] for c in fake.calls[calls_before:]]
+    if not result["success"] or result["tier"] != "large" or models != ["small-model", "big-model"]:
+        print(f"❌ Invalid small-tier spec not escalated: {models} {result['message']}")
+        return False
+    if engine.tiers.counts != {"small": 2, "large": 1, "escalated": 1}:
+        print(f"❌ Tier counts {engine.tiers.counts}")
+        return False
+    print(f"✅ Small, large and escalated requests routed; counts {engine.tiers.counts}")
+    return True
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Model Tiers")
+    print("=" * 40)
+
+    tests = [
+        ("Classification", test_classification),
+        ("Tier Options", test_options),
+        ("Engine Routing", test_engine_routing)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
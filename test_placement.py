@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the schematic placement engine
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def test_small_circuit():
+    """A small circuit stays on one sheet with connected parts side by side"""
+    print("📐 Testing small circuit placement...")
+    from placement import place_components
+
+    net_map = {
+        "VCC": [("R1", "1")],
+        "OUT": [("R1", "2"), ("R2", "1")],
+        "GND": [("R2", "2"), ("C1", "2")],
+        "FILT": [("R3", "2"), ("C1", "1")],
+    }
+    placement = place_components(["R1", "R2", "R3", "C1"], net_map)
+    if placement.num_sheets != 1:
+        print(f"❌ Expected 1 sheet, got {placement.num_sheets}")
+        return False
+    (x1, y1), (x2, y2) = placement.positions["R1"], placement.positions["R2"]
+    if abs(x1 - x2) > 26 or abs(y1 - y2) > 21:
+        print(f"❌ R1 and R2 share a net but are not neighbours: {placement.positions}")
+        return False
+    off_grid = [ref for ref, (x, y) in placement.positions.items() if round(x / 2.54, 6) % 1 or round(y / 2.54, 6) % 1]
+    if off_grid:
+        print(f"❌ Parts off the 2.54mm grid: {off_grid}")
+        return False
+    print(f"✅ Placed on one sheet: {placement.positions}")
+    return True
+
+def test_large_netlist():
+    """5,000 parts are placed without overlaps, on the page, in a few seconds"""
+    print("\n🏭 Testing large netlist placement...")
+    from placement import place_components
+    from benchmark_placement import make_synthetic_netlist, check_placement
+
+    comp_map, net_map = make_synthetic_netlist(5000)
+    start = time.perf_counter()
+    placement = place_components(list(comp_map), net_map)
+    elapsed = time.perf_counter() - start
+
+    problems = check_placement(placement)
+    if problems:
+        print(f"❌ {len(problems)} placement problems, e.g. {problems[0]}")
+        return False
+    if placement.num_sheets < 2:
+        print("❌ 5,000 parts should overflow onto several sheets")
+        return False
+    if elapsed > 5.0:
+        print(f"❌ Placement took {elapsed:.2f}s")
+        return False
+    print(f"✅ 5,000 parts on {placement.num_sheets} sheets in {elapsed:.3f}s")
+    return True
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Placement Engine")
+    print("=" * 40)
+
+    tests = [
+        ("Small Circuit", test_small_circuit),
+        ("Large Netlist", test_large_netlist)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script to verify opt-in request profiling and collapsed-stack output
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LED_SPEC = {"name": "led_indicator", "description": "LED with series resistor",
+            "parts": [{"ref": "D1", "lib": "Device", "symbol": "LED", "value": "red"},
+                      {"ref": "R1", "lib": "Device", "symbol": "R", "value": "330"}],
+            "nets": [{"name": "VCC", "pins": ["R1.1"]}, {"name": "A", "pins": ["R1.2", "D1.2"]},
+                     {"name": "GND", "pins": ["D1.1"]}]}
+
+def busy_work(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(100))
+    return total
+
+def test_sampler():
+    """Samples of a busy thread come out as collapsed stacks rooted at the caller"""
+    print("🔬 Testing stack sampler...")
+    from profiling import StackSampler
+
+    sampler = StackSampler(interval=0.002)
+    sampler.start()
+    busy_work(0.2)
+    sampler.stop()
+    lines = sampler.collapsed().splitlines()
+    if sampler.samples < 20 or sum(int(line.rsplit(" ", 1)[1]) for line in lines) != sampler.samples:
+        print(f"❌ {sampler.samples} samples, {len(lines)} stacks")
+        return False
+    top = [frame.split(" (")[0] for frame in lines[0].rsplit(" ", 1)[0].split(";")]
+    if "busy_work" not in top or "test_sampler" not in top or top.index("test_sampler") > top.index("busy_work"):
+        print(f"❌ Unexpected top stack: {top}")
+        return False
+    print(f"✅ {sampler.samples} samples in {len(lines)} distinct stacks")
+    return True
+
+def test_profiled_request():
+    """profile=True stores the request's stacks as an artifact; profile=False adds nothing"""
+    print("\n📸 Testing profiled request...")
+    from llm_backends import FakeBackend
+    from llm_engine import LLMEngine
+    from generate_circuit import CircuitGenerator
+    from artifact_store import get_artifact_store
+
+    previous_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp()
+    try:
+        shutil.copytree(os.path.join(REPO_DIR, "libraries"), os.path.join(work_dir, "libraries"))
+        os.chdir(work_dir)
+        backend = FakeBackend(responder=lambda prompt, schema: json.dumps(LED_SPEC), latency=0.05)
+        engine = LLMEngine("llama2", backend=backend)
+        generator = CircuitGenerator(llm_engine_factory=lambda: engine, setup_environment=False)
+
+        threads_before = threading.active_count()
+        plain = generator.generate_custom_circuit("an LED with a resistor")
+        if "error" in plain or "profile_path" in plain:
+            print(f"❌ Unprofiled request: {plain.get('error', 'has a profile')}")
+            return False
+
+        result = generator.generate_custom_circuit("an LED with a resistor", profile=True)
+        if "error" in result or not os.path.exists(result.get("profile_path", "")):
+            print(f"❌ No profile stored: {result.get('error', result.keys())}")
+            return False
+        with open(result["profile_path"], 'r', encoding='utf-8') as f:
+            collapsed = f.read()
+        frames = {frame.split(" (")[0] for line in collapsed.splitlines() for frame in line.rsplit(" ", 1)[0].split(";")}
+        # The model call dominates; project building takes too few milliseconds to be sure of a sample
+        if not {"generate_custom_circuit", "generate_circuit_spec"} <= frames:
+            print(f"❌ Pipeline frames missing from profile: {sorted(frames)[:20]}")
+            return False
+        profiles = [r for r in get_artifact_store().list_artifacts() if r.get("kind") == "profile"]
+        if len(profiles) != 1 or not profiles[0].get("metadata", {}).get("samples"):
+            print(f"❌ Profile artifacts: {profiles}")
+            return False
+        if any(t.name == "stack-sampler" for t in threading.enumerate()) or threading.active_count() > threads_before + 4:
+            print("❌ Sampler thread left running")
+            return False
+        print(f"✅ Profile of {profiles[0]['metadata']['samples']} samples stored next to the project")
+        return True
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Request Profiling")
+    print("=" * 40)
+
+    tests = [
+        ("Stack Sampler", test_sampler),
+        ("Profiled Request", test_profiled_request)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
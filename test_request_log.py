@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the rotated request log and request replay
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LED_SPEC = {"name": "led_indicator", "description": "LED with series resistor",
+            "parts": [{"ref": "D1", "lib": "Device", "symbol": "LED", "value": "red"},
+                      {"ref": "R1", "lib": "Device", "symbol": "R", "value": "330"}],
+            "nets": [{"name": "VCC", "pins": ["R1.1"]}, {"name": "A", "pins": ["R1.2", "D1.2"]},
+                     {"name": "GND", "pins": ["D1.1"]}]}
+
+def test_rotation():
+    """The log rotates by size, keeps N backups and reads back oldest first"""
+    print("🔄 Testing rotation...")
+    from request_log import RequestLog, read_request_log
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(work_dir, "logs", "requests.jsonl")
+        log = RequestLog(path, max_bytes=400, backups=2)
+        for i in range(40):
+            log.write({"n": i, "padding": "x" * 40})
+        files = sorted(os.listdir(os.path.dirname(path)))
+        if files != ["requests.jsonl", "requests.jsonl.1", "requests.jsonl.2"]:
+            print(f"❌ Files after rotation: {files}")
+            return False
+        if any(os.path.getsize(os.path.join(work_dir, "logs", f)) > 400 for f in files):
+            print("❌ A log file grew past max_bytes")
+            return False
+        numbers = [record["n"] for record in read_request_log(path, backups=2)]
+        if numbers != list(range(numbers[0], 40)):
+            print(f"❌ Records not contiguous and in order: {numbers}")
+            return False
+        print(f"✅ {len(numbers)} most recent records kept across 3 files")
+        return True
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def test_capture_and_replay():
+    """Requests are recorded with route, model calls and artifact hash, and replay with the same outcome"""
+    print("\n🎬 Testing capture and replay...")
+    import request_log
+    from llm_backends import FakeBackend
+    from llm_engine import LLMEngine
+    from generate_circuit import CircuitGenerator, create_led_circuit
+    from replay_requests import compare, pipeline_driver, replay
+
+    previous_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp()
+    path = os.path.join(work_dir, "logs", "requests.jsonl")
+    try:
+        shutil.copytree(os.path.join(REPO_DIR, "libraries"), os.path.join(work_dir, "libraries"))
+        os.chdir(work_dir)
+        request_log.set_request_log(request_log.RequestLog(path))
+        engine = LLMEngine("llama2", backend=FakeBackend(responder=lambda prompt, schema: json.dumps(LED_SPEC)))
+        generator = CircuitGenerator(llm_engine_factory=lambda: engine, setup_environment=False)
+        result = generator.generate_custom_circuit("an LED with a resistor")
+        time.sleep(0.3)
+        generator.generate_custom_circuit("voltage_divider please")
+        create_led_circuit(voltage=3.3)
+        request_log.set_request_log(None)
+
+        records = list(request_log.read_request_log(path))
+        if [(r["type"], r["route"]) for r in records] != [("custom", "spec"), ("custom", "template"), ("led", "template")]:
+            print(f"❌ Recorded requests: {[(r['type'], r['route']) for r in records]}")
+            return False
+        custom = records[0]
+        call = custom["llm"][0] if custom["llm"] else {}
+        if custom["prompt"] != "an LED with a resistor" or call.get("kind") != "spec" or \
+                "an LED with a resistor" not in call.get("prompt", "") or "num_predict" not in call.get("options", {}) or \
+                custom["artifact_hash"] != result["artifact_hash"] or custom["outcome"] != "success":
+            print(f"❌ Incomplete record: {json.dumps(custom)[:400]}")
+            return False
+        if records[2]["params"] != {"voltage": 3.3, "led_voltage": 2.0, "led_current": 0.02} or not records[2]["artifacts"]:
+            print(f"❌ Builder record: {records[2]}")
+            return False
+
+        start = time.perf_counter()
+        results = replay(records, pipeline_driver(generator, engine), speed=2.0, max_concurrency=4)
+        elapsed = time.perf_counter() - start
+        summary = compare(results)
+        # SKiDL tags template parts randomly, so only the compiled spec is byte-identical
+        if summary["errors"] or summary["outcome_changed"] or records[0]["id"] in summary["hash_changed"]:
+            print(f"❌ Replay differs: {summary}")
+            return False
+        gap = records[1]["ts"] - records[0]["ts"]
+        if elapsed < gap / 2:
+            print(f"❌ Replay ignored pacing: {elapsed:.2f}s for a {gap:.2f}s gap at speed 2")
+            return False
+        print(f"✅ {len(records)} requests recorded and replayed ({elapsed:.2f}s)")
+        return True
+    finally:
+        request_log.set_request_log(None)
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def test_chat_sessions():
+    """Chat requests record their session; replay keeps each session's conversation apart"""
+    print("\n💬 Testing chat sessions...")
+    import request_log
+    from llm_backends import FakeBackend
+    from llm_engine import LLMEngine
+    from replay_requests import pipeline_driver, replay
+
+    work_dir = tempfile.mkdtemp()
+    path = os.path.join(work_dir, "requests.jsonl")
+    try:
+        request_log.set_request_log(request_log.RequestLog(path))
+        engine = LLMEngine("llama2", backend=FakeBackend(response="Noted."))
+        alice, bob = engine.new_conversation(), engine.new_conversation()
+        engine.process_user_query("alpha one", memory=alice)
+        engine.process_user_query("beta one", memory=bob)
+        engine.process_user_query("alpha two", memory=alice)
+        request_log.set_request_log(None)
+
+        records = list(request_log.read_request_log(path))
+        if [r.get("session") for r in records] != [alice.session_id, bob.session_id, alice.session_id]:
+            print(f"❌ Recorded sessions: {[r.get('session') for r in records]}")
+            return False
+
+        prompts = {}
+
+        def respond(prompt, schema):
+            query = next(q for q in ("alpha one", "beta one", "alpha two") if f"Current request: {q}" in prompt)
+            prompts[query] = prompt
+            return "Noted."
+        replayed = LLMEngine("llama2", backend=FakeBackend(responder=respond))
+        results = replay(records, pipeline_driver(None, replayed), speed=0, max_concurrency=1)
+        second = prompts.get("alpha two", "")
+        if any(r["error"] for r in results) or "alpha one" not in second or "beta one" in second:
+            print(f"❌ Replayed conversations mixed: {results}")
+            return False
+        print("✅ Sessions recorded and replayed on separate conversations")
+        return True
+    finally:
+        request_log.set_request_log(None)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Request Log")
+    print("=" * 40)
+
+    tests = [
+        ("Rotation", test_rotation),
+        ("Capture and Replay", test_capture_and_replay),
+        ("Chat Sessions", test_chat_sessions)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
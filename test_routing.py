@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script to verify orthogonal wire routing
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def _touches(point, start, end):
+    """True if point lies on the axis-aligned segment start-end"""
+    return (min(start[0], end[0]) - 1e-6 <= point[0] <= max(start[0], end[0]) + 1e-6 and
+            min(start[1], end[1]) - 1e-6 <= point[1] <= max(start[1], end[1]) + 1e-6)
+
+def test_short_nets_routed():
+    """Two-pin nets are wired around symbol bodies without shorting other nets"""
+    print("〰️ Testing short net routing...")
+    from routing import route_nets
+
+    # Voltage divider: R1 pin 2 and R2 pin 1 sit on opposite sides of the bodies
+    pins_by_net = {
+        "OUT": [("R1", "2", 0, 43.18, 39.37), ("R2", "1", 0, 78.74, 31.75)],
+        "VIN": [("R1", "1", 0, 43.18, 31.75)],
+        "GND": [("R2", "2", 0, 78.74, 39.37)],
+    }
+    bodies = {"R1": (0, (41.91, 33.02, 44.45, 38.1)), "R2": (0, (77.47, 33.02, 80.01, 38.1))}
+    result = route_nets(pins_by_net, bodies)
+
+    if result.routed_nets != ["OUT"] or result.label_pins:
+        print(f"❌ OUT was not wired: routed={result.routed_nets}, labelled={result.labelled_nets}")
+        return False
+    for _, net, start, end in result.wires:
+        if start[0] != end[0] and start[1] != end[1]:
+            print(f"❌ Wire {start}-{end} is not orthogonal")
+            return False
+        for other in ("VIN", "GND"):
+            _, _, _, x, y = pins_by_net[other][0]
+            if _touches((x, y), start, end):
+                print(f"❌ OUT wire touches the {other} pin")
+                return False
+    print(f"✅ OUT wired with {len(result.wires)} orthogonal segments, no shorts")
+    return True
+
+def test_junctions_and_labels():
+    """Three-pin nets get a junction; rails and multi-sheet nets get labels"""
+    print("\n🔀 Testing junctions and labels...")
+    from routing import route_nets
+
+    pins_by_net = {
+        "TAP": [("R1", "1", 0, 10.16, 10.16), ("R2", "1", 0, 30.48, 10.16), ("R3", "1", 0, 20.32, 20.32)],
+        "SHARED": [("R4", "1", 0, 50.8, 50.8), ("R5", "1", 1, 50.8, 50.8)],
+    }
+    result = route_nets(pins_by_net, {})
+    if "TAP" not in result.routed_nets or not result.junctions:
+        print("❌ Three-pin net should be wired with a junction")
+        return False
+    if result.labelled_nets != ["SHARED"] or len(result.label_pins) != 2:
+        print("❌ Net spanning two sheets should be labelled on both")
+        return False
+    print(f"✅ {len(result.junctions)} junction(s), multi-sheet net labelled")
+    return True
+
+def test_routing_scales():
+    """Routing time grows roughly linearly with the number of parts"""
+    print("\n⏱️ Testing routing scalability...")
+    from placement import place_components
+    from benchmark_placement import make_synthetic_netlist, routing_inputs
+    from routing import route_nets
+
+    timings = {}
+    for size in (2000, 8000):
+        comp_map, net_map = make_synthetic_netlist(size)
+        placement = place_components(list(comp_map), net_map)
+        pins_by_net, bodies = routing_inputs(placement, net_map)
+        start = time.perf_counter()
+        route_nets(pins_by_net, bodies)
+        timings[size] = time.perf_counter() - start
+
+    ratio = timings[8000] / max(timings[2000], 1e-3)
+    if ratio > 8:
+        print(f"❌ 4x the parts took {ratio:.1f}x as long")
+        return False
+    print(f"✅ 2000 parts in {timings[2000]:.2f}s, 8000 parts in {timings[8000]:.2f}s ({ratio:.1f}x)")
+    return True
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Wire Routing")
+    print("=" * 40)
+
+    tests = [
+        ("Short Nets", test_short_nets_routed),
+        ("Junctions And Labels", test_junctions_and_labels),
+        ("Scalability", test_routing_scales)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
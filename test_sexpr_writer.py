@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the streaming S-expression writer
+"""
+
+import io
+import os
+import sys
+import gzip
+import shutil
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def _write_wires(target, count, compress=False):
+    """Write a schematic-shaped document with count wires"""
+    from sexpr_writer import SExprWriter, fmt_mm, WIRE_STROKE
+    with SExprWriter(target, compress=compress) as w:
+        w.begin('(kicad_sch (version 20211123) (generator "skidl_agent")')
+        for i in range(count):
+            x = (i % 100) * 2.54
+            w.line('(wire (pts (xy ', fmt_mm(x), ' 25.40) (xy ', fmt_mm(x), ' 50.80)) ', WIRE_STROKE, ' (uuid ', f"{i:08d}", '))')
+        w.end()
+        return w.bytes_written
+
+def test_output_format():
+    """Nested lists are indented, atoms quoted and escaped"""
+    print("🖊️ Testing output format...")
+    from sexpr_writer import SExprWriter, quote
+
+    buffer = io.BytesIO()
+    with SExprWriter(buffer) as w:
+        w.begin('(kicad_sch')
+        w.begin('(symbol ', quote('Device:R'))
+        w.line('(property "Value" ', quote('say "hi"'), ')')
+        w.end()
+        w.end()
+    expected = '(kicad_sch\n  (symbol "Device:R"\n    (property "Value" "say \\"hi\\"")\n  )\n)\n'
+    if buffer.getvalue().decode() != expected:
+        print(f"❌ Unexpected output:\n{buffer.getvalue().decode()}")
+        return False
+    print("✅ Indentation and quoting match the KiCad layout")
+    return True
+
+def test_gzip_round_trip():
+    """Compressed output decompresses to the plain output and is byte-stable"""
+    print("\n🗜️ Testing gzip output...")
+    plain = io.BytesIO()
+    _write_wires(plain, 5000)
+    first, second = io.BytesIO(), io.BytesIO()
+    _write_wires(first, 5000, compress=True)
+    _write_wires(second, 5000, compress=True)
+
+    if gzip.decompress(first.getvalue()) != plain.getvalue():
+        print("❌ Decompressed output differs from plain output")
+        return False
+    if first.getvalue() != second.getvalue():
+        print("❌ Gzip output is not byte-stable")
+        return False
+    print(f"✅ {len(plain.getvalue())} bytes compressed to {len(first.getvalue())}, byte-stable")
+    return True
+
+def test_bounded_memory():
+    """Peak memory does not grow with the size of the document"""
+    print("\n📉 Testing peak memory...")
+    root = tempfile.mkdtemp()
+    try:
+        peaks = {}
+        for count in (10000, 200000):
+            tracemalloc.start()
+            written = _write_wires(os.path.join(root, f"{count}.kicad_sch"), count)
+            peaks[count] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"   {count} wires, {written / 1e6:.1f} MB written, peak {peaks[count] / 1e3:.0f} kB")
+
+        if peaks[200000] > 2 * peaks[10000]:
+            print("❌ Peak memory grew with document size")
+            return False
+        print("✅ Peak memory independent of document size")
+        return True
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing S-Expression Writer")
+    print("=" * 40)
+
+    tests = [
+        ("Output Format", test_output_format),
+        ("Gzip Round Trip", test_gzip_round_trip),
+        ("Bounded Memory", test_bounded_memory)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the shared binary symbol/pin cache
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+LIBRARIES_DIR = os.path.join(REPO_DIR, "libraries")
+
+def _open_in_worker(args):
+    """Open the cache in a fresh process and return (cache path, pins of R)"""
+    lib_file, cache_dir = args
+    from symbol_cache import open_symbol_cache
+    cache = open_symbol_cache(lib_file, cache_dir)
+    return cache.path, cache.pins("R")
+
+def test_matches_library():
+    """Every symbol's pins match a direct parse of the library"""
+    print("🔎 Testing cache contents...")
+    from symbol_cache import open_symbol_cache
+    from generate_circuit import _parse_pin_locations
+
+    cache_dir = tempfile.mkdtemp()
+    try:
+        for name in ("Device", "LED", "power"):
+            lib_file = os.path.join(LIBRARIES_DIR, f"{name}.kicad_sym")
+            cache = open_symbol_cache(lib_file, cache_dir)
+            wrong = [s for s in cache.names() if cache.pins(s) != _parse_pin_locations(s, lib_file)]
+            if wrong:
+                print(f"❌ {name}: {len(wrong)} symbols differ, e.g. {wrong[0]}")
+                return False
+            print(f"✅ {name}: {len(cache)} symbols, {os.path.getsize(cache.path)} bytes "
+                  f"(library {os.path.getsize(lib_file)} bytes)")
+        if open_symbol_cache(os.path.join(LIBRARIES_DIR, "Device.kicad_sym"), cache_dir).pins("NoSuchPart") is not None:
+            print("❌ Unknown symbol should return None")
+            return False
+        led = open_symbol_cache(os.path.join(LIBRARIES_DIR, "LED.kicad_sym"), cache_dir)
+        if led.pin_types("APA-106-F5") != {"1": "output", "2": "power_in", "3": "power_in", "4": "input"}:
+            print(f"❌ Wrong pin types: {led.pin_types('APA-106-F5')}")
+            return False
+        return True
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+def test_shared_across_processes():
+    """Concurrent workers end up mapping one cache file"""
+    print("\n🧩 Testing cache sharing across processes...")
+    cache_dir = tempfile.mkdtemp()
+    try:
+        lib_file = os.path.join(LIBRARIES_DIR, "Device.kicad_sym")
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(_open_in_worker, [(lib_file, cache_dir)] * 8))
+
+        paths = {path for path, _ in results}
+        files = os.listdir(cache_dir)
+        if len(paths) != 1 or files != [os.path.basename(paths.pop())]:
+            print(f"❌ Expected one shared cache file, found {files}")
+            return False
+        if any(pins != results[0][1] or not pins for _, pins in results):
+            print("❌ Workers read different pins")
+            return False
+        print(f"✅ 8 workers mapped one cache file: {files[0]}")
+        return True
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+def test_rebuild_on_change():
+    """Editing the library or damaging the cache triggers an atomic rebuild"""
+    print("\n🔁 Testing cache rebuild...")
+    from symbol_cache import open_symbol_cache
+
+    root = tempfile.mkdtemp()
+    try:
+        lib_file = os.path.join(root, "Device.kicad_sym")
+        shutil.copy(os.path.join(LIBRARIES_DIR, "Device.kicad_sym"), lib_file)
+        cache_dir = os.path.join(root, "cache")
+        first = open_symbol_cache(lib_file, cache_dir)
+
+        with open(lib_file, 'r', encoding='utf-8') as f:
+            library = f.read()
+        with open(lib_file, 'w', encoding='utf-8') as f:
+            f.write(library.replace('(generator_version "9.0")', '(generator_version "9.0.1")', 1))
+        second = open_symbol_cache(lib_file, cache_dir)
+        if second.path == first.path or os.listdir(cache_dir) != [os.path.basename(second.path)]:
+            print(f"❌ Changed library did not replace its cache: {os.listdir(cache_dir)}")
+            return False
+        print("✅ Library change produced a new cache and removed the old one")
+
+        # Damage the cache the way a crashed writer without the rename would
+        expected = second.pins("R")
+        from symbol_cache import close_symbol_caches
+        close_symbol_caches()
+        with open(second.path, 'rb') as f:
+            damaged = f.read(100)
+        damaged_path = second.path + ".damaged"
+        with open(damaged_path, 'wb') as f:
+            f.write(damaged)
+        os.replace(damaged_path, second.path)
+        third = open_symbol_cache(lib_file, cache_dir)
+        if third.pins("R") != expected or not expected:
+            print("❌ Truncated cache was not rebuilt")
+            return False
+        print("✅ Truncated cache rebuilt")
+        return True
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Symbol Cache")
+    print("=" * 40)
+
+    tests = [
+        ("Cache Contents", test_matches_library),
+        ("Shared Across Processes", test_shared_across_processes),
+        ("Rebuild On Change", test_rebuild_on_change)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
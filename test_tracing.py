@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script to verify pipeline tracing spans, JSONL export and waterfalls
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LED_SPEC = {"name": "led_indicator", "description": "LED with series resistor",
+            "parts": [{"ref": "D1", "lib": "Device", "symbol": "LED", "value": "red"},
+                      {"ref": "R1", "lib": "Device", "symbol": "R", "value": "330"}],
+            "nets": [{"name": "VCC", "pins": ["R1.1"]}, {"name": "A", "pins": ["R1.2", "D1.2"]},
+                     {"name": "GND", "pins": ["D1.1"]}]}
+
+def test_spans():
+    """Spans nest, carry attributes and errors, and end up in one trace"""
+    print("🧵 Testing spans...")
+    from tracing import span, record_span, add_attributes, get_trace, waterfall
+
+    with span("request", user="test") as root:
+        with span("stage.one") as one:
+            one.set(bytes=123)
+        try:
+            with span("stage.two"):
+                add_attributes(cache_hit=False)
+                raise ValueError("bad spec")
+        except ValueError:
+            pass
+        record_span("model.decode", root.start_ns, root.start_ns + 1000)
+
+        # Spans opened on another thread start their own trace
+        other = []
+        threading.Thread(target=lambda: other.append(span("elsewhere").__enter__())).start()
+
+    trace = get_trace()
+    by_name = {s.name: s for s in trace.spans}
+    if set(by_name) != {"request", "stage.one", "stage.two", "model.decode"}:
+        print(f"❌ Trace spans: {sorted(by_name)}")
+        return False
+    if by_name["stage.one"].parent_id != root.span_id or by_name["stage.one"].attributes != {"bytes": 123}:
+        print("❌ Child span not linked or attributes lost")
+        return False
+    if by_name["stage.two"].status != "ERROR" or "bad spec" not in by_name["stage.two"].attributes["error"]:
+        print("❌ Error not recorded")
+        return False
+    text = waterfall(trace)
+    if "    stage.one" not in text or "stage.two ✗" not in text or len(text.splitlines()) != 5:
+        print(f"❌ Unexpected waterfall:\n{text}")
+        return False
+    print(f"✅ One trace of {len(trace.spans)} spans:\n{text}")
+    return True
+
+def test_pipeline_trace():
+    """A custom circuit request exports every stage to the JSONL file"""
+    print("\n🌊 Testing pipeline trace...")
+    import tracing
+    from llm_backends import FakeBackend
+    from llm_engine import LLMEngine
+    from generate_circuit import CircuitGenerator
+
+    previous_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp()
+    trace_file = os.path.join(work_dir, "traces", "spans.jsonl")
+    try:
+        shutil.copytree(os.path.join(REPO_DIR, "libraries"), os.path.join(work_dir, "libraries"))
+        os.chdir(work_dir)
+        tracing.set_exporter(tracing.JSONLExporter(trace_file))
+        engine = LLMEngine("llama2", backend=FakeBackend(responder=lambda prompt, schema: json.dumps(LED_SPEC)))
+        generator = CircuitGenerator(llm_engine_factory=lambda: engine, setup_environment=False)
+        result = generator.generate_custom_circuit("an LED with a resistor")
+        if "error" in result:
+            print(f"❌ {result['error']}")
+            return False
+
+        # The background review exports its own trace, possibly after this one
+        traces = tracing.read_traces(trace_file)
+        spans = next((t for t in traces.values()
+                      if any(s["name"] == "request.custom_circuit" and not s.get("parentSpanId") for s in t)), [])
+        names = {s["name"] for s in spans}
+        expected = {"request.custom_circuit", "llm.circuit_spec", "llm.generate", "llm.queue", "llm.request",
+                    "spec.parse", "circuit.from_spec", "spec.compile", "spec.validate", "netlist.write",
+                    "project.build", "project.parse", "project.place", "project.route", "project.schematic",
+                    "project.zip", "artifact.store", "review.submit"}
+        if not expected <= names:
+            print(f"❌ Missing spans: {sorted(expected - names)}")
+            return False
+        by_name = {s["name"]: s for s in spans}
+        ids = {s["spanId"]: s for s in spans}
+        # The backend call ran on a dispatcher thread but belongs to the request
+        if ids[by_name["llm.request"]["parentSpanId"]]["name"] != "llm.generate":
+            print("❌ Dispatcher span not parented to llm.generate")
+            return False
+        if by_name["netlist.write"]["attributes"]["bytes"] <= 0 or \
+                "dedup" not in by_name["artifact.store"]["attributes"] or \
+                by_name["request.custom_circuit"]["attributes"]["path"] != "spec":
+            print(f"❌ Missing attributes: {by_name['netlist.write']}, {by_name['artifact.store']}")
+            return False
+        print(f"✅ {len(spans)} spans exported\n{tracing.waterfall(spans)}")
+        return True
+    finally:
+        tracing.set_exporter(None)
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Tracing")
+    print("=" * 40)
+
+    tests = [
+        ("Spans", test_spans),
+        ("Pipeline Trace", test_pipeline_trace)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
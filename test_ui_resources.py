@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test script to verify Streamlit resources are created once per process
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+def _scratch_dir():
+    """Temporary working directory with a copy of the symbol libraries"""
+    work_dir = tempfile.mkdtemp()
+    shutil.copytree(os.path.join(REPO_DIR, "libraries"), os.path.join(work_dir, "libraries"))
+    return work_dir
+
+def test_setup_once_across_reruns():
+    """Reruns and new sessions reuse the cached KiCad environment"""
+    print("♻️ Testing environment setup across reruns...")
+    from streamlit.testing.v1 import AppTest
+    import generate_circuit
+    import ui_resources
+
+    original_setup = generate_circuit.setup_kicad_env
+    calls = []
+
+    def counting_setup():
+        calls.append(time.time())
+        return original_setup()
+
+    previous_dir = os.getcwd()
+    work_dir = _scratch_dir()
+    generate_circuit.setup_kicad_env = counting_setup
+    try:
+        os.chdir(work_dir)
+        ui_resources.invalidate_resources()
+        # Two sessions, three renders each
+        for _ in range(2):
+            app = AppTest.from_file(os.path.join(REPO_DIR, "interface", "chat_ui.py"), default_timeout=60)
+            for _ in range(3):
+                app.run()
+            if app.exception:
+                print(f"❌ Chat UI raised: {app.exception[0].message}")
+                return False
+        if len(calls) != 1:
+            print(f"❌ Environment set up {len(calls)} times for 6 renders")
+            return False
+        print("✅ 6 renders across 2 sessions set up the environment once")
+
+        ui_resources.invalidate_resources()
+        ui_resources.get_kicad_environment()
+        if len(calls) != 2:
+            print("❌ invalidate_resources() did not force a fresh setup")
+            return False
+        print("✅ Explicit invalidation re-runs setup")
+        return True
+    finally:
+        generate_circuit.setup_kicad_env = original_setup
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def test_library_invalidation():
+    """Symbol libraries are parsed once and re-parsed when a file changes"""
+    print("\n📚 Testing symbol library cache...")
+    import ui_resources
+
+    previous_dir = os.getcwd()
+    work_dir = _scratch_dir()
+    try:
+        os.chdir(work_dir)
+        ui_resources.invalidate_resources()
+        first = ui_resources.get_symbol_libraries()
+        second = ui_resources.get_symbol_libraries()
+        if first is not second or sorted(first) != ["Device", "LED", "power"]:
+            print(f"❌ Libraries were reloaded or incomplete: {sorted(first)}")
+            return False
+        print("✅ Libraries loaded once and shared")
+
+        device = os.path.join(work_dir, "libraries", "Device.kicad_sym")
+        os.utime(device, (time.time() + 10, time.time() + 10))
+        if ui_resources.get_symbol_libraries() is first:
+            print("❌ Changed library file was not picked up")
+            return False
+        print("✅ Changed library file triggers a reload")
+        return True
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def test_engine_closed_on_invalidation():
+    """Invalidating the engine closes its dispatcher instead of leaking it"""
+    print("\n🔌 Testing engine invalidation...")
+    import ui_resources
+    from llm_dispatcher import _live_dispatchers
+
+    previous_backend = os.environ.get('LLM_BACKEND')
+    os.environ['LLM_BACKEND'] = 'fake'
+    try:
+        ui_resources.invalidate_resources()
+        engine = ui_resources.get_llm_engine()
+        engine.generate_response("hello")
+        workers = list(engine.dispatcher._workers)
+        ui_resources.invalidate_resources()
+        for worker in workers:
+            worker.join(timeout=5)
+        if engine.dispatcher in _live_dispatchers or any(w.is_alive() for w in workers):
+            print("❌ Old engine's dispatcher still registered or running")
+            return False
+        if ui_resources.get_llm_engine() is engine:
+            print("❌ Engine was not replaced")
+            return False
+        print(f"✅ Old engine closed, its {len(workers)} dispatcher workers exited")
+        return True
+    finally:
+        ui_resources.invalidate_resources()
+        if previous_backend is None:
+            os.environ.pop('LLM_BACKEND', None)
+        else:
+            os.environ['LLM_BACKEND'] = previous_backend
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing UI Resource Caching")
+    print("=" * 40)
+
+    tests = [
+        ("Setup Once", test_setup_once_across_reruns),
+        ("Library Invalidation", test_library_invalidation),
+        ("Engine Invalidation", test_engine_closed_on_invalidation)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
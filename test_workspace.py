@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test script to verify job IDs and workspaces are collision-free
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def _allocate_many(args):
+    """Allocate workspaces in a worker and return their paths"""
+    root, count = args
+    from workspace import Workspace
+    return [Workspace("circuit", root=root, keep=True).path for _ in range(count)]
+
+def test_job_ids():
+    """Job IDs are unique and sort in issue order"""
+    print("🆔 Testing job IDs...")
+    from workspace import new_job_id
+
+    ids = [new_job_id() for _ in range(10000)]
+    if len(set(ids)) != len(ids):
+        print("❌ Duplicate job IDs issued")
+        return False
+    if ids != sorted(ids):
+        print("❌ Job IDs are not sortable by issue order")
+        return False
+    print(f"✅ {len(ids)} unique, ordered IDs (e.g. {ids[0]})")
+    return True
+
+def test_parallel_workspaces():
+    """Threads and processes never share a workspace directory"""
+    print("\n📂 Testing parallel workspace allocation...")
+    root = tempfile.mkdtemp()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            thread_paths = [p for batch in pool.map(_allocate_many, [(root, 50)] * 8) for p in batch]
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            process_paths = [p for batch in pool.map(_allocate_many, [(root, 50)] * 4) for p in batch]
+
+        paths = thread_paths + process_paths
+        if len(set(paths)) != len(paths) or len(os.listdir(root)) != len(paths):
+            print("❌ Two jobs were handed the same workspace")
+            return False
+        print(f"✅ {len(paths)} workspaces allocated across threads and processes without collisions")
+
+        from workspace import Workspace
+        with Workspace("circuit", root=root) as workspace:
+            path = workspace.path
+        if os.path.exists(path):
+            print("❌ Workspace was not released")
+            return False
+        print("✅ Workspace released on exit")
+        return True
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def test_failed_build_released():
+    """A template build that fails after allocating its workspace still removes it"""
+    print("\n🧹 Testing workspace release on a failed build...")
+    import generate_circuit
+
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    previous_dir = os.getcwd()
+    previous_root = os.environ.get('KICAD_WORK_DIR')
+    previous_check = generate_circuit.check_netlist
+    work_dir = tempfile.mkdtemp()
+    jobs_dir = os.path.join(work_dir, "jobs")
+
+    def failing_check(netlist_path, libraries_dir="libraries"):
+        raise RuntimeError("ERC crashed")
+
+    try:
+        shutil.copytree(os.path.join(repo_dir, "libraries"), os.path.join(work_dir, "libraries"))
+        os.chdir(work_dir)
+        os.environ['KICAD_WORK_DIR'] = jobs_dir
+        generate_circuit.check_netlist = failing_check
+        result = generate_circuit.create_led_circuit(voltage=5.0)
+        if "ERC crashed" not in result.get("error", ""):
+            print(f"❌ Expected the build to fail: {result}")
+            return False
+        if os.listdir(jobs_dir):
+            print(f"❌ Workspaces left behind: {os.listdir(jobs_dir)}")
+            return False
+        print("✅ Workspace removed after the build failed")
+        return True
+    finally:
+        generate_circuit.check_netlist = previous_check
+        if previous_root is None:
+            os.environ.pop('KICAD_WORK_DIR', None)
+        else:
+            os.environ['KICAD_WORK_DIR'] = previous_root
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main():
+    """Run all tests"""
+    print("🚀 Testing Workspace Allocation")
+    print("=" * 40)
+
+    tests = [
+        ("Job IDs", test_job_ids),
+        ("Parallel Workspaces", test_parallel_workspaces),
+        ("Failed Build Released", test_failed_build_released)
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n{'='*15} {test_name} {'='*15}")
+        if test_func():
+            passed += 1
+            print(f"✅ {test_name} PASSED")
+        else:
+            print(f"❌ {test_name} FAILED")
+
+    print("\n" + "=" * 40)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
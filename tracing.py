@@ -0,0 +1,252 @@
+from typing import Callable, Dict, Iterable, List, Optional
+import os
+import sys
+import json
+import time
+import functools
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Structured spans for the generation pipeline. Every stage (environment
+# setup, prompt build, queueing, model prefill/decode, extraction,
+# validation, code execution, netlist write, project build, zip) runs in a
+# span carrying its duration and attributes such as sizes and cache hits.
+# Spans nest through a context variable, so a request's spans form one
+# trace without passing anything around; the LLM dispatcher carries the
+# context over to its worker threads.
+#
+#   TRACE_FILE   append finished traces to this JSONL file, one span per
+#                line with OTLP field names (traceId, spanId, parentSpanId,
+#                startTimeUnixNano, ...); unset: traces are only kept in memory
+#
+# The last RECENT_TRACES traces stay in memory for waterfall(); run
+# `python tracing.py [TRACE_FILE] [trace_id]` to print one from the file.
+
+RECENT_TRACES = 64
+
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("current_span", default=None)
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+class Span:
+    """One timed stage of a request"""
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status", "_trace")
+
+    def __init__(self, name: str, trace: "Trace", parent: Optional["Span"], attributes: Dict):
+        self.name = name
+        self.trace_id = trace.trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.status = "OK"
+        self._trace = trace
+
+    def set(self, **attributes):
+        """Add attributes (sizes, counts, cache hits, ...)"""
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict:
+        """The span as an OTLP-style JSON object"""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": self.status},
+        }
+
+class Trace:
+    """The spans of one request; exported when its root span ends"""
+    def __init__(self):
+        self.trace_id = _new_id(16)
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+class JSONLExporter:
+    """Appends each finished trace to a JSONL file, one span per line"""
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        lines = "".join(json.dumps(s.to_dict(), default=str, separators=(',', ':')) + "\n" for s in spans)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)  # One write per trace keeps concurrent traces' lines whole
+
+_exporter: Optional[JSONLExporter] = JSONLExporter(os.environ['TRACE_FILE']) if os.environ.get('TRACE_FILE') else None
+_recent: "OrderedDict[str, Trace]" = OrderedDict()
+_recent_lock = threading.Lock()
+
+def set_exporter(exporter: Optional[JSONLExporter]):
+    """Export finished traces with exporter (None: keep them in memory only)"""
+    global _exporter
+    _exporter = exporter
+
+def current_span() -> Optional[Span]:
+    """The innermost open span in this context, or None"""
+    return _current_span.get()
+
+def add_attributes(**attributes):
+    """Set attributes on the current span, if any"""
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+
+def _finish_trace(trace: Trace):
+    with _recent_lock:
+        _recent[trace.trace_id] = trace
+        while len(_recent) > RECENT_TRACES:
+            _recent.popitem(last=False)
+    if _exporter is not None:
+        try:
+            _exporter.export(sorted(trace.spans, key=lambda s: s.start_ns))
+        except OSError as e:
+            print(f"Trace export failed: {e}", file=sys.stderr)
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a stage. Nested spans become children; a span opened with no span
+    around it starts a new trace.
+    Yields:
+        The Span, for adding attributes with span.set()
+    """
+    parent = _current_span.get()
+    trace = parent._trace if parent is not None else Trace()
+    current = Span(name, trace, parent, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "ERROR"
+        current.attributes.setdefault("error", f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        trace.add(current)
+        if parent is None:
+            _finish_trace(trace)
+
+def record_span(name: str, start_ns: int, end_ns: int, **attributes) -> Optional[Span]:
+    """
+    Add an already finished child span to the current span, e.g. the
+    prefill and decode phases a model server reports after the fact
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    recorded = Span(name, parent._trace, parent, attributes)
+    recorded.start_ns, recorded.end_ns = start_ns, end_ns
+    parent._trace.add(recorded)
+    return recorded
+
+def traced(name: str):
+    """Decorator: run the function in a span"""
+    def decorate(func: Callable):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def get_trace(trace_id: Optional[str] = None) -> Optional[Trace]:
+    """A recent trace by id, or the most recent one"""
+    with _recent_lock:
+        if trace_id is None:
+            return next(reversed(_recent.values()), None)
+        return _recent.get(trace_id)
+
+def _span_rows(spans: Iterable) -> List[Dict]:
+    """Spans or exported span dicts as uniform rows"""
+    rows = []
+    for s in spans:
+        d = s.to_dict() if isinstance(s, Span) else s
+        rows.append({"id": d["spanId"], "parent": d.get("parentSpanId") or None, "name": d["name"],
+                     "start": d["startTimeUnixNano"], "end": d["endTimeUnixNano"] or d["startTimeUnixNano"],
+                     "attributes": d.get("attributes") or {}, "status": (d.get("status") or {}).get("code", "OK")})
+    return rows
+
+def waterfall(spans, width: int = 40) -> str:
+    """
+    Text waterfall of one trace: offset and duration of every span, indented
+    by nesting, with a bar on a common time axis
+    Args:
+        spans: A Trace, or its spans as Span objects or exported dicts
+    """
+    rows = _span_rows(spans.spans if isinstance(spans, Trace) else spans)
+    if not rows:
+        return "(empty trace)"
+    origin = min(r["start"] for r in rows)
+    total = max(max(r["end"] for r in rows) - origin, 1)
+    children: Dict[Optional[str], List[Dict]] = {}
+    ids = {r["id"] for r in rows}
+    for r in sorted(rows, key=lambda r: r["start"]):
+        children.setdefault(r["parent"] if r["parent"] in ids else None, []).append(r)
+
+    lines = [f"{'':{width}}  {'start ms':>9} {'dur ms':>9}  span"]
+
+    def emit(row, depth):
+        begin = int((row["start"] - origin) * width / total)
+        length = max(1, round((row["end"] - row["start"]) * width / total))
+        bar = (" " * begin + "█" * length)[:width]
+        attrs = " ".join(f"{k}={v}" for k, v in row["attributes"].items() if not isinstance(v, (dict, list)))
+        flag = " ✗" if row["status"] != "OK" else ""
+        lines.append(f"{bar:<{width}}  {(row['start'] - origin) / 1e6:9.1f} {(row['end'] - row['start']) / 1e6:9.1f}  "
+                     f"{'  ' * depth}{row['name']}{flag}{'  ' + attrs if attrs else ''}")
+        for child in children.get(row["id"], []):
+            emit(child, depth + 1)
+
+    for root in children.get(None, []):
+        emit(root, 0)
+    return "\n".join(lines)
+
+def read_traces(path: str) -> "OrderedDict[str, List[Dict]]":
+    """Exported spans from a JSONL file, grouped by trace in file order"""
+    traces: "OrderedDict[str, List[Dict]]" = OrderedDict()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # A line cut short by a crash
+            traces.setdefault(record["traceId"], []).append(record)
+    return traces
+
+if __name__ == "__main__":
+    # python tracing.py [TRACE_FILE] [trace_id]: waterfall of a trace (default: the last one)
+    path = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('TRACE_FILE')
+    if not path:
+        print("Usage: python tracing.py <trace.jsonl> [trace_id]")
+        sys.exit(2)
+    traces = read_traces(path)
+    if not traces:
+        print(f"No traces in {path}")
+        sys.exit(1)
+    trace_id = sys.argv[2] if len(sys.argv) > 2 else next(reversed(traces))
+    if trace_id not in traces:
+        print(f"Trace {trace_id} not found in {path}")
+        sys.exit(1)
+    print(f"Trace {trace_id}")
+    print(waterfall(traces[trace_id]))
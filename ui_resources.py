@@ -0,0 +1,107 @@
+from typing import Dict, List, Tuple
+import os
+from datetime import datetime
+import streamlit as st
+
+# Process-wide resources for the Streamlit apps. st.cache_resource keeps one
+# instance per process, shared by every rerun and every browser session, so
+# environment setup and model start-up happen once instead of per click.
+
+LIBRARIES_DIR = "libraries"
+
+# Engines handed out by get_llm_engine, closed when the cache is invalidated
+_engines: List = []
+
+def libraries_signature() -> Tuple[Tuple[str, float, int], ...]:
+    """(name, mtime, size) of every symbol library; changes when a library does"""
+    libraries_dir = os.path.abspath(LIBRARIES_DIR)
+    if not os.path.isdir(libraries_dir):
+        return ()
+    signature = []
+    for name in sorted(os.listdir(libraries_dir)):
+        if name.endswith('.kicad_sym'):
+            stat = os.stat(os.path.join(libraries_dir, name))
+            signature.append((name, stat.st_mtime, stat.st_size))
+    return tuple(signature)
+
+@st.cache_resource(show_spinner="Setting up KiCad environment...")
+def get_kicad_environment() -> Dict:
+    """
+    Set up the KiCad environment once per process
+    Raises:
+        RuntimeError: If setup failed; failures are not cached, so the next rerun retries
+    """
+    from generate_circuit import setup_kicad_env
+    if not setup_kicad_env():
+        raise RuntimeError("KiCad environment setup failed")
+    return {"libraries_dir": os.path.abspath(LIBRARIES_DIR), "ready_at": datetime.now()}
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_symbol_libraries(signature: Tuple) -> Dict[str, str]:
+    from generate_circuit import _read_symbol_library, get_pin_locations
+    from symbol_cache import open_symbol_cache
+    # A new signature means a library changed on disk: drop stale parses
+    _read_symbol_library.cache_clear()
+    get_pin_locations.cache_clear()
+    libraries = {}
+    for name, _, _ in signature:
+        path = os.path.join(os.path.abspath(LIBRARIES_DIR), name)
+        open_symbol_cache(path)  # Compiled once, mapped by every worker process
+        libraries[name[:-len('.kicad_sym')]] = path
+    return libraries
+
+def get_symbol_libraries() -> Dict[str, str]:
+    """
+    Return {library_name: path} for the local symbol libraries, compiled
+    once and recompiled automatically when a library file changes
+    """
+    get_kicad_environment()
+    return _load_symbol_libraries(libraries_signature())
+
+@st.cache_resource(show_spinner="Starting the LLM engine...")
+def get_llm_engine(model_name: str = "llama2"):
+    """Return the LLM engine shared by all sessions"""
+    from llm_engine import LLMEngine
+    engine = LLMEngine(model_name)
+    _engines.append(engine)
+    return engine
+
+@st.cache_resource(show_spinner=False)
+def get_project_template() -> str:
+    """Return the .kicad_pro template used for every generated project"""
+    from generate_circuit import kicad_project_template
+    return kicad_project_template()
+
+@st.cache_resource(show_spinner=False)
+def get_circuit_generator():
+    """Return the circuit generator shared by all sessions"""
+    get_kicad_environment()
+    get_symbol_libraries()
+    get_project_template()
+    from metrics import start_metrics_server
+    start_metrics_server()  # Only when METRICS_PORT is set; idempotent
+    from generate_circuit import CircuitGenerator
+    return CircuitGenerator(llm_engine_factory=get_llm_engine, setup_environment=False)
+
+def invalidate_resources(llm_engine: bool = True):
+    """
+    Drop the cached resources so the next access rebuilds them, e.g. after
+    installing libraries or restarting Ollama
+    Args:
+        llm_engine: Also restart the LLM engine
+    """
+    from generate_circuit import _read_symbol_library, get_pin_locations, kicad_project_template
+    from symbol_cache import close_symbol_caches
+    get_kicad_environment.clear()
+    _load_symbol_libraries.clear()
+    get_project_template.clear()
+    get_circuit_generator.clear()
+    if llm_engine:
+        get_llm_engine.clear()
+        # Stop the old engines' dispatchers, or their workers and gauges outlive them
+        while _engines:
+            _engines.pop().close()
+    _read_symbol_library.cache_clear()
+    get_pin_locations.cache_clear()
+    kicad_project_template.cache_clear()
+    close_symbol_caches()
@@ -0,0 +1,78 @@
+from typing import Optional
+import os
+import time
+import shutil
+import secrets
+import tempfile
+import threading
+
+# Crockford base32, as used by ULIDs: sortable, case-insensitive, no I/L/O/U
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+_id_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(_CROCKFORD[digit])
+    return "".join(reversed(chars))
+
+def new_job_id() -> str:
+    """
+    Return a unique, lexicographically sortable job ID (ULID layout)
+
+    48 bits of millisecond timestamp followed by 80 random bits. Within a
+    process, IDs issued in the same millisecond increment the random part,
+    so they stay strictly ordered; across processes the random part makes
+    collisions negligible.
+    """
+    global _last_ms, _last_random
+    with _id_lock:
+        now_ms = int(time.time() * 1000)
+        if now_ms <= _last_ms:
+            now_ms = _last_ms
+            _last_random = (_last_random + 1) & ((1 << 80) - 1)
+        else:
+            _last_ms = now_ms
+            _last_random = secrets.randbits(80)
+        return _encode(now_ms, 10) + _encode(_last_random, 16)
+
+class Workspace:
+    """
+    Private working directory for one generation job
+
+    Created with os.mkdir, which fails if the directory already exists, so
+    two threads or processes can never be handed the same directory. Use as
+    a context manager, or call release() when done.
+    """
+    def __init__(self, prefix: str = "job", root: Optional[str] = None, keep: bool = False):
+        self.root = os.path.abspath(root or os.environ.get('KICAD_WORK_DIR', os.path.join(tempfile.gettempdir(), 'kicad_jobs')))
+        os.makedirs(self.root, exist_ok=True)
+        self.keep = keep
+        while True:
+            self.job_id = new_job_id()
+            self.path = os.path.join(self.root, f"{prefix}_{self.job_id}")
+            try:
+                os.mkdir(self.path)
+                break
+            except FileExistsError:
+                continue
+
+    def release(self):
+        """Remove the workspace directory unless it was allocated with keep=True"""
+        if not self.keep:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self) -> "Workspace":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+def allocate_workspace(prefix: str = "job", keep: bool = False) -> Workspace:
+    """Allocate a private working directory for one job"""
+    return Workspace(prefix, keep=keep)